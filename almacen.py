@@ -0,0 +1,273 @@
+# ===== Almacén indexado de la política =====
+# Envuelve alumnos, cursos, servidores y conexiones y mantiene índices
+# (diccionarios y conjuntos) para que las búsquedas no recorran listas.
+# Las conexiones se delegan a un RegistroConexiones (SQLite).
+# Las inscripciones se guardan compactas: el curso lleva un array de ids de
+# alumno internados y cada alumno una tupla con los códigos de sus cursos.
+
+from compacto import CODIGOS, clave_mac, quitar_id
+from matriz import MatrizAcceso
+from registro import RegistroConexiones
+
+
+class Almacen:
+    """
+    Almacén de la política con índices por código de alumno, MAC (entero),
+    nombre de servidor, (servidor, servicio) e inscripciones.
+    Todas las altas y bajas deben pasar por sus métodos para que los
+    índices se mantengan consistentes.
+    """
+
+    def __init__(self, registro=None):
+        # Almacenamiento principal (dict conserva el orden de inserción)
+        self.alumno_por_codigo = {}
+        self.curso_por_codigo = {}
+        self.servidor_por_nombre = {}
+        # Conexiones: registro SQLite (en memoria si no se indica uno)
+        self.registro = registro if registro is not None else RegistroConexiones()
+
+        # Índices secundarios
+        self.alumno_por_mac = {}        # clave_mac -> alumno
+        self.servidor_por_nombre_lower = {}
+        self.servicio_por_clave = {}    # (servidor, servicio) -> dict del servicio
+        self.cursos_de_alumno = {}      # código de alumno -> tupla de códigos de curso
+        self.cursos_con_permiso = {}    # (servidor, servicio) -> {curso: None} (conjunto ordenado)
+        # Bitsets alumno × (servidor, servicio) de los cursos DICTANDO
+        self.matriz = MatrizAcceso(self)
+
+    # ----- Vistas de solo lectura -----
+    @property
+    def alumnos(self):
+        return list(self.alumno_por_codigo.values())
+
+    @property
+    def cursos(self):
+        return list(self.curso_por_codigo.values())
+
+    @property
+    def servidores(self):
+        return list(self.servidor_por_nombre.values())
+
+    @property
+    def conexiones(self):
+        return self.registro.todas()
+
+    # ----- Carga masiva -----
+    def limpiar(self, conexiones=True):
+        self.alumno_por_codigo.clear()
+        self.curso_por_codigo.clear()
+        self.servidor_por_nombre.clear()
+        self.alumno_por_mac.clear()
+        self.servidor_por_nombre_lower.clear()
+        self.servicio_por_clave.clear()
+        self.cursos_de_alumno.clear()
+        self.cursos_con_permiso.clear()
+        self.matriz.limpiar()
+        if conexiones:
+            self.registro.limpiar()
+
+    def cargar(self, alumnos=(), cursos=(), servidores=()):
+        for a in alumnos:
+            self.agregar_alumno(a)
+        for s in servidores:
+            self.agregar_servidor(s)
+        for c in cursos:
+            self.agregar_curso(c)
+
+    def adoptar(self, otro):
+        """
+        Reemplaza alumnos, cursos y servidores (con sus índices) por los de
+        otro almacén ya construido, conservando las conexiones actuales.
+        """
+        for nombre in ('alumno_por_codigo', 'curso_por_codigo', 'servidor_por_nombre',
+                       'alumno_por_mac', 'servidor_por_nombre_lower', 'servicio_por_clave',
+                       'cursos_de_alumno', 'cursos_con_permiso', 'matriz'):
+            setattr(self, nombre, getattr(otro, nombre))
+        self.matriz.almacen = self
+
+    # ----- Alumnos -----
+    def agregar_alumno(self, alumno):
+        anterior = self.alumno_por_codigo.get(alumno.codigo)
+        if anterior is not None:
+            self.alumno_por_mac.pop(anterior.clave_mac, None)
+        self.alumno_por_codigo[alumno.codigo] = alumno
+        self.alumno_por_mac[alumno.clave_mac] = alumno
+        if anterior is None:
+            self.matriz.alumno_agregado(alumno.codigo)
+
+    def eliminar_alumno(self, codigo):
+        """
+        Da de baja al alumno y sus permisos. Las inscripciones quedan en los
+        cursos (son datos del curso): si se vuelve a registrar, las recupera.
+        """
+        alumno = self.alumno_por_codigo.pop(codigo, None)
+        if alumno is not None:
+            self.alumno_por_mac.pop(alumno.clave_mac, None)
+            self.matriz.alumno_eliminado(alumno.codigo)
+        return alumno
+
+    def buscar_alumno(self, codigo):
+        return self.alumno_por_codigo.get(str(codigo))
+
+    def buscar_alumno_por_mac(self, mac):
+        return self.alumno_por_mac.get(clave_mac(mac))
+
+    # ----- Servidores -----
+    def agregar_servidor(self, servidor):
+        self.eliminar_servidor(servidor.nombre)
+        self.servidor_por_nombre[servidor.nombre] = servidor
+        self.servidor_por_nombre_lower[servidor.nombre.lower()] = servidor
+        for servicio in servidor.servicios:
+            self.servicio_por_clave[(servidor.nombre, servicio['nombre'])] = servicio
+
+    def eliminar_servidor(self, nombre):
+        servidor = self.servidor_por_nombre.pop(nombre, None)
+        if servidor is not None:
+            self.servidor_por_nombre_lower.pop(nombre.lower(), None)
+            for servicio in servidor.servicios:
+                self.servicio_por_clave.pop((nombre, servicio['nombre']), None)
+        return servidor
+
+    def buscar_servidor(self, nombre, ignorar_mayusculas=False):
+        if ignorar_mayusculas:
+            return self.servidor_por_nombre_lower.get(nombre.lower())
+        return self.servidor_por_nombre.get(nombre)
+
+    def buscar_servicio(self, servidor, servicio):
+        return self.servicio_por_clave.get((servidor, servicio))
+
+    # ----- Cursos e inscripciones -----
+    def agregar_curso(self, curso):
+        self.eliminar_curso(curso.codigo)
+        self.curso_por_codigo[curso.codigo] = curso
+        for cod in set(curso.alumnos):
+            self._vincular(cod, curso.codigo)
+        for s in curso.servidores:
+            for servicio in s['servicios_permitidos']:
+                self.cursos_con_permiso.setdefault((s['nombre'], servicio), {})[curso.codigo] = None
+        self.matriz.curso_agregado(curso)
+
+    def eliminar_curso(self, codigo):
+        curso = self.curso_por_codigo.pop(codigo, None)
+        if curso is None:
+            return None
+        for cod in set(curso.alumnos):
+            self._desvincular(cod, codigo)
+        for s in curso.servidores:
+            for servicio in s['servicios_permitidos']:
+                _descartar(self.cursos_con_permiso, (s['nombre'], servicio), codigo)
+        self.matriz.curso_eliminado(curso)
+        return curso
+
+    def buscar_curso(self, codigo):
+        return self.curso_por_codigo.get(codigo)
+
+    def cambiar_estado(self, curso, estado):
+        """
+        Cambia el estado del curso (DICTANDO, INACTIVO, ...). Devuelve False
+        si ya tenía ese estado.
+        """
+        c = self.curso_por_codigo[curso]
+        if c.estado == estado:
+            return False
+        anterior, c.estado = c.estado, estado
+        self.matriz.estado_cambiado(c, anterior)
+        return True
+
+    def esta_inscrito(self, curso, codigo_alumno):
+        return curso in self.cursos_de_alumno.get(str(codigo_alumno), ())
+
+    def inscribir(self, curso, codigo_alumno):
+        """
+        Agrega un alumno al curso. Devuelve False si ya estaba inscrito.
+        """
+        c = self.curso_por_codigo[curso]
+        if self.esta_inscrito(curso, codigo_alumno):
+            return False
+        c.ids_alumnos.append(CODIGOS.id(codigo_alumno))
+        self._vincular(str(codigo_alumno), curso)
+        self.matriz.alumno_inscrito(c, codigo_alumno)
+        return True
+
+    def desinscribir(self, curso, codigo_alumno):
+        """
+        Retira un alumno del curso. Devuelve False si no estaba inscrito.
+        """
+        c = self.curso_por_codigo[curso]
+        if not self.esta_inscrito(curso, codigo_alumno):
+            return False
+        # Quita todas las apariciones (el YAML podría repetir un código)
+        i = CODIGOS.buscar(codigo_alumno)
+        while quitar_id(c.ids_alumnos, i):
+            pass
+        self._desvincular(str(codigo_alumno), curso)
+        self.matriz.alumno_retirado(c, codigo_alumno)
+        return True
+
+    def inscritos(self, curso):
+        """
+        Códigos (sin repetir) de los alumnos inscritos en el curso.
+        """
+        c = self.curso_por_codigo.get(curso)
+        if c is None:
+            return []
+        return list(dict.fromkeys(c.alumnos))
+
+    def cursos_del_alumno(self, codigo_alumno):
+        return list(self.cursos_de_alumno.get(str(codigo_alumno), ()))
+
+    def _vincular(self, cod, curso):
+        cod = CODIGOS.codigo(CODIGOS.id(cod))  # clave internada, compartida con el alumno
+        self.cursos_de_alumno[cod] = self.cursos_de_alumno.get(cod, ()) + (curso,)
+
+    def _desvincular(self, cod, curso):
+        cursos = tuple(c for c in self.cursos_de_alumno.get(cod, ()) if c != curso)
+        if cursos:
+            self.cursos_de_alumno[cod] = cursos
+        else:
+            self.cursos_de_alumno.pop(cod, None)
+
+    def alumnos_de_curso(self, curso):
+        c = self.curso_por_codigo.get(curso)
+        if c is None:
+            return []
+        codigos = CODIGOS.codigos
+        por_codigo = self.alumno_por_codigo
+        return [por_codigo[codigos[i]] for i in c.ids_alumnos if codigos[i] in por_codigo]
+
+    def cursos_que_permiten(self, servidor, servicio):
+        return [self.curso_por_codigo[c] for c in self.cursos_con_permiso.get((servidor, servicio), ())]
+
+    def puede_conectarse(self, cod_alumno, servidor, servicio):
+        """
+        True si algún curso DICTANDO en el que está inscrito el alumno
+        permite el servicio en el servidor (un bit de la matriz de acceso).
+        """
+        return self.matriz.permite(cod_alumno, servidor, servicio)
+
+    # ----- Conexiones -----
+    def agregar_conexion(self, conexion):
+        self.registro.agregar(conexion)
+
+    def agregar_conexiones(self, conexiones):
+        self.registro.agregar_varias(conexiones)
+
+    def eliminar_conexion(self, handler):
+        return self.registro.eliminar(handler)
+
+    def buscar_conexion(self, handler):
+        return self.registro.buscar(handler)
+
+    def hay_conexiones(self):
+        return self.registro.contar() > 0
+
+
+def _descartar(indice, clave, valor):
+    conjunto = indice.get(clave)
+    if conjunto is not None:
+        if isinstance(conjunto, dict):
+            conjunto.pop(valor, None)
+        else:
+            conjunto.discard(valor)
+        if not conjunto:
+            del indice[clave]
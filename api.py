@@ -0,0 +1,363 @@
+# ===== API REST (modo daemon) =====
+# Servidor HTTP/JSON con un hilo por petición que expone las operaciones del
+# programa: importar, consultar cursos/alumnos/servidores, verificar acceso y
+# crear/eliminar conexiones. Las lecturas y cambios del almacén se hacen bajo
+# el lock del programa; los flows se instalan fuera del lock y en paralelo,
+# así que varias solicitudes de conexión avanzan a la vez.
+
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from metricas import TIPO_CONTENIDO
+from registro import MAX_PAGINA
+
+# Código HTTP según el motivo de fallo de crear_conexion
+ESTADOS = {
+    'no_autorizado': 403,
+    'existente': 409,
+    'sin_ubicacion': 422,
+    'sin_ruta': 422,
+    'controlador': 502,
+}
+TAM_PAGINA = 50
+
+
+class ErrorAPI(Exception):
+    def __init__(self, estado, mensaje):
+        super().__init__(mensaje)
+        self.estado = estado
+
+
+def _campos(cuerpo, *nombres):
+    faltan = [n for n in nombres if cuerpo.get(n) in (None, "")]
+    if faltan:
+        raise ErrorAPI(400, f"Faltan campos: {', '.join(faltan)}")
+    return [str(cuerpo[n]) for n in nombres]
+
+
+def _archivo(app, path):
+    """
+    Resuelve `path` (relativo al directorio configurado o absoluto) y
+    rechaza lo que quede fuera de ese directorio, enlaces simbólicos
+    incluidos.
+    """
+    base = os.path.realpath(app.API_ARCHIVOS_DIR)
+    real = os.path.realpath(os.path.join(base, path))
+    if os.path.commonpath([base, real]) != base:
+        raise ErrorAPI(403, f"'{path}' está fuera del directorio de archivos de la API")
+    return real
+
+
+def _entero(query, nombre, defecto):
+    try:
+        return int(query.get(nombre, defecto))
+    except ValueError:
+        raise ErrorAPI(400, f"'{nombre}' debe ser un entero")
+
+
+# ----- Rutas -----
+def salud(app, query, cuerpo):
+    return 200, {'ok': True}
+
+
+def listar_cursos(app, query, cuerpo):
+    with app.estado_lock:
+        return 200, [c.como_dict() for c in app.almacen.cursos]
+
+
+def ver_curso(app, query, cuerpo, codigo):
+    with app.estado_lock:
+        curso = app.almacen.buscar_curso(codigo)
+        if curso is None:
+            raise ErrorAPI(404, f"No existe el curso {codigo}")
+        return 200, curso.como_dict()
+
+
+def listar_alumnos(app, query, cuerpo):
+    with app.estado_lock:
+        if query.get('curso'):
+            alumnos = app.almacen.alumnos_de_curso(query['curso'])
+        else:
+            alumnos = app.almacen.alumnos
+        return 200, [a.como_dict() for a in alumnos]
+
+
+def ver_alumno(app, query, cuerpo, codigo):
+    with app.estado_lock:
+        alumno = app.almacen.buscar_alumno(codigo)
+        if alumno is None:
+            raise ErrorAPI(404, f"No existe el alumno {codigo}")
+        return 200, dict(alumno.como_dict(), cursos=app.almacen.cursos_del_alumno(codigo))
+
+
+def listar_servidores(app, query, cuerpo):
+    with app.estado_lock:
+        return 200, [s.como_dict() for s in app.almacen.servidores]
+
+
+def ver_servidor(app, query, cuerpo, nombre):
+    with app.estado_lock:
+        servidor = app.almacen.buscar_servidor(nombre)
+        if servidor is None:
+            raise ErrorAPI(404, f"No existe el servidor {nombre}")
+        return 200, servidor.como_dict()
+
+
+def verificar_acceso(app, query, cuerpo):
+    alumno, servidor, servicio = _campos(query, 'alumno', 'servidor', 'servicio')
+    with app.estado_lock:
+        permitido = app.autorizar(alumno, servidor, servicio)
+    return 200, {'alumno': alumno, 'servidor': servidor, 'servicio': servicio, 'permitido': permitido}
+
+
+def alumnos_con_acceso(app, query, cuerpo):
+    servidor, servicio = _campos(query, 'servidor', 'servicio')
+    with app.estado_lock:
+        codigos = app.almacen.matriz.alumnos_con_acceso(servidor, servicio)
+    return 200, {'servidor': servidor, 'servicio': servicio, 'total': len(codigos), 'alumnos': codigos}
+
+
+def permisos_alumno(app, query, cuerpo, codigo):
+    with app.estado_lock:
+        if app.almacen.buscar_alumno(codigo) is None:
+            raise ErrorAPI(404, f"No existe el alumno {codigo}")
+        permisos = sorted(app.almacen.matriz.permisos_de(codigo))
+    return 200, [{'servidor': srv, 'servicio': svc} for srv, svc in permisos]
+
+
+def simular_estado(app, query, cuerpo, codigo):
+    estado, = _campos(query, 'estado')
+    with app.estado_lock:
+        if app.almacen.buscar_curso(codigo) is None:
+            raise ErrorAPI(404, f"No existe el curso {codigo}")
+        matriz = app.almacen.matriz
+        cambios = matriz.simular_estado(codigo, estado.upper())
+        return 200, {tipo: [{'servidor': srv, 'servicio': svc, 'alumnos': matriz.codigos(bits)}
+                            for (srv, svc), bits in sorted(por_clave.items())]
+                     for tipo, por_clave in cambios.items()}
+
+
+def listar_conexiones(app, query, cuerpo):
+    filtros = {k: query[k] for k in ('alumno', 'servidor', 'servicio') if query.get(k)}
+    despues = _entero(query, 'despues', 0)
+    tam = _entero(query, 'tam', TAM_PAGINA)
+    if not 1 <= tam <= MAX_PAGINA:
+        raise ErrorAPI(400, f"'tam' debe estar entre 1 y {MAX_PAGINA}")
+    conexiones, siguiente = app.almacen.registro.listar(despues, tam, **filtros)
+    # `siguiente` es el valor de ?despues= para la próxima página (None si no hay más)
+    return 200, {'total': app.almacen.registro.contar(**filtros), 'conexiones': conexiones,
+                 'siguiente': siguiente}
+
+
+def ver_conexion(app, query, cuerpo, handler):
+    conexion = app.almacen.buscar_conexion(handler)
+    if conexion is None:
+        raise ErrorAPI(404, f"No existe la conexión {handler}")
+    return 200, conexion
+
+
+def crear_conexion(app, query, cuerpo):
+    alumno, servidor, servicio = _campos(cuerpo, 'alumno', 'servidor', 'servicio')
+    ubicacion = {k: cuerpo.get(k) for k in ('dpid', 'puerto', 'dpid_alumno', 'puerto_alumno')}
+    resultado = app.crear_conexion(alumno, servidor, servicio, **ubicacion)
+    if not resultado['ok']:
+        raise ErrorAPI(ESTADOS[resultado['motivo']], resultado['error'])
+    return 201, resultado['conexion']
+
+
+def eliminar_conexion(app, query, cuerpo, handler):
+    resultado = app.borrar_conexion(handler)
+    if resultado is None:
+        raise ErrorAPI(404, f"No existe la conexión {handler}")
+    return 200, {'handler': handler, 'flows_con_error': [r['name'] for r in resultado['errores']]}
+
+
+def recargar(app, query, cuerpo):
+    path, = _campos(cuerpo, 'path')
+    archivo = _archivo(app, path)
+    try:
+        return 200, app.recargar_archivo(archivo)
+    except OSError as e:
+        raise ErrorAPI(404, str(e))
+    except Exception as e:
+        raise ErrorAPI(400, f"Error al recargar '{path}': {e}")
+
+
+def controladores(app, query, cuerpo):
+    return 200, app.floodlight.estadisticas()
+
+
+def ver_topologia(app, query, cuerpo):
+    return 200, app.topologia.estado()
+
+
+def actualizar_topologia(app, query, cuerpo):
+    try:
+        return 200, app.actualizar_topologia()
+    except Exception as e:
+        raise ErrorAPI(502, f"No se pudo obtener la topología de Floodlight: {e}")
+
+
+def importar(app, query, cuerpo):
+    path, = _campos(cuerpo, 'path')
+    archivo = _archivo(app, path)
+    fusionar, reemplazar = bool(cuerpo.get('fusionar')), bool(cuerpo.get('reemplazar'))
+    if fusionar and reemplazar:
+        raise ErrorAPI(400, "'fusionar' y 'reemplazar' no se pueden combinar")
+    try:
+        if not (fusionar or reemplazar) and app.almacen.hay_conexiones():
+            # Como el menú: con conexiones activas, por defecto solo los cambios
+            conteo = app.recargar_archivo(archivo)
+        else:
+            conteo = app.importar_archivo(archivo, fusionar=fusionar)
+    except OSError as e:
+        raise ErrorAPI(404, str(e))
+    except Exception as e:
+        raise ErrorAPI(400, f"Error al importar '{path}': {e}")
+    return 200, conteo
+
+
+RUTAS = [
+    ("GET", r"/salud", salud),
+    ("GET", r"/cursos", listar_cursos),
+    ("GET", r"/cursos/(?P<codigo>[^/]+)", ver_curso),
+    ("GET", r"/alumnos", listar_alumnos),
+    ("GET", r"/alumnos/(?P<codigo>[^/]+)", ver_alumno),
+    ("GET", r"/alumnos/(?P<codigo>[^/]+)/permisos", permisos_alumno),
+    ("GET", r"/cursos/(?P<codigo>[^/]+)/simulacion", simular_estado),
+    ("GET", r"/servidores", listar_servidores),
+    ("GET", r"/servidores/(?P<nombre>[^/]+)", ver_servidor),
+    ("GET", r"/acceso", verificar_acceso),
+    ("GET", r"/acceso/alumnos", alumnos_con_acceso),
+    ("GET", r"/conexiones", listar_conexiones),
+    ("GET", r"/conexiones/(?P<handler>[^/]+)", ver_conexion),
+    ("POST", r"/conexiones", crear_conexion),
+    ("DELETE", r"/conexiones/(?P<handler>[^/]+)", eliminar_conexion),
+    ("POST", r"/importar", importar),
+    ("POST", r"/recargar", recargar),
+    ("GET", r"/controladores", controladores),
+    ("GET", r"/topologia", ver_topologia),
+    ("POST", r"/topologia/actualizar", actualizar_topologia),
+]
+_RUTAS = [(metodo, re.compile(patron + r"/?$"), funcion) for metodo, patron, funcion in RUTAS]
+
+
+def _cuerpo(crudo):
+    if not crudo:
+        return {}
+    try:
+        cuerpo = json.loads(crudo)
+    except ValueError:
+        raise ErrorAPI(400, "El cuerpo no es JSON válido")
+    if not isinstance(cuerpo, dict):
+        raise ErrorAPI(400, "El cuerpo debe ser un objeto JSON")
+    return cuerpo
+
+
+def resolver(metodo, path):
+    """
+    Devuelve (función, parámetros de la ruta). Lanza ErrorAPI 404/405.
+    """
+    permitidos = False
+    for m, patron, funcion in _RUTAS:
+        encontrado = patron.match(path)
+        if encontrado:
+            if m == metodo:
+                return funcion, {k: unquote(v) for k, v in encontrado.groupdict().items()}
+            permitidos = True
+    if permitidos:
+        raise ErrorAPI(405, f"Método {metodo} no permitido en {path}")
+    raise ErrorAPI(404, f"Ruta no encontrada: {path}")
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    # Cola de aceptación amplia para ráfagas de clientes simultáneos
+    request_queue_size = 128
+
+
+class ServidorAPI:
+    """
+    Servidor HTTP/JSON multihilo. `app` es el módulo principal (main), que
+    aporta el almacén, `estado_lock`, las métricas y las operaciones.
+    """
+
+    def __init__(self, app, host="127.0.0.1", puerto=8000):
+        self.app = app
+        self._servidor = _Servidor((host, puerto), self._manejador())
+        self.host, self.puerto = self._servidor.server_address[:2]
+        self._hilo = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.puerto}"
+
+    def servir(self):
+        """
+        Atiende peticiones en el hilo actual hasta detener().
+        """
+        self._servidor.serve_forever()
+
+    def iniciar(self):
+        """
+        Atiende peticiones en un hilo de fondo.
+        """
+        self._hilo = threading.Thread(target=self.servir, name="api", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._hilo is not None:
+            self._servidor.shutdown()
+            self._hilo.join()
+            self._hilo = None
+        self._servidor.server_close()
+
+    def _manejador(self):
+        app = self.app
+
+        class Manejador(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self._atender("GET")
+
+            def do_POST(self):
+                self._atender("POST")
+
+            def do_DELETE(self):
+                self._atender("DELETE")
+
+            def _atender(self, metodo):
+                partes = urlsplit(self.path)
+                # Leer siempre el cuerpo para no desincronizar la conexión keep-alive
+                crudo = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                if metodo == "GET" and partes.path == "/metrics":
+                    self._responder(200, app.metricas.texto().encode(), TIPO_CONTENIDO)
+                    return
+                try:
+                    funcion, parametros = resolver(metodo, partes.path)
+                    query = {k: v[-1] for k, v in parse_qs(partes.query).items()}
+                    estado, datos = funcion(app, query, _cuerpo(crudo), **parametros)
+                except ErrorAPI as e:
+                    estado, datos = e.estado, {'error': str(e)}
+                except Exception as e:
+                    estado, datos = 500, {'error': f"Error interno: {e}"}
+                self._responder(estado, json.dumps(datos, ensure_ascii=False).encode(),
+                                "application/json; charset=utf-8")
+
+            def _responder(self, estado, cuerpo, tipo):
+                self.send_response(estado)
+                self.send_header("Content-Type", tipo)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        return Manejador
@@ -0,0 +1,204 @@
+# ===== Benchmark del gestor de políticas =====
+# Mide importación, chequeos de autorización, push/delete de flows contra un
+# Floodlight falso local y memoria por alumno. Escribe los resultados en JSON
+# para comparar versiones:
+#
+#   python -m bench.benchmark --alumnos 20000 --cursos 300 --salida bench.json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from bench import datos_sinteticos  # noqa: E402
+from bench.floodlight_falso import FloodlightFalso  # noqa: E402
+from floodlight import FloodlightClient  # noqa: E402
+from cola import ColaFlows  # noqa: E402
+
+
+def percentil(valores, p):
+    if not valores:
+        return 0.0
+    ordenados = sorted(valores)
+    k = min(len(ordenados) - 1, max(0, int(round(p / 100 * (len(ordenados) - 1)))))
+    return ordenados[k]
+
+
+def medir_importacion(path):
+    # Tiempo sin tracemalloc (lo ralentiza); la memoria se mide en otra pasada
+    main.almacen.limpiar()
+    inicio = time.perf_counter()
+    conteo = main.importar_archivo(path)
+    segundos = time.perf_counter() - inicio
+
+    main.almacen.limpiar()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    main.importar_archivo(path)
+    despues, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'segundos': segundos,
+        'alumnos': conteo['alumnos'],
+        'cursos': conteo['cursos'],
+        'servidores': conteo['servidores'],
+        'libyaml': conteo['libyaml'],
+        'bytes_por_alumno': (despues - antes) / max(1, conteo['alumnos']),
+        'pico_bytes': pico,
+    }
+
+
+def medir_autorizacion(n_consultas, semilla=1):
+    rnd = random.Random(semilla)
+    alumnos = list(main.almacen.alumno_por_codigo)
+    claves = list(main.almacen.servicio_por_clave)
+    consultas = [(rnd.choice(alumnos), *rnd.choice(claves)) for _ in range(n_consultas)]
+    permitidas = 0
+    # alumno_puede_conectarse imprime cada rechazo: se descarta la salida
+    with contextlib.redirect_stdout(io.StringIO()):
+        inicio = time.perf_counter()
+        for c in consultas:
+            permitidas += main.alumno_puede_conectarse(*c)
+        segundos = time.perf_counter() - inicio
+    return {
+        'consultas': n_consultas,
+        'permitidas': permitidas,
+        'segundos': segundos,
+        'por_segundo': n_consultas / segundos if segundos else 0.0,
+    }
+
+
+def _flows(n):
+    return [main.build_flow(f"{i:08x}", "00:00:00:00:00:00:00:01", "02:00:00:00:00:01", "10.0.0.3",
+                            "02:00:00:00:00:01", "10.0.0.3", 22, 2, sentido="fw") for i in range(n)]
+
+
+def medir_flows(url, n_flows, hilos):
+    """
+    Latencia individual (secuencial), throughput en lote de push/delete y
+    throughput de la cola de flows (tiempo de encolar y de vaciarla).
+    """
+    resultados = {}
+    flows = _flows(n_flows)
+    with FloodlightClient(url, max_workers=hilos) as cliente:
+        for nombre, operacion, items in (("push_flow", cliente.push_flow, flows),
+                                         ("delete_flow", cliente.delete_flow, [f['name'] for f in flows])):
+            latencias, errores = [], 0
+            for item in items:
+                t = time.perf_counter()
+                errores += not operacion(item)['ok']
+                latencias.append(time.perf_counter() - t)
+            resultados[nombre] = {
+                'n': len(items),
+                'errores': errores,
+                'p50_ms': percentil(latencias, 50) * 1000,
+                'p99_ms': percentil(latencias, 99) * 1000,
+                'media_ms': statistics.fmean(latencias) * 1000,
+                'flows_por_segundo': len(items) / sum(latencias),
+            }
+        for nombre, operacion, items in (("push_flows", cliente.push_flows, flows),
+                                         ("delete_flows", cliente.delete_flows, [f['name'] for f in flows])):
+            t = time.perf_counter()
+            errores = sum(not r['ok'] for r in operacion(items))
+            segundos = time.perf_counter() - t
+            resultados[nombre] = {
+                'n': len(items),
+                'hilos': hilos,
+                'errores': errores,
+                'segundos': segundos,
+                'flows_por_segundo': len(items) / segundos,
+            }
+        cola = ColaFlows(cliente)
+        for nombre, encolar, items in (("cola_push", cola.encolar_push, flows),
+                                       ("cola_delete", cola.encolar_delete, [f['name'] for f in flows])):
+            t = time.perf_counter()
+            operaciones = encolar(items)
+            encolado = time.perf_counter() - t
+            cola.esperar()
+            segundos = time.perf_counter() - t
+            resultados[nombre] = {
+                'n': len(items),
+                'hilos': hilos,
+                'errores': sum(not o.resultado['ok'] for o in operaciones),
+                'encolar_ms': encolado * 1000,
+                'segundos': segundos,
+                'flows_por_segundo': len(items) / segundos,
+            }
+        cola.detener()
+    return resultados
+
+
+def version():
+    try:
+        return subprocess.run(["git", "describe", "--always", "--dirty"], capture_output=True,
+                              text=True, cwd=os.path.dirname(os.path.abspath(main.__file__))).stdout.strip()
+    except OSError:
+        return None
+
+
+def ejecutar(args):
+    resultados = {
+        'version': version(),
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'parametros': vars(args),
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "datos.yaml")
+        datos_sinteticos.escribir(path, datos_sinteticos.generar(args.alumnos, args.cursos, args.servidores,
+                                                                 args.por_curso))
+        resultados['importacion'] = medir_importacion(path)
+    resultados['autorizacion'] = medir_autorizacion(args.consultas)
+    with FloodlightFalso(latencia=args.latencia_ms / 1000, tasa_error=args.tasa_error) as falso:
+        resultados['flows'] = medir_flows(falso.url, args.flows, args.hilos)
+    return resultados
+
+
+def imprimir(r):
+    imp, aut = r['importacion'], r['autorizacion']
+    print(f"Importación: {imp['alumnos']} alumnos, {imp['cursos']} cursos en {imp['segundos']:.3f}s "
+          f"({imp['bytes_por_alumno']:.0f} B/alumno, libyaml={imp['libyaml']})")
+    print(f"Autorización: {aut['por_segundo']:,.0f} chequeos/s ({aut['permitidas']}/{aut['consultas']} permitidas)")
+    for nombre, m in r['flows'].items():
+        if 'p50_ms' in m:
+            print(f"{nombre}: p50 {m['p50_ms']:.2f} ms, p99 {m['p99_ms']:.2f} ms, "
+                  f"{m['flows_por_segundo']:.0f} flows/s, {m['errores']} errores")
+        else:
+            print(f"{nombre}: {m['flows_por_segundo']:.0f} flows/s con {m['hilos']} hilos, {m['errores']} errores"
+                  + (f" (encolar {m['encolar_ms']:.1f} ms)" if 'encolar_ms' in m else ""))
+
+
+def parsear(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark del gestor de políticas contra un Floodlight falso")
+    parser.add_argument("--alumnos", type=int, default=10000)
+    parser.add_argument("--cursos", type=int, default=200)
+    parser.add_argument("--servidores", type=int, default=10)
+    parser.add_argument("--por-curso", type=int, default=40)
+    parser.add_argument("--consultas", type=int, default=100000)
+    parser.add_argument("--flows", type=int, default=500)
+    parser.add_argument("--hilos", type=int, default=8)
+    parser.add_argument("--latencia-ms", type=float, default=1.0)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    parser.add_argument("--salida", default="bench_resultados.json")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parsear()
+    resultados = ejecutar(args)
+    imprimir(resultados)
+    with open(args.salida, 'w') as f:
+        json.dump(resultados, f, indent=2)
+    print(f"✔ Resultados guardados en '{args.salida}'.")
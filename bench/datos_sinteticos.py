@@ -0,0 +1,60 @@
+# ===== Generador de datos sintéticos =====
+# Crea un YAML con el mismo formato que datos.yaml: N alumnos, M cursos y
+# K servidores, con inscripciones y permisos aleatorios reproducibles.
+
+import argparse
+import random
+
+SERVICIOS = [("ssh", "TCP", 22), ("web", "TCP", 80), ("ftp", "TCP", 21), ("db", "TCP", 5432)]
+
+
+def generar(n_alumnos, n_cursos, n_servidores, alumnos_por_curso=40, semilla=354):
+    """
+    Devuelve un dict listo para yaml.dump con alumnos, cursos y servidores.
+    """
+    rnd = random.Random(semilla)
+    alumnos = [{
+        'nombre': f"Alumno {i}",
+        'codigo': 20000000 + i,
+        'mac': "02:" + ":".join(f"{(i >> s) & 0xff:02x}" for s in (32, 24, 16, 8, 0)),
+    } for i in range(n_alumnos)]
+    servidores = [{
+        'nombre': f"Servidor {k + 1}",
+        'ip': f"10.{(k >> 8) & 0xff}.{k & 0xff}.3",
+        'servicios': [{'nombre': n, 'protocolo': p, 'puerto': pt} for n, p, pt in SERVICIOS],
+    } for k in range(n_servidores)]
+    cursos = []
+    for j in range(n_cursos):
+        inscritos = rnd.sample(range(n_alumnos), min(alumnos_por_curso, n_alumnos))
+        permitidos = rnd.sample(servidores, min(2, n_servidores))
+        cursos.append({
+            'codigo': f"TEL{j:04d}",
+            'estado': "DICTANDO" if rnd.random() < 0.8 else "INACTIVO",
+            'nombre': f"Curso {j}",
+            'alumnos': [20000000 + i for i in inscritos],
+            'servidores': [{'nombre': s['nombre'],
+                            'servicios_permitidos': [n for n, _, _ in rnd.sample(SERVICIOS, 2)]}
+                           for s in permitidos],
+        })
+    return {'alumnos': alumnos, 'cursos': cursos, 'servidores': servidores}
+
+
+def escribir(path, datos):
+    import yaml
+    try:
+        from yaml import CSafeDumper as Dumper
+    except ImportError:
+        from yaml import SafeDumper as Dumper
+    with open(path, 'w') as f:
+        yaml.dump(datos, f, Dumper=Dumper, sort_keys=False)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Genera un YAML sintético con el formato de datos.yaml")
+    parser.add_argument("salida")
+    parser.add_argument("--alumnos", type=int, default=10000)
+    parser.add_argument("--cursos", type=int, default=200)
+    parser.add_argument("--servidores", type=int, default=10)
+    parser.add_argument("--por-curso", type=int, default=40)
+    args = parser.parse_args()
+    escribir(args.salida, generar(args.alumnos, args.cursos, args.servidores, args.por_curso))
@@ -0,0 +1,160 @@
+# ===== Floodlight falso para benchmarks =====
+# Servidor HTTP local que imita el Static Flow Pusher (y los endpoints de
+# lectura que usa el programa) con latencia y tasa de errores configurables.
+
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PUSHER_PATH = "/wm/staticflowpusher/json"
+LIST_PATH = "/wm/staticflowpusher/list/all/json"
+# Como Floodlight: un flow enviado sin "cookie" queda solo con el AppCookie
+# del Static Flow Pusher, el mismo para todos
+COOKIE_ESTATICA = 10 << 52
+
+
+class _Servidor(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128
+
+
+class FloodlightFalso:
+    """
+    Servidor en un hilo propio. `latencia` en segundos por petición,
+    `tasa_error` en [0, 1] (responde 500). Guarda los flows instalados;
+    `paquetes[nombre]` es el contador que informan las estadísticas.
+    """
+
+    def __init__(self, host="127.0.0.1", puerto=0, latencia=0.0, tasa_error=0.0,
+                 dispositivos=None, switches=None, enlaces=None):
+        self.latencia = latencia
+        self.tasa_error = tasa_error
+        self.flows = {}
+        self.paquetes = {}
+        self._instalado = {}  # nombre -> instante del push
+        self.dispositivos = dispositivos or []
+        self.switches = switches or []
+        self.enlaces = enlaces or []
+        self.peticiones = 0
+        self._lock = threading.Lock()
+        self.servidor = _Servidor((host, puerto), _crear_handler(self))
+        self._hilo = None
+
+    @property
+    def url(self):
+        host, puerto = self.servidor.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def iniciar(self):
+        self._hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self._hilo.start()
+        return self
+
+    def detener(self):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+
+    def __enter__(self):
+        return self.iniciar()
+
+    def __exit__(self, *exc):
+        self.detener()
+
+    def _responder(self, metodo, path, cuerpo):
+        with self._lock:
+            self.peticiones += 1
+        if self.latencia:
+            time.sleep(self.latencia)
+        if metodo in ("POST", "DELETE") and self.tasa_error and random.random() < self.tasa_error:
+            return 500, {"status": "Error simulado"}
+        if path == PUSHER_PATH and metodo == "POST":
+            with self._lock:
+                self.flows[cuerpo["name"]] = cuerpo
+                self._instalado[cuerpo["name"]] = time.monotonic()
+            return 200, {"status": "Entry pushed"}
+        if path == PUSHER_PATH and metodo == "DELETE":
+            with self._lock:
+                self.flows.pop(cuerpo.get("name"), None)
+            return 200, {"status": "Entry " + str(cuerpo.get("name")) + " deleted"}
+        if metodo == "GET" and path == LIST_PATH:
+            return 200, self._listar()
+        if metodo == "GET" and path.startswith("/wm/device"):
+            return 200, {"devices": self.dispositivos}
+        if metodo == "GET" and path == "/wm/core/controller/switches/json":
+            return 200, self.switches
+        if metodo == "GET" and path == "/wm/topology/links/json":
+            return 200, self.enlaces
+        if metodo == "GET" and path.startswith("/wm/core/switch/") and path.endswith("/flow/json"):
+            return 200, self._estadisticas(path.split("/")[4])
+        return 404, {"status": "not found"}
+
+    def _listar(self):
+        por_switch = {}
+        with self._lock:
+            flows = list(self.flows.values())
+        for f in flows:
+            match = {k: v for k, v in f.items()
+                     if k not in ("switch", "name", "priority", "active", "actions", "cookie")}
+            por_switch.setdefault(f["switch"], []).append({f["name"]: {
+                "cookie": str(f.get("cookie", COOKIE_ESTATICA)),
+                "priority": f.get("priority"),
+                "match": match,
+                "instructions": {"instruction_apply_actions": {"actions": f.get("actions", "")}},
+            }})
+        return por_switch
+
+    def _estadisticas(self, dpid):
+        ahora = time.monotonic()
+        with self._lock:
+            flows = [f for f in self.flows.values() if f["switch"] == dpid]
+            return {"flows": [{
+                "cookie": str(f.get("cookie", COOKIE_ESTATICA)),
+                "packetCount": str(self.paquetes.get(f["name"], 0)),
+                "byteCount": str(64 * self.paquetes.get(f["name"], 0)),
+                "durationSeconds": str(int(ahora - self._instalado.get(f["name"], ahora))),
+                "priority": f.get("priority"),
+            } for f in flows]}
+
+
+def _crear_handler(falso):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Cabeceras y cuerpo van en escrituras separadas: sin esto, Nagle +
+        # delayed ACK agregan ~40 ms a cada petición keep-alive
+        disable_nagle_algorithm = True
+
+        def _atender(self):
+            largo = int(self.headers.get("Content-Length") or 0)
+            cuerpo = json.loads(self.rfile.read(largo) or b"{}") if largo else {}
+            estado, datos = falso._responder(self.command, self.path, cuerpo)
+            payload = json.dumps(datos).encode()
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        do_GET = do_POST = do_DELETE = _atender
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Floodlight falso (Static Flow Pusher) para pruebas de carga")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8080)
+    parser.add_argument("--latencia-ms", type=float, default=0.0)
+    parser.add_argument("--tasa-error", type=float, default=0.0)
+    args = parser.parse_args()
+    falso = FloodlightFalso(args.host, args.puerto, args.latencia_ms / 1000, args.tasa_error)
+    print(f"Floodlight falso escuchando en {falso.url}")
+    try:
+        falso.servidor.serve_forever()
+    except KeyboardInterrupt:
+        pass
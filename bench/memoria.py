@@ -0,0 +1,96 @@
+# ===== Benchmark de memoria =====
+# Importa un conjunto sintético y mide la memoria retenida por alumno
+# (tracemalloc) y los objetos que sigue el recolector de basura, para
+# comparar representaciones del almacén entre versiones:
+#
+#   python -m bench.memoria --alumnos 200000 --cursos 2000 --salida memoria.json
+#   python -m bench.memoria --alumnos 200000 --cursos 2000 --comparar memoria.json
+
+import argparse
+import gc
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+from bench import datos_sinteticos  # noqa: E402
+from bench.benchmark import version  # noqa: E402
+
+
+def medir(path):
+    main.almacen.limpiar()
+    gc.collect()
+    objetos_antes = len(gc.get_objects())
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    conteo = main.importar_archivo(path)
+    gc.collect()
+    despues, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    objetos = len(gc.get_objects()) - objetos_antes
+
+    # Recolección completa con el almacén cargado (costo de GC por tamaño del heap)
+    inicio = time.perf_counter()
+    gc.collect()
+    segundos_gc = time.perf_counter() - inicio
+
+    n = max(1, conteo['alumnos'])
+    return {
+        'alumnos': conteo['alumnos'],
+        'cursos': conteo['cursos'],
+        'bytes': despues - antes,
+        'bytes_por_alumno': (despues - antes) / n,
+        'pico_bytes': pico,
+        'objetos_gc': objetos,
+        'objetos_gc_por_alumno': objetos / n,
+        'segundos_gc_completo': segundos_gc,
+    }
+
+
+def imprimir(r, referencia=None):
+    filas = [("Bytes por alumno", 'bytes_por_alumno', "{:,.0f}"),
+             ("Memoria retenida", 'bytes', "{:,.0f} B"),
+             ("Pico durante la importación", 'pico_bytes', "{:,.0f} B"),
+             ("Objetos seguidos por el GC por alumno", 'objetos_gc_por_alumno', "{:.2f}"),
+             ("gc.collect() completo", 'segundos_gc_completo', "{:.3f} s")]
+    print(f"{r['alumnos']} alumnos, {r['cursos']} cursos ({r.get('version')})")
+    for titulo, clave, formato in filas:
+        linea = f"  {titulo}: {formato.format(r[clave])}"
+        if referencia and referencia.get(clave):
+            linea += f"  (antes {formato.format(referencia[clave])}, {r[clave] / referencia[clave]:.0%})"
+        print(linea)
+
+
+def parsear(argv=None):
+    parser = argparse.ArgumentParser(description="Memoria por alumno del almacén")
+    parser.add_argument("--alumnos", type=int, default=100000)
+    parser.add_argument("--cursos", type=int, default=1000)
+    parser.add_argument("--servidores", type=int, default=20)
+    parser.add_argument("--por-curso", type=int, default=120)
+    parser.add_argument("--salida", help="Guardar el resultado en JSON")
+    parser.add_argument("--comparar", help="JSON de una ejecución anterior para comparar")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parsear()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "datos.yaml")
+        datos_sinteticos.escribir(path, datos_sinteticos.generar(args.alumnos, args.cursos, args.servidores,
+                                                                 args.por_curso))
+        resultado = medir(path)
+    resultado['version'] = version()
+    referencia = None
+    if args.comparar:
+        with open(args.comparar) as f:
+            referencia = json.load(f)
+    imprimir(resultado, referencia)
+    if args.salida:
+        with open(args.salida, 'w') as f:
+            json.dump(resultado, f, indent=2)
+        print(f"✔ Resultado guardado en '{args.salida}'.")
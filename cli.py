@@ -0,0 +1,204 @@
+# ===== Línea de comandos =====
+# Subcomandos no interactivos para scripts y cron: cada uno abre el registro,
+# restaura el snapshot, hace una sola operación e imprime el resultado en
+# JSON por la salida estándar (los mensajes del programa van a stderr). Sin
+# subcomando, o con `menu`, se abre el menú interactivo.
+#
+#   python main.py check-access 20012482 "Servidor 1" ssh
+#   python main.py connect 20012482 "Servidor 1" ssh --dpid 00:00:00:00:00:00:00:01 --puerto 3
+#   python main.py list conexiones --alumno 20012482
+#   python main.py import datos.yaml            (con conexiones: aplica solo los cambios)
+#   python main.py import datos.yaml --reemplazar
+#
+# Código de salida: 0 si la operación se hizo (o el acceso está permitido),
+# 1 si fue rechazada o falló, 2 si los argumentos no son válidos.
+
+import argparse
+import contextlib
+import json
+import sys
+
+OK, FALLO = 0, 1
+
+
+# ----- Comandos -----
+def importar(app, args):
+    if args.path.endswith(".snap"):
+        if not app.importar_snapshot(args.path):
+            return FALLO, {'error': f"No se pudo cargar el snapshot '{args.path}'"}
+        return OK, {'path': args.path, 'alumnos': len(app.almacen.alumno_por_codigo),
+                    'cursos': len(app.almacen.curso_por_codigo), 'servidores': len(app.almacen.servidor_por_nombre)}
+    if not (args.fusionar or args.reemplazar) and app.almacen.hay_conexiones():
+        # Como el menú: con conexiones activas, por defecto solo los cambios
+        return OK, dict(app.recargar_archivo(args.path), path=args.path, modo="cambios")
+    conteo = app.importar_archivo(args.path, fusionar=args.fusionar)
+    return OK, dict(conteo, path=args.path, modo="fusionar" if args.fusionar else "reemplazar")
+
+
+def recargar(app, args):
+    return OK, dict(app.recargar_archivo(args.path), path=args.path)
+
+
+def exportar(app, args):
+    if args.path.endswith(".snap"):
+        if not app.exportar_snapshot(args.path):
+            return FALLO, {'error': f"No se pudo guardar el snapshot '{args.path}'"}
+    else:
+        app.exportar_archivo(args.path)
+    return OK, {'path': args.path}
+
+
+def check_access(app, args):
+    permitido = app.autorizar(args.alumno, args.servidor, args.servicio)
+    return OK if permitido else FALLO, {'alumno': args.alumno, 'servidor': args.servidor,
+                                        'servicio': args.servicio, 'permitido': permitido}
+
+
+def connect(app, args):
+    resultado = app.crear_conexion(args.alumno, args.servidor, args.servicio, dpid=args.dpid,
+                                   puerto=args.puerto, dpid_alumno=args.dpid_alumno,
+                                   puerto_alumno=args.puerto_alumno)
+    return OK if resultado['ok'] else FALLO, resultado
+
+
+def disconnect(app, args):
+    resultado = app.borrar_conexion(args.handler)
+    if resultado is None:
+        return FALLO, {'error': f"No existe la conexión {args.handler}"}
+    return OK if not resultado['errores'] else FALLO, {
+        'handler': args.handler, 'flows_con_error': [r['name'] for r in resultado['errores']]}
+
+
+def listar(app, args):
+    almacen = app.almacen
+    if args.tipo == "conexiones":
+        filtros = {k: v for k, v in (('alumno', args.alumno), ('servidor', args.servidor),
+                                     ('servicio', args.servicio)) if v}
+        siguiente = None
+        if args.tam:
+            conexiones, siguiente = almacen.registro.listar(args.despues, args.tam, **filtros)
+        else:
+            conexiones = almacen.registro.todas(**filtros)
+        return OK, {'total': almacen.registro.contar(**filtros), 'conexiones': conexiones,
+                    'siguiente': siguiente}
+    if args.tipo == "alumnos":
+        alumnos = almacen.alumnos_de_curso(args.curso) if args.curso else almacen.alumnos
+        return OK, [a.como_dict() for a in alumnos]
+    if args.tipo == "cursos":
+        return OK, [c.como_dict() for c in almacen.cursos]
+    return OK, [s.como_dict() for s in almacen.servidores]
+
+
+def reconcile(app, args):
+    plan = app.planificar_reconciliacion()
+    datos = {
+        'correctos': plan['correctos'],
+        'faltantes': [f['name'] for f in plan['faltantes']],
+        'cambiados': [f['name'] for f in plan['cambiados']],
+        'obsoletos': plan['obsoletos'],
+        'conservados': plan['conservados'],
+        'aplicado': False,
+    }
+    if not args.aplicar:
+        return OK, datos
+    errores = app.aplicar_reconciliacion(plan)
+    datos.update(aplicado=True, errores=[{'name': r['name'], 'error': r['error']} for r in errores])
+    return OK if not errores else FALLO, datos
+
+
+# ----- Argumentos -----
+def parsear(argv=None):
+    parser = argparse.ArgumentParser(description="Network Policy Manager - UPSM")
+    comandos = parser.add_subparsers(dest="comando")
+
+    comandos.add_parser("menu", help="Menú interactivo (por defecto)")
+    p = comandos.add_parser("api", help="Servir la API REST (modo daemon)")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--puerto", type=int, default=8000)
+
+    p = comandos.add_parser("import", aliases=["importar"], help="Importar un YAML o snapshot")
+    p.add_argument("path")
+    modo = p.add_mutually_exclusive_group()
+    modo.add_argument("--fusionar", action="store_true", help="Agregar/actualizar sin bajas y conservar las conexiones")
+    modo.add_argument("--reemplazar", action="store_true",
+                      help="Reemplazar todo: se descartan las conexiones y se retiran sus flows")
+    p.set_defaults(funcion=importar, guardar=True)
+
+    p = comandos.add_parser("reload", aliases=["recargar"], help="Aplicar solo los cambios de un YAML o snapshot")
+    p.add_argument("path")
+    p.set_defaults(funcion=recargar, guardar=True)
+
+    p = comandos.add_parser("watch", aliases=["vigilar"], help="Vigilar un YAML o snapshot y aplicar sus cambios")
+    p.add_argument("path")
+
+    p = comandos.add_parser("export", aliases=["exportar"], help="Exportar a YAML (o snapshot si termina en .snap)")
+    p.add_argument("path")
+    p.set_defaults(funcion=exportar)
+
+    p = comandos.add_parser("check-access", aliases=["acceso"], help="Verificar si un alumno puede acceder a un servicio")
+    _tupla(p)
+    p.set_defaults(funcion=check_access)
+
+    p = comandos.add_parser("connect", aliases=["conectar"], help="Crear una conexión e instalar sus flows")
+    _tupla(p)
+    p.add_argument("--dpid", help="Switch del servidor (si el controlador no lo ubica)")
+    p.add_argument("--puerto", help="Puerto del servidor en ese switch")
+    p.add_argument("--dpid-alumno")
+    p.add_argument("--puerto-alumno")
+    p.set_defaults(funcion=connect)
+
+    p = comandos.add_parser("disconnect", aliases=["desconectar"], help="Eliminar una conexión y sus flows")
+    p.add_argument("handler")
+    p.set_defaults(funcion=disconnect)
+
+    p = comandos.add_parser("list", aliases=["listar"], help="Listar conexiones, alumnos, cursos o servidores")
+    p.add_argument("tipo", nargs="?", default="conexiones", choices=("conexiones", "alumnos", "cursos", "servidores"))
+    p.add_argument("--alumno")
+    p.add_argument("--servidor")
+    p.add_argument("--servicio")
+    p.add_argument("--curso", help="Solo los alumnos de este curso")
+    p.add_argument("--despues", type=int, default=0, help="Cursor: el 'siguiente' de la página anterior")
+    p.add_argument("--tam", type=int, default=0, help="Conexiones por página (0 = todas)")
+    p.set_defaults(funcion=listar)
+
+    p = comandos.add_parser("reconcile", aliases=["reconciliar"], help="Comparar los flows con el controlador")
+    p.add_argument("--aplicar", action="store_true", help="Aplicar el delta además de mostrarlo")
+    p.set_defaults(funcion=reconcile)
+
+    parser.set_defaults(funcion=None, guardar=False)
+    return parser.parse_args(argv)
+
+
+def _tupla(parser):
+    parser.add_argument("alumno")
+    parser.add_argument("servidor")
+    parser.add_argument("servicio")
+
+
+def ejecutar(app, argv=None):
+    """
+    Punto de entrada de main.py. `app` es el módulo principal. Devuelve el
+    código de salida.
+    """
+    args = parsear(argv)
+    if args.comando == "api":
+        app.servir_api(args.host, args.puerto)
+        return OK
+    if args.comando in ("watch", "vigilar"):
+        app.vigilar(args.path)
+        return OK
+    if args.funcion is None:
+        app.main()
+        return OK
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            app.iniciar(refresco=False)
+            codigo, datos = args.funcion(app, args)
+            if args.guardar and codigo == OK:
+                app.exportar_snapshot(app.SNAPSHOT_PATH)
+        except Exception as e:
+            codigo, datos = FALLO, {'error': str(e)}
+        finally:
+            app.cerrar()
+    print(json.dumps(datos, ensure_ascii=False, indent=2))
+    return codigo
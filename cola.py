@@ -0,0 +1,364 @@
+# ===== Cola de operaciones de flows =====
+# Cola en segundo plano entre el programa y el controlador. Las operaciones
+# (push/delete) se indexan por nombre de flow: una operación nueva sobre un
+# flow pendiente reemplaza a la anterior, y un push de un flow nuevo seguido
+# de su delete se cancelan sin llegar al controlador. Un hilo las despacha
+# en paralelo al pool de su destino (el controlador del switch), con un cupo
+# de envíos por destino y un solo envío en curso por flow; reintenta con
+# backoff exponencial los errores de conexión y 5xx, y `encolar` se bloquea
+# cuando la cola está llena (contrapresión).
+
+import heapq
+import itertools
+import random
+import threading
+import time
+from collections import deque
+
+PUSH = "push"
+DELETE = "delete"
+
+
+class Operacion:
+    """
+    Operación pendiente sobre un flow. `nuevo` indica que el flow nunca se
+    envió al controlador (un delete posterior la cancela sin más).
+    """
+    __slots__ = ('tipo', 'nombre', 'flow', 'nuevo', 'intentos', 'listo_en', 'encolada', 'esperas', 'resultado',
+                 'avisos', '_hecha')
+
+    def __init__(self, tipo, nombre, flow=None, nuevo=False):
+        self.tipo = tipo
+        self.nombre = nombre
+        self.flow = flow
+        self.nuevo = nuevo
+        self.intentos = 0
+        self.listo_en = 0.0
+        self.encolada = time.perf_counter()
+        self.esperas = []  # operaciones reemplazadas que terminan con esta
+        self.resultado = None
+        self.avisos = []  # funciones sin argumentos a llamar al terminar (con el lock de la cola)
+        self._hecha = threading.Event()
+
+    def esperar(self, timeout=None):
+        """
+        Resultado (dict con name, ok, status y error) o None si vence el timeout.
+        """
+        self._hecha.wait(timeout)
+        return self.resultado
+
+    def _terminar(self, resultado):
+        self.resultado = resultado
+        self._hecha.set()
+        for o in self.esperas:
+            o._terminar(dict(resultado, name=o.nombre))
+        for aviso in self.avisos:
+            aviso()
+
+
+def _combinada(nombre):
+    return {"name": nombre, "ok": True, "status": None, "error": None, "combinada": True}
+
+
+class ColaFlows:
+    """
+    Cola de push/delete de flows hacia `cliente` (FloodlightClient o
+    Controladores, que indica el destino de cada operación con `ruta`).
+    `push_flows`/`delete_flows` esperan los resultados (misma interfaz que el
+    cliente); `encolar_push`/`encolar_delete` devuelven enseguida y pueden
+    avisar con `al_terminar` cuando termina el lote. Las operaciones que
+    fallan definitivamente quedan en `fallidos`.
+    """
+
+    def __init__(self, cliente, max_en_vuelo=None, ventana=0.01, max_pendientes=5000, max_intentos=5,
+                 espera_inicial=0.5, espera_maxima=30.0, metricas=None):
+        self.cliente = cliente
+        # Envíos simultáneos por destino; por defecto el doble de sus hilos
+        # para no dejarlos ociosos
+        self.max_en_vuelo = max_en_vuelo
+        # Segundos que una operación espera en cola para poder combinarse con otras
+        self.ventana = ventana
+        self.max_pendientes = max_pendientes
+        self.max_intentos = max_intentos
+        self.espera_inicial = espera_inicial
+        self.espera_maxima = espera_maxima
+        self.fallidos = deque(maxlen=100)
+        self.sin_revisar = 0
+        self._pendientes = {}  # nombre -> Operacion sin enviar (una por flow)
+        self._fifo = deque()  # pendientes en orden de llegada
+        self._reintentos = []  # heap (listo_en, n, Operacion) de las que esperan backoff
+        self._bloqueadas = {}  # destino -> deque de pendientes sin lugar en ese destino
+        self._ocupados = {}  # destino -> envíos en curso
+        self._secuencia = itertools.count()
+        self._en_vuelo = set()  # nombres enviados y sin respuesta
+        self._cond = threading.Condition()
+        self._hilo = None
+        self._detenida = False
+        self._conteo = self._espera = None
+        if metricas is not None:
+            metricas.indicador("cola_flows_pendientes", "Operaciones de flows en cola o en curso",
+                               lambda: self.profundidad)
+            self._conteo = metricas.contador("cola_flows_operaciones_total",
+                                             "Operaciones de la cola de flows por tipo y resultado")
+            self._espera = metricas.histograma("cola_flows_espera_seconds",
+                                               "Tiempo desde que se encola una operación hasta que termina")
+
+    # ----- Estado -----
+    @property
+    def profundidad(self):
+        return len(self._pendientes) + len(self._en_vuelo)
+
+    def estado(self):
+        with self._cond:
+            ahora = time.monotonic()
+            return {
+                'pendientes': len(self._pendientes),
+                'en_vuelo': len(self._en_vuelo),
+                'reintentando': sum(1 for o in self._pendientes.values() if o.listo_en > ahora),
+                'fallidos': len(self.fallidos),
+            }
+
+    # ----- Encolar -----
+    def encolar_push(self, flows, nuevo=False, timeout=None, al_terminar=None):
+        """
+        Encola la instalación de `flows`. Con nuevo=True los flows no existen
+        aún en el controlador (p. ej. los de una conexión recién creada).
+        `al_terminar(resultados)` se llama en un hilo aparte cuando terminan
+        todas (con éxito, combinadas o con error). Devuelve las operaciones,
+        o None si vence `timeout` esperando lugar.
+        """
+        return self._encolar([Operacion(PUSH, f['name'], f, nuevo) for f in flows], timeout, al_terminar)
+
+    def encolar_delete(self, nombres, timeout=None, al_terminar=None):
+        return self._encolar([Operacion(DELETE, n) for n in nombres], timeout, al_terminar)
+
+    def push_flows(self, flows):
+        return [o.esperar() for o in self.encolar_push(flows)]
+
+    def delete_flows(self, nombres):
+        return [o.esperar() for o in self.encolar_delete(nombres)]
+
+    def _encolar(self, operaciones, timeout, al_terminar=None):
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            if al_terminar is not None:
+                self._avisar(operaciones, al_terminar)
+            self._asegurar_hilo()
+            for op in operaciones:
+                # Contrapresión: solo ocupan lugar las operaciones sobre flows no pendientes
+                while op.nombre not in self._pendientes and len(self._pendientes) >= self.max_pendientes:
+                    restante = None if limite is None else limite - time.monotonic()
+                    if restante is not None and restante <= 0:
+                        return None
+                    self._cond.wait(restante)
+                self._agregar(op)
+            self._cond.notify_all()
+        return operaciones
+
+    def _avisar(self, operaciones, al_terminar):
+        """
+        Cuenta las operaciones que terminan (con el lock tomado) y, con la
+        última, llama a `al_terminar` fuera del lock, en su propio hilo, para
+        que pueda volver a encolar o tomar otros locks.
+        """
+        faltan = [len(operaciones)]
+
+        def aviso():
+            faltan[0] -= 1
+            if faltan[0] == 0:
+                threading.Thread(target=al_terminar, args=([o.resultado for o in operaciones],),
+                                 name="cola-aviso", daemon=True).start()
+        for op in operaciones:
+            op.avisos.append(aviso)
+        if not operaciones:
+            faltan[0] = 1
+            aviso()
+
+    def _agregar(self, op):
+        anterior = self._pendientes.pop(op.nombre, None)
+        if anterior is None:
+            if op.nombre in self._en_vuelo:
+                op.nuevo = False  # el envío en curso puede llegar al controlador
+            self._pendientes[op.nombre] = op
+            self._fifo.append(op)
+            return
+        self._contar(anterior.tipo, "combinada")
+        if op.tipo == DELETE and anterior.tipo == PUSH and anterior.nuevo:
+            # El flow nunca llegó al controlador: ambas operaciones se anulan
+            self._contar(op.tipo, "combinada")
+            anterior._terminar(_combinada(anterior.nombre))
+            op._terminar(_combinada(op.nombre))
+            return
+        # La operación nueva reemplaza a la pendiente (push sobreescribe, delete borra)
+        op.nuevo = op.tipo == PUSH and anterior.nuevo
+        op.esperas.append(anterior)
+        self._pendientes[op.nombre] = op
+        self._fifo.append(op)
+
+    def esperar(self, timeout=None):
+        """
+        Espera a que la cola se vacíe. Devuelve False si vence el timeout.
+        """
+        limite = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self.profundidad:
+                restante = None if limite is None else limite - time.monotonic()
+                if restante is not None and restante <= 0:
+                    return False
+                self._cond.wait(restante)
+        return True
+
+    def detener(self, timeout=None):
+        """
+        Vacía la cola (hasta `timeout` segundos) y detiene el hilo.
+        Devuelve la cantidad de operaciones que quedaron sin enviar.
+        """
+        self.esperar(timeout)
+        with self._cond:
+            self._detenida = True
+            self._cond.notify_all()
+        if self._hilo is not None:
+            self._hilo.join()
+            self._hilo = None
+        with self._cond:
+            self._detenida = False
+            return len(self._pendientes)
+
+    def revisar_fallidos(self):
+        """
+        Operaciones fallidas desde la última revisión (la más reciente al final).
+        """
+        with self._cond:
+            nuevas = list(self.fallidos)[-self.sin_revisar:] if self.sin_revisar else []
+            self.sin_revisar = 0
+        return nuevas
+
+    # ----- Hilo de envío -----
+    def _asegurar_hilo(self):
+        if self._hilo is None:
+            self._hilo = threading.Thread(target=self._trabajar, name="cola-flows", daemon=True)
+            self._hilo.start()
+
+    def _vigente(self, op):
+        # Las estructuras de espera no se limpian al combinar: se descarta al sacarla
+        return self._pendientes.get(op.nombre) is op
+
+    def _cupo(self, destino):
+        return self.max_en_vuelo or 2 * destino.max_workers
+
+    def _despachar(self, op, destino):
+        del self._pendientes[op.nombre]
+        self._en_vuelo.add(op.nombre)
+        self._ocupados[destino] = self._ocupados.get(destino, 0) + 1
+        destino.executor.submit(self._enviar, op, destino)
+
+    def _planificar(self):
+        """
+        Despacha todo lo que se puede enviar ya (con el lock tomado) y
+        devuelve los segundos hasta que haya algo más, o None.
+        """
+        ahora = time.monotonic()
+        while self._reintentos and self._reintentos[0][0] <= ahora:
+            op = heapq.heappop(self._reintentos)[2]
+            if self._vigente(op):
+                self._fifo.append(op)
+        # Primero las que esperaban lugar en su destino, en orden de llegada
+        for destino in list(self._bloqueadas):
+            esperando = self._bloqueadas[destino]
+            while esperando and self._ocupados.get(destino, 0) < self._cupo(destino):
+                op = esperando.popleft()
+                if self._vigente(op) and op.nombre not in self._en_vuelo:
+                    self._despachar(op, destino)
+            if not esperando:
+                del self._bloqueadas[destino]
+        reloj, proxima = time.perf_counter(), None
+        while self._fifo:
+            op = self._fifo[0]
+            if not self._vigente(op):
+                self._fifo.popleft()
+                continue
+            if op.encolada + self.ventana > reloj:
+                proxima = op.encolada + self.ventana - reloj
+                break
+            self._fifo.popleft()
+            if op.nombre in self._en_vuelo:
+                continue  # vuelve a la fila cuando termine el envío en curso
+            destino = self.cliente.ruta(op.flow.get('switch') if op.tipo == PUSH else None, op.nombre)
+            if self._ocupados.get(destino, 0) >= self._cupo(destino):
+                self._bloqueadas.setdefault(destino, deque()).append(op)
+            else:
+                self._despachar(op, destino)
+        if self._reintentos:
+            espera = self._reintentos[0][0] - ahora
+            proxima = espera if proxima is None else min(proxima, espera)
+        return proxima
+
+    def _trabajar(self):
+        """
+        Mantiene hasta `max_en_vuelo` envíos en curso por destino en su
+        propio pool (sin esperar a que termine un lote para mandar el
+        siguiente). Un destino lento o caído no frena a los demás.
+        """
+        with self._cond:
+            while not self._detenida:
+                antes = len(self._pendientes)
+                proxima = self._planificar()
+                if len(self._pendientes) < antes:
+                    self._cond.notify_all()  # hay lugar para quien espera por contrapresión
+                self._cond.wait(proxima)
+
+    def _enviar(self, op, destino):
+        try:
+            if op.tipo == PUSH:
+                resultado = destino.push_flow(op.flow)
+            else:
+                resultado = destino.delete_flow(op.nombre)
+        except Exception as e:
+            # Que un error inesperado no deje esperando a quien encoló
+            resultado = {"name": op.nombre, "ok": False, "status": None, "error": str(e)}
+        with self._cond:
+            self._en_vuelo.discard(op.nombre)
+            self._ocupados[destino] -= 1
+            self._cerrar(op, resultado)
+            siguiente = self._pendientes.get(op.nombre)
+            if siguiente is not None and siguiente.listo_en <= time.monotonic():
+                self._fifo.append(siguiente)
+            self._cond.notify_all()
+
+    def _cerrar(self, op, resultado):
+        """
+        Termina, reintenta o descarta una operación enviada (con el lock tomado).
+        """
+        op.intentos += 1
+        if resultado['ok']:
+            self._finalizar(op, resultado, "ok")
+            return
+        if op.nombre in self._pendientes:
+            # Llegó una operación más reciente sobre el flow: la reintentada sobra
+            self._pendientes[op.nombre].esperas.append(op)
+            self._contar(op.tipo, "combinada")
+            return
+        reintentable = resultado['status'] is None or resultado['status'] >= 500
+        if reintentable and op.intentos < self.max_intentos:
+            espera = min(self.espera_maxima, self.espera_inicial * 2 ** (op.intentos - 1))
+            op.listo_en = time.monotonic() + espera * random.uniform(0.5, 1.0)
+            # Un push que falló pudo llegar igual al controlador
+            op.nuevo = False
+            self._pendientes[op.nombre] = op
+            heapq.heappush(self._reintentos, (op.listo_en, next(self._secuencia), op))
+            self._contar(op.tipo, "reintento")
+            return
+        self.fallidos.append({'name': op.nombre, 'operacion': op.tipo, 'intentos': op.intentos,
+                              'status': resultado['status'], 'error': resultado['error']})
+        self.sin_revisar = min(self.sin_revisar + 1, self.fallidos.maxlen)
+        self._finalizar(op, resultado, "error")
+
+    def _finalizar(self, op, resultado, etiqueta):
+        self._contar(op.tipo, etiqueta)
+        if self._espera is not None:
+            self._espera.observar(time.perf_counter() - op.encolada, operacion=op.tipo)
+        op._terminar(resultado)
+
+    def _contar(self, tipo, resultado):
+        if self._conteo is not None:
+            self._conteo.incrementar(operacion=tipo, resultado=resultado)
@@ -0,0 +1,139 @@
+# ===== Representación compacta =====
+# Conversión de MAC/IPv4 a enteros (conservando el texto original para que
+# la salida no cambie), tabla de códigos internados como ids enteros y
+# listas de ids respaldadas por array para inscripciones.
+
+import re
+import sys
+from array import array
+
+_MAC = re.compile(r"^[0-9a-fA-F]{2}(?::[0-9a-fA-F]{2}){5}$")
+_MAC_FLEXIBLE = re.compile(r"^[0-9a-f]{2}(?:[:-]?[0-9a-f]{2}){5}$")
+# Bit por encima de los 48 de la MAC: el texto original estaba en mayúsculas
+_MAYUSCULAS = 1 << 48
+TIPO_ID = "I"   # ids sin signo de 32 bits
+
+
+# ----- MAC -----
+def mac_a_entero(mac):
+    """
+    Entero que representa la MAC con su formato exacto ("aa:bb:..." o
+    "AA:BB:..."), o la misma cadena si tiene otro formato (mezcla de
+    mayúsculas, guiones, etc.) para no alterar la salida.
+    """
+    if not isinstance(mac, str) or not _MAC.match(mac):
+        return mac
+    hexa = mac.replace(":", "")
+    if hexa.islower() or hexa.isdigit():
+        return int(hexa, 16)
+    if hexa.isupper():
+        return int(hexa, 16) | _MAYUSCULAS
+    return mac
+
+
+def entero_a_mac(valor):
+    if not isinstance(valor, int):
+        return valor
+    hexa = f"{valor & (_MAYUSCULAS - 1):012x}"
+    if valor & _MAYUSCULAS:
+        hexa = hexa.upper()
+    return ":".join(hexa[i:i + 2] for i in range(0, 12, 2))
+
+
+def clave_de_entero(valor):
+    """
+    clave_mac de una MAC ya convertida con mac_a_entero (reutiliza el mismo
+    objeto entero cuando no lleva la marca de mayúsculas).
+    """
+    if not isinstance(valor, int):
+        return clave_mac(valor)
+    return valor if valor < _MAYUSCULAS else valor & (_MAYUSCULAS - 1)
+
+
+def clave_mac(mac):
+    """
+    Clave de índice independiente de mayúsculas y separadores: entero de
+    48 bits si es una MAC reconocible, si no el texto en minúsculas.
+    """
+    texto = str(mac).lower()
+    if _MAC_FLEXIBLE.match(texto):
+        return int(texto.replace(":", "").replace("-", ""), 16)
+    return texto
+
+
+# ----- IPv4 -----
+def ip_a_entero(ip):
+    """
+    Entero de 32 bits para una IPv4 en notación canónica, o la misma
+    cadena en cualquier otro caso (IPv6, nombres, ceros a la izquierda).
+    """
+    if not isinstance(ip, str):
+        return ip
+    partes = ip.split(".")
+    if len(partes) != 4:
+        return ip
+    valor = 0
+    for p in partes:
+        if not p.isdigit() or (len(p) > 1 and p[0] == "0") or int(p) > 255:
+            return ip
+        valor = (valor << 8) | int(p)
+    return valor
+
+
+def entero_a_ip(valor):
+    if not isinstance(valor, int):
+        return valor
+    return f"{valor >> 24 & 255}.{valor >> 16 & 255}.{valor >> 8 & 255}.{valor & 255}"
+
+
+# ----- Códigos internados -----
+class TablaCodigos:
+    """
+    Asigna a cada código de alumno un id entero estable (0, 1, 2...) y
+    guarda una sola copia del texto. Los ids no se reutilizan.
+    """
+
+    def __init__(self):
+        self.id_por_codigo = {}
+        self.codigos = []
+
+    def id(self, codigo):
+        codigo = str(codigo)
+        i = self.id_por_codigo.get(codigo)
+        if i is None:
+            codigo = sys.intern(codigo)
+            i = self.id_por_codigo[codigo] = len(self.codigos)
+            self.codigos.append(codigo)
+        return i
+
+    def buscar(self, codigo):
+        """
+        Id del código o None si nunca se registró (sin crearlo).
+        """
+        return self.id_por_codigo.get(str(codigo))
+
+    def codigo(self, i):
+        return self.codigos[i]
+
+    def __len__(self):
+        return len(self.codigos)
+
+
+# Tabla compartida por todos los almacenes del proceso: los cursos guardan
+# ids y los resuelven a texto sin conocer el almacén
+CODIGOS = TablaCodigos()
+
+
+def lista_ids(ids=()):
+    return array(TIPO_ID, ids)
+
+
+def quitar_id(ids, i):
+    """
+    Quita `i` de un array de ids. Devuelve False si no estaba.
+    """
+    try:
+        ids.remove(i)
+    except ValueError:
+        return False
+    return True
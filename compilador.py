@@ -0,0 +1,331 @@
+# ===== Compilador de políticas =====
+# Convierte los permisos de un curso (alumnos inscritos × servicios
+# permitidos) en un conjunto mínimo de reglas, en lugar de cuatro flows por
+# conexión:
+#   - una regla de autorización por (alumno, servicio) en el switch del
+#     servidor (match por MAC del alumno);
+#   - reglas compartidas por (switch, servidor, servicio) en los switches de
+#     tránsito y para el tráfico de retorno;
+#   - dos reglas ARP por (switch, servidor).
+# Si en un switch el retorno no sale por un único puerto, se cae a reglas
+# por alumno (match por MAC destino) para no generar matches en conflicto.
+# Los cursos compilados se compilan juntos (PoliticaCompilada) y los cambios
+# de un alumno regeneran solo los grupos de reglas por los que pasa.
+
+import hashlib
+
+PREFIJO = "pol_"
+PRIORIDAD = "32768"
+PRIORIDAD_ARP = "32769"
+
+
+def nombre_regla(*clave):
+    """
+    Nombre determinista de una regla compilada a partir de su clave.
+    """
+    return PREFIJO + hashlib.sha1("|".join(map(str, clave)).encode()).hexdigest()[:10]
+
+
+def compilar(permisos):
+    """
+    `permisos` es una lista de dicts con mac, servidor, ip, servicio,
+    tcp_port y saltos (lista {'dpid', 'in_port', 'port'} desde el alumno
+    hasta el servidor). Devuelve {nombre: flow}.
+    """
+    politica = PoliticaCompilada()
+    politica.cargar_curso(None, permisos)
+    politica.cambios()
+    return politica.reglas
+
+
+class PoliticaCompilada:
+    """
+    Reglas compiladas de TODOS los cursos con política compilada, juntas:
+    dos cursos que comparten servidor generan reglas con el mismo match y
+    en el switch solo puede haber una, así que se compilan como un único
+    conjunto. Cada permiso (mac, ip, tcp) recuerda qué cursos y alumnos lo
+    piden y aporta a los agregados (por switch, servidor y servicio); al
+    agregar o quitar permisos solo se marcan los grupos afectados y
+    `cambios()` vuelve a generar únicamente esos, devolviendo el delta.
+    """
+
+    def __init__(self):
+        self.reglas = {}    # nombre -> flow (lo que debería estar instalado)
+        self.cursos = {}    # curso -> {(alumno, servidor, servicio): clave}; presente = curso cargado
+        self._duenos = {}   # clave (mac, ip, tcp) -> {(curso, alumno, servidor, servicio): None}
+        self._saltos = {}   # clave -> saltos con que aporta a los agregados
+        self._auth = {}     # (dpid, mac, ip, tcp) -> puerto hacia el servidor
+        self._ida = {}      # (dpid, ip, tcp) -> {entrada: {salida: set(macs)}} en tránsito
+        self._vuelta = {}   # (dpid, ip, tcp) -> {puerto hacia el alumno: set(macs)}
+        self._arp_ida = {}  # (dpid, ip) -> {puerto hacia el servidor: cantidad}
+        self._arp_vuelta = {}  # (dpid, ip) -> {puerto hacia alumnos: cantidad}
+        self._emitidas = {}  # grupo -> set(nombres generados para ese grupo)
+        self._sucios = set()
+        self._heredadas = {}  # curso -> set(nombres instalados antes de reiniciar); curso aún no cargado
+        self._retirables = set()  # heredadas de cursos ya cargados o quitados: a revisar en cambios()
+
+    # ----- Permisos -----
+    def cargar_curso(self, curso, permisos):
+        """
+        Reemplaza todos los permisos de `curso`.
+        """
+        self.quitar(curso)
+        self.cursos[curso] = {}
+        for p in permisos:
+            self.agregar(curso, p)
+
+    def agregar(self, curso, permiso):
+        """
+        `permiso` con alumno (opcional), mac, servidor, ip, servicio,
+        tcp_port y saltos.
+        """
+        clave = (permiso['mac'], permiso['ip'], permiso['tcp_port'])
+        dueno = (permiso.get('alumno', permiso['mac']), permiso['servidor'], permiso['servicio'])
+        propios = self.cursos.setdefault(curso, {})
+        if dueno in propios:
+            self._soltar(curso, dueno)
+        propios[dueno] = clave
+        self._duenos.setdefault(clave, {})[(curso,) + dueno] = None
+        saltos = permiso['saltos']
+        anteriores = self._saltos.get(clave)
+        if anteriores != saltos:
+            # Ruta nueva (o distinta: cambió la topología o la ubicación)
+            if anteriores is not None:
+                self._aportar(clave, anteriores, -1)
+            self._saltos[clave] = saltos
+            self._aportar(clave, saltos, 1)
+
+    def quitar(self, curso, alumno=None):
+        """
+        Quita los permisos de `curso` (solo los de `alumno` si se indica).
+        Sin alumno el curso deja de estar cargado.
+        """
+        if alumno is None:
+            self._retirables.update(self._heredadas.pop(curso, ()))
+        propios = self.cursos.get(curso)
+        if propios is None:
+            return
+        for dueno in [d for d in propios if alumno is None or d[0] == alumno]:
+            self._soltar(curso, dueno)
+        if alumno is None:
+            del self.cursos[curso]
+
+    def _soltar(self, curso, dueno):
+        clave = self.cursos[curso].pop(dueno)
+        duenos = self._duenos[clave]
+        del duenos[(curso,) + dueno]
+        if not duenos:
+            # Ningún curso lo pide ya: retirar su aporte
+            del self._duenos[clave]
+            self._aportar(clave, self._saltos.pop(clave), -1)
+
+    def _aportar(self, clave, saltos, signo):
+        mac, ip, tcp = clave
+        for i, hop in enumerate(saltos):
+            dpid, entrada, salida = hop['dpid'], str(hop['in_port']), str(hop['port'])
+            if i == len(saltos) - 1:
+                # Autorización: solo en el switch del servidor y por alumno
+                grupo = (dpid, mac, ip, tcp)
+                if signo > 0:
+                    self._auth[grupo] = hop['port']
+                else:
+                    self._auth.pop(grupo, None)
+                self._sucios.add(('auth',) + grupo)
+            else:
+                _marcar(self._ida.setdefault((dpid, ip, tcp), {}).setdefault(entrada, {}), salida, mac, signo)
+            _marcar(self._vuelta.setdefault((dpid, ip, tcp), {}), entrada, mac, signo)
+            _contar(self._arp_ida.setdefault((dpid, ip), {}), salida, signo)
+            _contar(self._arp_vuelta.setdefault((dpid, ip), {}), entrada, signo)
+            self._sucios.add(('tcp', dpid, ip, tcp))
+            self._sucios.add(('arp', dpid, ip))
+
+    # ----- Reglas -----
+    def cambios(self):
+        """
+        Regenera los grupos afectados desde la última llamada y actualiza
+        `reglas`. Devuelve (flows a instalar, nombres a retirar).
+        """
+        instalar, retirar = [], []
+        for grupo in self._sucios:
+            nuevas = self._generar(grupo)
+            for nombre in self._emitidas.pop(grupo, ()):
+                if nombre not in nuevas:
+                    retirar.append(nombre)
+                    del self.reglas[nombre]
+            for nombre, flow in nuevas.items():
+                if self.reglas.get(nombre) != flow:
+                    instalar.append(flow)
+                    self.reglas[nombre] = flow
+            if nuevas:
+                self._emitidas[grupo] = set(nuevas)
+        self._sucios.clear()
+        if self._retirables:
+            # Reglas heredadas que ya nadie genera ni puede reclamar
+            vigentes = set(retirar).union(self.reglas, *self._heredadas.values())
+            retirar += [n for n in self._retirables if n not in vigentes]
+            self._retirables.clear()
+        return instalar, retirar
+
+    def reglas_de(self, curso):
+        """
+        Nombres de las reglas a las que aporta `curso` (pueden ser compartidas
+        con otros cursos), incluidas las heredadas si aún no se cargó.
+        """
+        grupos = set()
+        for clave in set(self.cursos.get(curso, {}).values()):
+            mac, ip, tcp = clave
+            saltos = self._saltos[clave]
+            for hop in saltos:
+                grupos.add(('tcp', hop['dpid'], ip, tcp))
+                grupos.add(('arp', hop['dpid'], ip))
+            if saltos:
+                grupos.add(('auth', saltos[-1]['dpid'], mac, ip, tcp))
+        nombres = {n for g in grupos for n in self._emitidas.get(g, ())}
+        return nombres | self._heredadas.get(curso, set())
+
+    def heredar(self, curso, nombres):
+        """
+        Registra las reglas que `curso` tenía instaladas antes de reiniciar
+        (p. ej. leídas de un snapshot) con la política aún sin cargar. Al
+        cargar o quitar el curso, las que ya no se generan se retiran.
+        """
+        if nombres:
+            self._heredadas.setdefault(curso, set()).update(nombres)
+
+    def adoptar(self, otra):
+        """
+        Toma el estado de otra política (p. ej. la recompilada al reconciliar).
+        """
+        self.__dict__.update(otra.__dict__)
+
+    def _generar(self, grupo):
+        reglas = {}
+        if grupo[0] == 'auth':
+            _, dpid, mac, ip, tcp = grupo
+            if grupo[1:] in self._auth:
+                nombre = nombre_regla("auth", dpid, mac, ip, tcp)
+                reglas[nombre] = _flow_tcp(nombre, dpid, self._auth[grupo[1:]], eth_src=mac,
+                                           ipv4_dst=ip, tcp_dst=tcp)
+            return reglas
+        if grupo[0] == 'arp':
+            _, dpid, ip = grupo
+            for tipo, agregado, campo in (("arp_fw", self._arp_ida, "arp_tpa"),
+                                          ("arp_bw", self._arp_vuelta, "arp_spa")):
+                puertos = agregado.get((dpid, ip))
+                if puertos:
+                    nombre = nombre_regla(tipo, dpid, ip)
+                    reglas[nombre] = _flow_arp(nombre, dpid, _salida(puertos), **{campo: ip})
+                elif puertos is not None:
+                    del agregado[(dpid, ip)]
+            return reglas
+        _, dpid, ip, tcp = grupo
+        clave = (dpid, ip, tcp)
+        por_entrada = {e: d for e, d in self._ida.get(clave, {}).items() if d}
+        if por_entrada:
+            self._ida[clave] = por_entrada
+            salidas = {puerto for destinos in por_entrada.values() for puerto in destinos}
+            if len(salidas) == 1:
+                # Todas las rutas salen por el mismo puerto: una sola regla compartida
+                nombre = nombre_regla("fw", dpid, ip, tcp)
+                reglas[nombre] = _flow_tcp(nombre, dpid, salidas.pop(), ipv4_dst=ip, tcp_dst=tcp)
+            else:
+                for entrada, destinos in por_entrada.items():
+                    if len(destinos) == 1:
+                        # Desambiguar por puerto de entrada
+                        nombre = nombre_regla("fw", dpid, ip, tcp, entrada)
+                        reglas[nombre] = _flow_tcp(nombre, dpid, next(iter(destinos)), in_port=entrada,
+                                                   ipv4_dst=ip, tcp_dst=tcp)
+                        continue
+                    for puerto, macs in destinos.items():
+                        for mac in macs:
+                            nombre = nombre_regla("fw", dpid, ip, tcp, mac)
+                            reglas[nombre] = _flow_tcp(nombre, dpid, puerto, eth_src=mac,
+                                                       ipv4_dst=ip, tcp_dst=tcp)
+        else:
+            self._ida.pop(clave, None)
+        por_puerto = self._vuelta.get(clave, {})
+        if len(por_puerto) == 1:
+            puerto = next(iter(por_puerto))
+            nombre = nombre_regla("bw", dpid, ip, tcp)
+            reglas[nombre] = _flow_tcp(nombre, dpid, puerto, ipv4_src=ip, tcp_src=tcp)
+        elif por_puerto:
+            for puerto, macs in por_puerto.items():
+                for mac in macs:
+                    nombre = nombre_regla("bw", dpid, ip, tcp, mac)
+                    reglas[nombre] = _flow_tcp(nombre, dpid, puerto, eth_dst=mac,
+                                               ipv4_src=ip, tcp_src=tcp)
+        else:
+            self._vuelta.pop(clave, None)
+        return reglas
+
+
+def _marcar(por_puerto, puerto, mac, signo):
+    """
+    Agrega (signo > 0) o quita `mac` del conjunto de `puerto`; los
+    conjuntos vacíos se eliminan.
+    """
+    if signo > 0:
+        por_puerto.setdefault(puerto, set()).add(mac)
+        return
+    macs = por_puerto.get(puerto)
+    if macs is not None:
+        macs.discard(mac)
+        if not macs:
+            del por_puerto[puerto]
+
+
+def _contar(por_puerto, puerto, signo):
+    cantidad = por_puerto.get(puerto, 0) + signo
+    if cantidad > 0:
+        por_puerto[puerto] = cantidad
+    else:
+        por_puerto.pop(puerto, None)
+
+
+def resumen(permisos, reglas, flows_por_conexion=4):
+    """
+    Compara las reglas compiladas con las que instalaría una conexión por
+    permiso (cuatro flows por switch de la ruta).
+    """
+    sin_compilar = sum(flows_por_conexion * len(p['saltos']) for p in permisos)
+    ahorro = sin_compilar - len(reglas)
+    return {
+        'permisos': len(permisos),
+        'reglas': len(reglas),
+        'sin_compilar': sin_compilar,
+        'ahorro': ahorro,
+        'porcentaje': 100.0 * ahorro / sin_compilar if sin_compilar else 0.0,
+    }
+
+
+def _salida(puertos):
+    if len(puertos) == 1:
+        return f"output={next(iter(puertos))}"
+    return "output=flood"
+
+
+def _flow_tcp(nombre, dpid, puerto, **match):
+    flow = {
+        "switch": dpid,
+        "name": nombre,
+        "priority": PRIORIDAD,
+        "eth_type": "0x0800",
+        "ip_proto": "0x06",
+        "active": "true",
+        "actions": f"output={puerto}",
+    }
+    flow.update(match)
+    return flow
+
+
+def _flow_arp(nombre, dpid, acciones, **match):
+    flow = {
+        "switch": dpid,
+        "name": nombre,
+        "priority": PRIORIDAD_ARP,
+        "eth_type": "0x0806",
+        "active": "true",
+        "actions": acciones,
+    }
+    flow.update(match)
+    return flow
@@ -0,0 +1,398 @@
+# ===== Mapa de controladores =====
+# La red está repartida entre varias instancias de Floodlight. Cada switch
+# (DPID) pertenece a un controlador según una lista de switches o rangos de
+# DPID; cada controlador tiene su propio cliente (pool de conexiones e hilos)
+# y registro de salud: tras varios fallos seguidos se marca caído unos
+# segundos y sus operaciones fallan enseguida (la cola las reintenta) sin
+# frenar a los demás. Sin archivo de configuración hay un solo controlador.
+#
+#   controladores:
+#     - nombre: norte
+#       url: http://10.20.12.53:8080
+#       hilos: 8
+#       rangos: [{desde: "00:00:00:00:00:00:00:01", hasta: "00:00:00:00:00:00:00:ff"}]
+#     - nombre: sur
+#       url: http://10.20.12.54:8080
+#       switches: ["00:00:00:00:00:00:01:01"]
+#       por_defecto: true
+
+import bisect
+import os
+import threading
+import time
+from collections import deque
+
+from floodlight import FloodlightClient
+
+FALLOS_PARA_CAIDA = 3   # fallos seguidos para marcar un controlador como caído
+ESPERA_CAIDO = 5.0      # segundos sin enviarle operaciones antes de volver a probar
+VENTANA_RITMO = 10.0    # segundos para calcular operaciones por segundo
+
+
+def dpid_a_entero(dpid):
+    """
+    Entero de un DPID ("00:00:00:00:00:00:00:01", "0x1" o 1), o None si
+    no se reconoce.
+    """
+    if isinstance(dpid, int):
+        return dpid
+    try:
+        return int(str(dpid).replace(":", "").replace("-", ""), 16)
+    except ValueError:
+        return None
+
+
+def _combinar(a, b):
+    """
+    Une las respuestas de dos controladores: las listas se concatenan y los
+    diccionarios se combinan clave a clave.
+    """
+    if isinstance(a, list) and isinstance(b, list):
+        return a + b
+    if isinstance(a, dict) and isinstance(b, dict):
+        combinado = dict(a)
+        for clave, valor in b.items():
+            combinado[clave] = _combinar(combinado[clave], valor) if clave in combinado else valor
+        return combinado
+    return a
+
+
+class Controlador:
+    """
+    Un controlador Floodlight con su cliente y su salud. `push_flow`,
+    `delete_flow` y `get_json` tienen la misma interfaz que FloodlightClient.
+    """
+
+    def __init__(self, nombre, url, max_workers=8, metricas=None, timeout=(3.05, 10)):
+        self.nombre = nombre
+        self.cliente = FloodlightClient(url, max_workers=max_workers, timeout=timeout, metricas=metricas,
+                                        nombre=nombre)
+        self.ok = 0
+        self.errores = 0
+        self.rechazadas = 0   # operaciones no enviadas por estar caído
+        self.en_curso = 0
+        self.fallos_seguidos = 0
+        self.caido_hasta = 0.0
+        self.ultimo_error = None
+        self._recientes = deque()  # instantes de las operaciones terminadas
+        self._lock = threading.Lock()
+
+    @property
+    def url(self):
+        return self.cliente.base_url
+
+    @property
+    def executor(self):
+        return self.cliente.executor
+
+    @property
+    def max_workers(self):
+        return self.cliente.max_workers
+
+    @property
+    def caido(self):
+        return time.monotonic() < self.caido_hasta
+
+    def close(self):
+        self.cliente.close()
+
+    # ----- Operaciones -----
+    def push_flow(self, flow):
+        return self._operar(self.cliente.push_flow, flow, flow.get("name"))
+
+    def delete_flow(self, flow_name):
+        return self._operar(self.cliente.delete_flow, flow_name, flow_name)
+
+    def _operar(self, funcion, argumento, nombre):
+        if self.caido:
+            with self._lock:
+                self.rechazadas += 1
+            return {"name": nombre, "ok": False, "status": None,
+                    "error": f"Controlador '{self.nombre}' no disponible"}
+        with self._lock:
+            self.en_curso += 1
+        resultado = funcion(argumento)
+        # 4xx: el controlador respondió, el problema es la operación
+        self._registrar(resultado['ok'] or (resultado['status'] or 500) < 500, resultado['error'])
+        return resultado
+
+    def get_json(self, path):
+        if self.caido:
+            raise ConnectionError(f"Controlador '{self.nombre}' no disponible")
+        with self._lock:
+            self.en_curso += 1
+        try:
+            datos = self.cliente.get_json(path)
+        except Exception as e:
+            self._registrar(False, str(e))
+            raise
+        self._registrar(True, None)
+        return datos
+
+    def _registrar(self, sano, error):
+        ahora = time.monotonic()
+        with self._lock:
+            self.en_curso -= 1
+            self._recientes.append(ahora)
+            while self._recientes[0] < ahora - VENTANA_RITMO:
+                self._recientes.popleft()
+            if sano and error is None:
+                self.ok += 1
+            else:
+                self.errores += 1
+                self.ultimo_error = error
+            if sano:
+                self.fallos_seguidos = 0
+                return
+            self.fallos_seguidos += 1
+            if self.fallos_seguidos >= FALLOS_PARA_CAIDA:
+                self.caido_hasta = ahora + ESPERA_CAIDO
+
+    # ----- Estado -----
+    def por_segundo(self):
+        ahora = time.monotonic()
+        with self._lock:
+            return sum(1 for t in self._recientes if t >= ahora - VENTANA_RITMO) / VENTANA_RITMO
+
+    def estado(self):
+        with self._lock:
+            datos = {
+                'nombre': self.nombre,
+                'url': self.url,
+                'hilos': self.max_workers,
+                'ok': self.ok,
+                'errores': self.errores,
+                'rechazadas': self.rechazadas,
+                'en_curso': self.en_curso,
+                'fallos_seguidos': self.fallos_seguidos,
+                'ultimo_error': self.ultimo_error,
+            }
+        datos['caido'] = self.caido
+        datos['operaciones_por_segundo'] = self.por_segundo()
+        return datos
+
+
+class Controladores:
+    """
+    Enrutador entre controladores con la interfaz de FloodlightClient: las
+    operaciones van al controlador del switch del flow, los lotes se
+    reparten y corren en paralelo en el pool de cada controlador, y las
+    lecturas (get_json) se consultan a todos y se combinan.
+    El archivo `config` se lee en el primer uso (ver `cargar`).
+    """
+
+    def __init__(self, url_por_defecto, config=None, metricas=None, max_workers=8):
+        self.url_por_defecto = url_por_defecto
+        self.config = config
+        self.metricas = metricas
+        self.max_workers = max_workers  # hilos para los deletes a todos los controladores
+        self.lista = []
+        self.por_defecto = None
+        self._por_switch = {}   # dpid (entero) -> Controlador
+        self._rangos = []       # (desde, hasta, Controlador) ordenados por desde
+        self._inicios = []
+        self._cache = {}        # dpid tal como llega -> Controlador
+        self._duenos = {}       # nombre de flow -> Controlador que lo instaló
+        self._executor = None
+        self._cargado = False
+        self._lock = threading.Lock()
+
+    # ----- Configuración -----
+    def cargar(self):
+        """
+        Lee el mapa de controladores (una sola vez). Sin archivo se usa un
+        único controlador en `url_por_defecto`. Lanza ValueError si la
+        configuración no es válida.
+        """
+        with self._lock:
+            if self._cargado:
+                return
+            if self.config and os.path.exists(self.config):
+                import yaml
+                with open(self.config, "r", encoding="utf-8") as f:
+                    datos = yaml.safe_load(f) or {}
+                entradas = datos.get('controladores') or []
+                if not entradas:
+                    raise ValueError(f"'{self.config}' no define controladores")
+                for entrada in entradas:
+                    self._agregar(entrada.get('nombre') or entrada.get('url'), entrada.get('url', self.url_por_defecto),
+                                  entrada.get('hilos', 8), entrada.get('switches', ()),
+                                  [(r['desde'], r['hasta']) for r in entrada.get('rangos', ())],
+                                  entrada.get('por_defecto', False))
+            else:
+                self._agregar("principal", self.url_por_defecto, por_defecto=True)
+            if self.por_defecto is None and len(self.lista) == 1:
+                self.por_defecto = self.lista[0]
+            self._cargado = True
+
+    def agregar(self, nombre, url, hilos=8, switches=(), rangos=(), por_defecto=False):
+        """
+        Agrega un controlador sin archivo de configuración. `rangos` es una
+        lista de (dpid desde, dpid hasta) inclusive.
+        """
+        with self._lock:
+            self._cargado = True
+            return self._agregar(nombre, url, hilos, switches, rangos, por_defecto)
+
+    def _agregar(self, nombre, url, hilos=8, switches=(), rangos=(), por_defecto=False):
+        if any(c.nombre == nombre for c in self.lista):
+            raise ValueError(f"Controlador '{nombre}' repetido")
+        controlador = Controlador(nombre, url, max_workers=hilos, metricas=self.metricas)
+        for dpid in switches:
+            self._por_switch[self._dpid_valido(dpid)] = controlador
+        for desde, hasta in rangos:
+            desde, hasta = self._dpid_valido(desde), self._dpid_valido(hasta)
+            if desde > hasta:
+                raise ValueError(f"Rango de DPID invertido en '{nombre}'")
+            i = bisect.bisect(self._inicios, desde)
+            if (i > 0 and self._rangos[i - 1][1] >= desde) or (i < len(self._rangos) and self._rangos[i][0] <= hasta):
+                raise ValueError(f"El rango de '{nombre}' se superpone con el de otro controlador")
+            self._rangos.insert(i, (desde, hasta, controlador))
+            self._inicios.insert(i, desde)
+        if por_defecto:
+            if self.por_defecto is not None:
+                raise ValueError("Hay más de un controlador por defecto")
+            self.por_defecto = controlador
+        self.lista.append(controlador)
+        self._cache.clear()
+        return controlador
+
+    @staticmethod
+    def _dpid_valido(dpid):
+        valor = dpid_a_entero(dpid)
+        if valor is None:
+            raise ValueError(f"DPID inválido: {dpid}")
+        return valor
+
+    @property
+    def controladores(self):
+        if not self._cargado:
+            self.cargar()
+        return self.lista
+
+    # ----- Enrutamiento -----
+    def controlador_de(self, dpid):
+        """
+        Controlador del switch: lista de switches, luego rangos, luego el
+        controlador por defecto. None si ninguno lo cubre.
+        """
+        controladores = self.controladores
+        if len(controladores) == 1:
+            return controladores[0]
+        try:
+            return self._cache[dpid]
+        except KeyError:
+            pass
+        valor = dpid_a_entero(dpid)
+        controlador = self._por_switch.get(valor)
+        if controlador is None and valor is not None:
+            i = bisect.bisect(self._inicios, valor) - 1
+            if i >= 0 and self._rangos[i][1] >= valor:
+                controlador = self._rangos[i][2]
+        if controlador is None:
+            controlador = self.por_defecto
+        self._cache[dpid] = controlador
+        return controlador
+
+    def ruta(self, switch=None, nombre=None):
+        """
+        Destino de una operación sobre un flow: el controlador del switch
+        (push) o el que instaló el flow (delete). Si no se sabe, el propio
+        enrutador, que envía el delete a todos los controladores.
+        """
+        controladores = self.controladores
+        if len(controladores) == 1:
+            return controladores[0]
+        if switch is not None:
+            controlador = self.controlador_de(switch)
+            if controlador is not None:
+                if nombre is not None:
+                    self._duenos[nombre] = controlador
+                return controlador
+            return self
+        return self._duenos.pop(nombre, None) or self
+
+    # ----- Operaciones unitarias -----
+    def push_flow(self, flow):
+        destino = self.ruta(flow.get("switch"), flow.get("name"))
+        if destino is self:
+            return {"name": flow.get("name"), "ok": False, "status": 400,
+                    "error": f"Ningún controlador maneja el switch {flow.get('switch')}"}
+        return destino.push_flow(flow)
+
+    def delete_flow(self, flow_name):
+        destino = self.ruta(None, flow_name)
+        if destino is not self:
+            return destino.delete_flow(flow_name)
+        # Dueño desconocido: borrarlo en todos (Floodlight acepta borrar un flow inexistente)
+        resultados = [c.delete_flow(flow_name) for c in self.controladores]
+        return next((r for r in resultados if not r['ok']), resultados[0])
+
+    def get_json(self, path):
+        """
+        Consulta `path` en todos los controladores y combina las respuestas.
+        Si alguno falla se devuelve lo de los demás; si fallan todos se
+        lanza el primer error.
+        """
+        controladores = self.controladores
+        if len(controladores) == 1:
+            return controladores[0].get_json(path)
+        futuros = [self.executor.submit(c.get_json, path) for c in controladores]
+        datos, error = None, None
+        for futuro in futuros:
+            try:
+                parte = futuro.result()
+            except Exception as e:
+                error = error or e
+                continue
+            datos = parte if datos is None else _combinar(datos, parte)
+        if datos is None:
+            raise error
+        return datos
+
+    # ----- Operaciones por lote -----
+    def push_flows(self, flows):
+        """
+        Instala varios flows repartidos entre sus controladores, en paralelo
+        en el pool de cada uno. Devuelve los resultados en el mismo orden.
+        """
+        futuros = []
+        for flow in flows:
+            # Sin controlador para el switch el destino es el enrutador: push_flow lo informa
+            destino = self.ruta(flow.get("switch"), flow.get("name"))
+            futuros.append(destino.executor.submit(destino.push_flow, flow))
+        return [f.result() for f in futuros]
+
+    def delete_flows(self, flow_names):
+        futuros = []
+        for nombre in flow_names:
+            destino = self.ruta(None, nombre)
+            futuros.append(destino.executor.submit(destino.delete_flow, nombre))
+        return [f.result() for f in futuros]
+
+    # ----- Pool y estado -----
+    @property
+    def executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    from concurrent.futures import ThreadPoolExecutor
+                    self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                        thread_name_prefix="controladores")
+        return self._executor
+
+    def estadisticas(self):
+        return [c.estado() for c in self.controladores]
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for controlador in self.lista:
+            controlador.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,150 @@
+# ===== Cliente Floodlight =====
+# Sesión HTTP persistente (keep-alive, pool de conexiones) con timeouts y
+# operaciones por lote sobre el Static Flow Pusher en un pool de hilos acotado.
+# Si recibe un registro de métricas, mide la latencia y el resultado de cada
+# petición. `requests` se importa al crear la sesión (primer uso), así los
+# comandos que no hablan con el controlador arrancan sin pagar su importación.
+
+import threading
+import time
+
+STATIC_FLOW_PATH = "/wm/staticflowpusher/json"
+
+
+class FloodlightClient:
+    """
+    Cliente reutilizable para la API REST de Floodlight.
+    Mantiene una única requests.Session con pool de conexiones y ejecuta
+    los lotes de push/delete en paralelo con a lo sumo `max_workers` hilos.
+    Con `metricas` registra floodlight_request_seconds y
+    floodlight_requests_total por operación y resultado (y por controlador
+    si se indica `nombre`).
+    """
+
+    def __init__(self, base_url, max_workers=8, timeout=(3.05, 10), metricas=None, nombre=None):
+        self.base_url = base_url.rstrip("/")
+        self.nombre = nombre
+        self._etiquetas = {'controlador': nombre} if nombre else {}
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self._session = None
+        self._session_lock = threading.Lock()
+        self._executor = None
+        self._latencia = self._peticiones = None
+        if metricas is not None:
+            self._latencia = metricas.histograma("floodlight_request_seconds",
+                                                 "Latencia de las peticiones REST a Floodlight")
+            self._peticiones = metricas.contador("floodlight_requests_total",
+                                                 "Peticiones REST a Floodlight por operación y resultado")
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    session.headers.update({"Content-Type": "application/json"})
+                    # pool_block: con muchos hilos llamando a la vez (modo API) se espera una
+                    # conexión libre en vez de abrir conexiones extra contra el controlador
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_workers, pool_block=True)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._session = session
+        return self._session
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                thread_name_prefix="floodlight")
+        return self._executor
+
+    def ruta(self, switch=None, nombre=None):
+        """
+        Destino de una operación sobre un flow (ver Controladores.ruta): con
+        un solo controlador es siempre este cliente.
+        """
+        return self
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ----- Operaciones unitarias -----
+    def get_json(self, path):
+        inicio = time.perf_counter()
+        # Sin la query (?mac=...) para no crear una serie por dispositivo
+        operacion = "get " + path.split("?")[0]
+        session = self.session
+        from requests import RequestException
+        try:
+            response = session.get(f"{self.base_url}{path}", timeout=self.timeout)
+        except RequestException:
+            self._medir(operacion, inicio, "conexion")
+            raise
+        self._medir(operacion, inicio, "ok" if response.ok else "http_error")
+        response.raise_for_status()
+        return response.json()
+
+    def push_flow(self, flow):
+        """
+        Instala un flow. Devuelve un dict con name, ok, status y error.
+        """
+        return self._request("post", flow, flow.get("name"))
+
+    def delete_flow(self, flow_name):
+        """
+        Elimina un flow por nombre. Devuelve un dict con name, ok, status y error.
+        """
+        return self._request("delete", {"name": flow_name}, flow_name)
+
+    def _request(self, method, payload, name):
+        url = f"{self.base_url}{STATIC_FLOW_PATH}"
+        operacion = "push" if method == "post" else "delete"
+        session = self.session
+        from requests import RequestException
+        inicio = time.perf_counter()
+        try:
+            response = session.request(method, url, json=payload, timeout=self.timeout)
+        except RequestException as e:
+            self._medir(operacion, inicio, "conexion")
+            return {"name": name, "ok": False, "status": None, "error": str(e)}
+        if response.status_code == 200:
+            self._medir(operacion, inicio, "ok")
+            return {"name": name, "ok": True, "status": 200, "error": None}
+        self._medir(operacion, inicio, "http_error")
+        return {"name": name, "ok": False, "status": response.status_code, "error": response.text}
+
+    def _medir(self, operacion, inicio, resultado):
+        if self._latencia is None:
+            return
+        self._latencia.observar(time.perf_counter() - inicio, operacion=operacion, **self._etiquetas)
+        self._peticiones.incrementar(operacion=operacion, resultado=resultado, **self._etiquetas)
+
+    # ----- Operaciones por lote -----
+    def push_flows(self, flows):
+        """
+        Instala varios flows en paralelo. Devuelve los resultados en el
+        mismo orden que `flows`.
+        """
+        return list(self.executor.map(self.push_flow, flows))
+
+    def delete_flows(self, flow_names):
+        """
+        Elimina varios flows en paralelo. Devuelve los resultados en el
+        mismo orden que `flow_names`.
+        """
+        return list(self.executor.map(self.delete_flow, flow_names))
@@ -0,0 +1,157 @@
+# ===== Lectura de YAML en streaming =====
+# Recorre el archivo como eventos (con el parser C de libyaml si está
+# disponible) y entrega los registros de cada bloque de nivel superior uno a
+# uno, sin construir el documento completo en memoria. Las anclas (&x) se
+# guardan por documento para resolver los alias (*x) y las claves de fusión
+# (<<: *x) igual que yaml.safe_load. El documento debe ser un mapeo sin
+# claves de nivel superior repetidas (sus registros ya se entregaron).
+
+import yaml
+from yaml.constructor import SafeConstructor
+from yaml.nodes import ScalarNode
+from yaml.resolver import Resolver
+
+try:
+    from yaml import CSafeLoader as Loader
+    LIBYAML = True
+except ImportError:  # PyYAML sin la extensión C
+    from yaml import SafeLoader as Loader
+    LIBYAML = False
+
+_resolver = Resolver()
+TAG_FUSION = "tag:yaml.org,2002:merge"
+
+
+def _tag(evento):
+    tag = evento.tag
+    if tag is None or tag == "!":
+        tag = _resolver.resolve(ScalarNode, evento.value, evento.implicit)
+    return tag
+
+
+def _escalar(evento, constructor):
+    """
+    Convierte un evento escalar al mismo valor que daría yaml.safe_load
+    (enteros, booleanos, nulos, etc. según las reglas de YAML 1.1).
+    `constructor` es el SafeConstructor de la lectura en curso: tiene
+    estado, así que cada lectura (y cada hilo) usa el suyo.
+    """
+    nodo = ScalarNode(_tag(evento), evento.value, style=evento.style)
+    try:
+        return constructor.construct_object(nodo)
+    finally:
+        # construct_object memoriza cada nodo; sin esto el caché retiene todo el archivo
+        constructor.constructed_objects.pop(nodo, None)
+
+
+def _alias(evento, anclas):
+    try:
+        return anclas[evento.anchor]
+    except KeyError:
+        raise yaml.YAMLError(f"Alias sin ancla definida: *{evento.anchor}")
+
+
+def _valor(eventos, inicio, anclas, constructor):
+    """
+    Construye un valor Python a partir de `inicio` consumiendo de `eventos`
+    hasta cerrar la colección correspondiente. `anclas` ({nombre: valor})
+    se completa con las anclas que aparecen y resuelve los alias.
+    """
+    if isinstance(inicio, yaml.AliasEvent):
+        return _alias(inicio, anclas)
+    if isinstance(inicio, yaml.ScalarEvent):
+        valor = _escalar(inicio, constructor)
+    elif isinstance(inicio, yaml.SequenceStartEvent):
+        valor = []
+        if inicio.anchor is not None:
+            anclas[inicio.anchor] = valor
+        for ev in eventos:
+            if isinstance(ev, yaml.SequenceEndEvent):
+                break
+            valor.append(_valor(eventos, ev, anclas, constructor))
+    elif isinstance(inicio, yaml.MappingStartEvent):
+        valor = _mapa(eventos, inicio, anclas, constructor)
+    else:
+        raise yaml.YAMLError(f"Evento YAML no soportado en importación: {inicio}")
+    if inicio.anchor is not None:
+        anclas[inicio.anchor] = valor
+    return valor
+
+
+def _mapa(eventos, inicio, anclas, constructor):
+    """
+    Mapeo con claves de fusión (<<): las claves propias ganan a las
+    fusionadas y, entre varias fusionadas, la primera gana.
+    """
+    propias, fusionadas = {}, []
+    for ev in eventos:
+        if isinstance(ev, yaml.MappingEndEvent):
+            break
+        if isinstance(ev, yaml.ScalarEvent) and _tag(ev) == TAG_FUSION:
+            fuente = _valor(eventos, next(eventos), anclas, constructor)
+            for m in (fuente if isinstance(fuente, list) else [fuente]):
+                if not isinstance(m, dict):
+                    raise yaml.YAMLError("Una clave de fusión (<<) solo admite mapeos")
+                fusionadas.append(m)
+            continue
+        clave = _valor(eventos, ev, anclas, constructor)
+        propias[clave] = _valor(eventos, next(eventos), anclas, constructor)
+    if not fusionadas:
+        return propias
+    mapa = {}
+    for m in reversed(fusionadas):
+        mapa.update(m)
+    mapa.update(propias)
+    return mapa
+
+
+def iterar_registros(stream):
+    """
+    Genera tuplas (bloque, registro) para cada elemento de las listas de
+    nivel superior del documento (p. ej. ('alumnos', {...})). Las claves
+    cuyo valor no es una lista se ignoran. Solo se retienen en memoria los
+    valores con ancla, que un alias posterior puede necesitar. Un documento
+    vacío no genera nada; uno que no es un mapeo, o con una clave de nivel
+    superior repetida, lanza yaml.YAMLError.
+    """
+    eventos = yaml.parse(stream, Loader=Loader)
+    for ev in eventos:
+        if not isinstance(ev, (yaml.StreamStartEvent, yaml.DocumentStartEvent)):
+            break
+    else:
+        return
+    if isinstance(ev, yaml.StreamEndEvent):
+        return
+    constructor = SafeConstructor()
+    if isinstance(ev, yaml.ScalarEvent) and _escalar(ev, constructor) is None:
+        return
+    if not isinstance(ev, yaml.MappingStartEvent):
+        raise yaml.YAMLError("El documento YAML debe ser un mapeo (alumnos, cursos, servidores)")
+    anclas, vistos = {}, set()
+    for ev in eventos:
+        if isinstance(ev, yaml.MappingEndEvent):
+            return
+        bloque = _valor(eventos, ev, anclas, constructor)
+        if bloque in vistos:
+            raise yaml.YAMLError(f"Clave de nivel superior repetida: {bloque}")
+        vistos.add(bloque)
+        inicio = next(eventos)
+        if isinstance(inicio, yaml.AliasEvent):
+            valor = _alias(inicio, anclas)
+            if isinstance(valor, list):
+                for registro in valor:
+                    yield bloque, registro
+        elif isinstance(inicio, yaml.SequenceStartEvent):
+            # Una lista de nivel superior con ancla se guarda entera para sus alias
+            lista = [] if inicio.anchor is not None else None
+            for item in eventos:
+                if isinstance(item, yaml.SequenceEndEvent):
+                    break
+                registro = _valor(eventos, item, anclas, constructor)
+                if lista is not None:
+                    lista.append(registro)
+                yield bloque, registro
+            if lista is not None:
+                anclas[inicio.anchor] = lista
+        else:
+            _valor(eventos, inicio, anclas, constructor)  # descartar (sus anclas quedan disponibles)
@@ -0,0 +1,168 @@
+# ===== Recolección de conexiones inactivas =====
+# Las conexiones viven hasta que alguien las borra, así que las tablas de
+# los switches se llenan de reglas de alumnos que ya se fueron. Un hilo
+# descarga periódicamente las estadísticas de flows de cada switch de
+# servidor (UNA petición por switch), sigue los contadores de paquetes de
+# {handler}_fw y {handler}_bw y entrega en lote las conexiones sin tráfico
+# durante más de `umbral` segundos. El Static Flow Pusher no informa el
+# nombre en las estadísticas y, si no se le indica otra, pone la misma
+# cookie a todos sus flows; por eso cada flow se envía con una cookie
+# propia derivada del nombre (ver cookie_flow) y se reconoce por ella.
+
+import hashlib
+import threading
+import time
+
+FLOW_STATS_PATH = "/wm/core/switch/{dpid}/flow/json"
+STATIC_FLOW_APP_ID = 10  # AppCookie del Static Flow Pusher
+APP_ID_SHIFT = 52
+SENTIDOS = ("fw", "bw")  # flows del switch del servidor que se miden
+
+
+def cookie_flow(nombre):
+    """
+    Cookie explícita del flow `nombre` (campo "cookie" del payload): el
+    AppCookie del Static Flow Pusher en los bits altos y 52 bits de un hash
+    del nombre, así cada flow tiene la suya.
+    """
+    h = int.from_bytes(hashlib.blake2b(nombre.encode(), digest_size=8).digest(), "big")
+    return (STATIC_FLOW_APP_ID << APP_ID_SHIFT) | (h & ((1 << APP_ID_SHIFT) - 1))
+
+
+def _entero(valor):
+    texto = str(valor).strip().lower()
+    return int(texto, 16) if texto.startswith("0x") else int(texto)
+
+
+def entradas_stats(datos):
+    """
+    Lista de flows de una respuesta de /wm/core/switch/<dpid>/flow/json
+    ({"flows": [...]} o {dpid: [...]} según la versión de Floodlight).
+    """
+    if isinstance(datos, list):
+        return datos
+    if "flows" in datos:
+        return datos["flows"]
+    return [e for flows in datos.values() if isinstance(flows, list) for e in flows]
+
+
+class RecolectorInactivas:
+    """
+    `conexiones()` devuelve {dpid del servidor: [handlers]} y
+    `eliminar(handlers)` retira en lote las conexiones inactivas.
+    `actividad[handler]` guarda (paquetes, instante del último cambio).
+    """
+
+    def __init__(self, cliente, conexiones, eliminar, umbral=3600, intervalo=300):
+        self.cliente = cliente
+        self.conexiones = conexiones
+        self.eliminar = eliminar
+        self.umbral = umbral
+        self.intervalo = intervalo
+        self.actividad = {}
+        self.ultima = None  # resumen de la última recolección
+        self._hilo = None
+        self._detener = threading.Event()
+        self._lock = threading.Lock()  # una recolección a la vez (hilo o menú)
+
+    # ----- Medición -----
+    def medir(self, por_switch):
+        """
+        Actualiza `actividad` con una consulta por switch. Devuelve la
+        cantidad de switches que no se pudieron consultar.
+        """
+        ahora = time.monotonic()
+        fallidos = 0
+        vigentes = set()
+        for dpid, handlers in por_switch.items():
+            vigentes.update(handlers)
+            try:
+                datos = self.cliente.ruta(dpid).get_json(FLOW_STATS_PATH.format(dpid=dpid))
+            except Exception:
+                fallidos += 1
+                continue  # sin datos no se puede afirmar que estén inactivas
+            contadores, repetidas = {}, set()
+            for entrada in entradas_stats(datos):
+                try:
+                    cookie = _entero(entrada["cookie"])
+                    valor = (_entero(entrada.get("packetCount", 0)), _entero(entrada.get("durationSeconds", 0)))
+                except (KeyError, ValueError, TypeError):
+                    continue
+                if cookie in contadores:
+                    repetidas.add(cookie)
+                contadores[cookie] = valor
+            # Una cookie compartida (p. ej. flows instalados sin cookie propia) no
+            # identifica a ningún flow: mejor no medir que atribuir tráfico ajeno
+            for cookie in repetidas:
+                del contadores[cookie]
+            for handler in handlers:
+                medidos = [contadores[c] for c in (cookie_flow(f"{handler}_{s}") for s in SENTIDOS)
+                           if c in contadores]
+                if medidos:
+                    self._registrar(handler, sum(p for p, _ in medidos), min(d for _, d in medidos), ahora)
+        # Olvidar las conexiones que ya no existen
+        for handler in self.actividad.keys() - vigentes:
+            del self.actividad[handler]
+        return fallidos
+
+    def _registrar(self, handler, paquetes, duracion, ahora):
+        anterior = self.actividad.get(handler)
+        if anterior is None:
+            # Primera medición: sin tráfico, inactiva desde que se instaló el flow;
+            # con tráfico no se sabe cuándo fue el último paquete
+            self.actividad[handler] = (paquetes, ahora - duracion if paquetes == 0 else ahora)
+        elif paquetes != anterior[0]:
+            self.actividad[handler] = (paquetes, ahora)
+
+    def inactivas(self, ahora=None):
+        ahora = time.monotonic() if ahora is None else ahora
+        return [h for h, (_, ultima) in self.actividad.items() if ahora - ultima > self.umbral]
+
+    # ----- Recolección -----
+    def recolectar(self):
+        """
+        Mide, elimina las conexiones inactivas y devuelve un resumen.
+        """
+        with self._lock:
+            inicio = time.perf_counter()
+            por_switch = self.conexiones()
+            fallidos = self.medir(por_switch)
+            medidas = len(self.actividad)
+            inactivas = self.inactivas()
+            eliminadas = self.eliminar(inactivas) if inactivas else 0
+            for handler in inactivas:
+                self.actividad.pop(handler, None)
+            self.ultima = {
+                'switches': len(por_switch),
+                'switches_con_error': fallidos,
+                'medidas': medidas,
+                'eliminadas': eliminadas,
+                'segundos': time.perf_counter() - inicio,
+            }
+            return self.ultima
+
+    # ----- Hilo -----
+    @property
+    def activo(self):
+        return self._hilo is not None
+
+    def iniciar(self):
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, name="inactividad", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def _bucle(self):
+        while not self._detener.wait(self.intervalo):
+            try:
+                self.recolectar()
+            except Exception:
+                pass  # se reintenta en la siguiente vuelta
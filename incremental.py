@@ -0,0 +1,78 @@
+# ===== Motor incremental de permisos =====
+# Ante cada cambio (inscripción, retiro, estado de curso, baja de alumno)
+# calcula solo los permisos (alumno, servidor, servicio) que aparecieron o
+# desaparecieron para los alumnos afectados, sin recorrer todos los cursos.
+
+
+def permisos_alumno(almacen, cod_alumno):
+    """
+    Conjunto de (servidor, servicio) que un alumno registrado puede usar
+    según sus cursos DICTANDO (su fila en la matriz de acceso).
+    """
+    if almacen.buscar_alumno(cod_alumno) is None:
+        return set()
+    return set(almacen.matriz.permisos_de(cod_alumno))
+
+
+class MotorIncremental:
+    """
+    Aplica cambios de la política al almacén y notifica el delta de
+    permisos: `otorgar` y `revocar` reciben listas de tuplas
+    (alumno, servidor, servicio); `recompilar` recibe el código del curso
+    afectado por el cambio y los alumnos afectados (None si cambia el curso
+    entero). Cada operación devuelve (resultado del cambio en el almacén,
+    otorgados, revocados).
+    """
+
+    def __init__(self, almacen, otorgar=None, revocar=None, recompilar=None):
+        self.almacen = almacen
+        self.otorgar = otorgar
+        self.revocar = revocar
+        self.recompilar = recompilar
+
+    def inscribir(self, curso, cod_alumno):
+        return self._aplicar([cod_alumno], curso, lambda: self.almacen.inscribir(curso, cod_alumno))
+
+    def desinscribir(self, curso, cod_alumno):
+        return self._aplicar([cod_alumno], curso, lambda: self.almacen.desinscribir(curso, cod_alumno))
+
+    def cambiar_estado(self, curso, estado):
+        afectados = self.almacen.inscritos(curso)
+        return self._aplicar(afectados, curso, lambda: self.almacen.cambiar_estado(curso, estado), curso_entero=True)
+
+    def eliminar_alumno(self, cod_alumno):
+        cursos = list(self.almacen.cursos_de_alumno.get(cod_alumno, ()))
+        return self._aplicar([cod_alumno], cursos, lambda: self.almacen.eliminar_alumno(cod_alumno))
+
+    def agregar_alumno(self, alumno):
+        cursos = list(self.almacen.cursos_de_alumno.get(alumno.codigo, ()))
+        return self._aplicar([alumno.codigo], cursos, lambda: self.almacen.agregar_alumno(alumno))
+
+    def agregar_curso(self, curso):
+        """
+        Agrega el curso o reemplaza al del mismo código (alumnos, estado y
+        servidores permitidos).
+        """
+        afectados = list(dict.fromkeys(self.almacen.inscritos(curso.codigo) + curso.alumnos))
+        return self._aplicar(afectados, curso.codigo, lambda: self.almacen.agregar_curso(curso), curso_entero=True)
+
+    def eliminar_curso(self, curso):
+        afectados = self.almacen.inscritos(curso)
+        return self._aplicar(afectados, curso, lambda: self.almacen.eliminar_curso(curso), curso_entero=True)
+
+    def _aplicar(self, alumnos, cursos, cambio, curso_entero=False):
+        antes = {a: permisos_alumno(self.almacen, a) for a in alumnos}
+        resultado = cambio()
+        otorgados, revocados = [], []
+        for a in alumnos:
+            despues = permisos_alumno(self.almacen, a)
+            otorgados += [(a,) + p for p in despues - antes[a]]
+            revocados += [(a,) + p for p in antes[a] - despues]
+        if revocados and self.revocar:
+            self.revocar(revocados)
+        if otorgados and self.otorgar:
+            self.otorgar(otorgados)
+        if self.recompilar:
+            for curso in ([cursos] if isinstance(cursos, str) else cursos):
+                self.recompilar(curso, None if curso_entero else alumnos)
+        return resultado, otorgados, revocados
@@ -1,118 +1,455 @@
-import yaml
-import uuid
-import requests
+import csv
+import os
+import sys
+import time
+import threading
+
+from almacen import Almacen
+from registro import RegistroConexiones
+import snapshot
+import reconciliacion
+import recarga
+import compilador
+from incremental import MotorIncremental
+from controladores import Controladores
+from cola import ColaFlows
+from inactividad import RecolectorInactivas, cookie_flow
+from topologia import Topologia
+from ubicaciones import CacheUbicaciones
+from compacto import CODIGOS, lista_ids, mac_a_entero, entero_a_mac, clave_de_entero, ip_a_entero, entero_a_ip
+from metricas import Metricas, ServidorMetricas, Perfilador, traza_lentas, LATENCIA_RAPIDA
 
 CONTROLLER_HOST = "10.20.12.53"
 CONTROLLER_PORT = 8080
 FLOODLIGHT_URL = f"http://{CONTROLLER_HOST}:{CONTROLLER_PORT}"
+# Mapa DPID -> controlador (ver controladores.py); si no existe se usa solo FLOODLIGHT_URL
+CONTROLADORES_PATH = os.environ.get("NPM_CONTROLADORES", "controladores.yaml")
+
+# Contadores e histogramas de latencia del programa (ver menú Estadísticas)
+metricas = Metricas()
+
+# Clientes (sesión keep-alive y pool propios) de cada controlador, enrutados por switch
+floodlight = Controladores(FLOODLIGHT_URL, CONTROLADORES_PATH, metricas=metricas)
+
+# Toda escritura de flows pasa por esta cola (lotes, reintentos, contrapresión)
+cola = ColaFlows(floodlight, metricas=metricas)
+
+# Grafo de la red y rutas memorizadas (se carga del controlador al primer uso)
+topologia = Topologia(floodlight)
+
+# Puntos de conexión (dpid, puerto) de alumnos y servidores, con TTL y LRU
+ubicaciones = CacheUbicaciones(floodlight)
 
 # ===== Clases base =====
+# Representación compacta: __slots__, MAC/IP como enteros (se muestran con
+# el mismo texto que se importó) y alumnos del curso como ids internados.
 class Alumno:
+    __slots__ = ('nombre', 'codigo', '_mac')
     def __init__(self, nombre, codigo, mac):
         self.nombre = nombre
-        self.codigo = str(codigo)
-        self.mac = mac
+        self.codigo = CODIGOS.codigo(CODIGOS.id(codigo))  # texto internado
+        self._mac = mac_a_entero(mac)
+    @property
+    def mac(self):
+        return entero_a_mac(self._mac)
+    @property
+    def clave_mac(self):
+        return clave_de_entero(self._mac)
+    def como_dict(self):
+        return {'nombre': self.nombre, 'codigo': self.codigo, 'mac': self.mac}
     def __str__(self):
         return f"{self.codigo} - {self.nombre} ({self.mac})"
 
 class Curso:
+    __slots__ = ('codigo', 'estado', 'nombre', 'ids_alumnos', 'servidores')
     def __init__(self, codigo, estado, nombre, alumnos, servidores):
         self.codigo = codigo
         self.estado = estado
         self.nombre = nombre
-        self.alumnos = [str(a) for a in alumnos]
+        self.ids_alumnos = lista_ids(CODIGOS.id(a) for a in alumnos)
         self.servidores = servidores
+    @property
+    def alumnos(self):
+        return [CODIGOS.codigo(i) for i in self.ids_alumnos]
+    def como_dict(self):
+        return {'codigo': self.codigo, 'estado': self.estado, 'nombre': self.nombre,
+                'alumnos': self.alumnos, 'servidores': self.servidores}
     def __str__(self):
         return f"{self.codigo} - {self.nombre} [{self.estado}]"
 
 class Servidor:
+    __slots__ = ('nombre', '_ip', 'servicios')
     def __init__(self, nombre, ip, servicios):
         self.nombre = nombre
-        self.ip = ip
+        self._ip = ip_a_entero(ip)
         self.servicios = servicios
+    @property
+    def ip(self):
+        return entero_a_ip(self._ip)
+    def como_dict(self):
+        return {'nombre': self.nombre, 'ip': self.ip, 'servicios': self.servicios}
     def __str__(self):
         servs = "\n".join([f"  - {s['nombre']} ({s['protocolo']}:{s['puerto']})" for s in self.servicios])
         return f"{self.nombre} ({self.ip})\nServicios:\n{servs}"
 
+# Snapshot binario que se carga al iniciar y se guarda al salir
+SNAPSHOT_PATH = "estado.snap"
+# Registro persistente (SQLite) de las conexiones activas
+REGISTRO_PATH = "conexiones.db"
+TAM_PAGINA = 20
+# Puerto del endpoint /metrics (formato de texto de Prometheus)
+METRICAS_PUERTO = 9108
+# Interfaz en la que escucha /metrics: solo local salvo que se exponga a propósito (p. ej. 0.0.0.0)
+METRICAS_HOST = os.environ.get("NPM_METRICAS_HOST", "127.0.0.1")
+# Si está definida, se perfila toda la sesión con cProfile y se guarda en ese archivo
+PERFIL_PATH = os.environ.get("NPM_PERFIL")
+# Segundos que se espera al salir para vaciar la cola de flows
+COLA_ESPERA_SALIDA = 30
+# Las conexiones sin tráfico durante más de estos segundos se eliminan solas (0 = nunca)
+INACTIVIDAD_UMBRAL = float(os.environ.get("NPM_INACTIVIDAD", 0))
+# Cada cuántos segundos se consultan los contadores de los flows
+INACTIVIDAD_INTERVALO = 300
+# Cada cuántos segundos se vuelven a consultar los enlaces (0 = solo a pedido)
+TOPOLOGIA_INTERVALO = float(os.environ.get("NPM_TOPOLOGIA", 60))
+# Archivo de la política (YAML o .snap) que se vigila y recarga en caliente al cambiar
+VIGILAR_PATH = os.environ.get("NPM_VIGILAR")
+VIGILAR_INTERVALO = 2
+# Directorio del que la API acepta archivos para /importar y /recargar
+API_ARCHIVOS_DIR = os.environ.get("NPM_API_ARCHIVOS", ".")
+
 # ===== Variables globales =====
-alumnos = []
-cursos = []
-servidores = []
-conexiones = []  # formato: dict con handler, alumno, servidor, servicio
+# Almacén indexado: alumnos, cursos, servidores y conexiones
+# (conexión = dict con handler, alumno, servidor, servicio)
+almacen = Almacen()
+# Cursos cuya política se instala compilada (reglas agregadas) en vez de por conexión
+# (conjunto ordenado: código -> None)
+cursos_compilados = {}
+# Reglas de esos cursos compiladas juntas: dos cursos que comparten servidor
+# comparten reglas (en el switch no puede haber dos con el mismo match)
+politica = compilador.PoliticaCompilada()
+# Protege el almacén en memoria cuando hay varios hilos (modo API); las
+# llamadas al controlador se hacen fuera del lock
+estado_lock = threading.RLock()
+# Recolector de conexiones inactivas (contadores de flows, una consulta por switch)
+recolector = RecolectorInactivas(floodlight, lambda: almacen.registro.por_switch(),
+                                 lambda handlers: eliminar_inactivas(handlers),
+                                 umbral=INACTIVIDAD_UMBRAL or 3600, intervalo=INACTIVIDAD_INTERVALO)
+# Vigilancia del archivo de la política (ver vigilar_politica)
+vigilante = recarga.VigilanteArchivo(VIGILAR_PATH, VIGILAR_INTERVALO)
+
+# ===== Instrumentación =====
+m_autorizacion = metricas.histograma("autorizacion_seconds", "Duración del chequeo de autorización por resultado",
+                                     LATENCIA_RAPIDA)
+# Series ligadas: el chequeo de autorización es la ruta más caliente
+m_permitido = m_autorizacion.serie(resultado="permitido")
+m_denegado = m_autorizacion.serie(resultado="denegado")
+m_importacion = metricas.histograma("importacion_seconds", "Duración de las importaciones por formato")
+m_registros = metricas.contador("importacion_registros_total", "Registros importados por bloque")
+m_exportacion = metricas.histograma("exportacion_seconds", "Duración de las exportaciones por formato")
+m_ruta = metricas.histograma("ruta_seconds", "Duración del cálculo de rutas (incluye la carga de topología)")
+m_rutas = metricas.contador("rutas_total", "Rutas calculadas por resultado")
+m_inactivas = metricas.contador("conexiones_inactivas_eliminadas_total", "Conexiones eliminadas por inactividad")
+metricas.indicador("flows_propios", "Flows instalados por este programa (conexiones y reglas compiladas)",
+                   lambda: almacen.registro.contar_flows() + len(politica.reglas))
+metricas.indicador("conexiones_activas", "Conexiones registradas", lambda: almacen.registro.contar())
+metricas.indicador("alumnos", "Alumnos cargados", lambda: len(almacen.alumno_por_codigo))
+servidor_metricas = ServidorMetricas(metricas, host=METRICAS_HOST, puerto=METRICAS_PUERTO)
+perfilador = Perfilador()
 
 # ===== Importar/Exportar YAML =====
+def leer_archivo(path, contenido=None):
+    """
+    Lee un YAML registro a registro (parser libyaml si está disponible)
+    directamente a un almacén nuevo, sin materializar el documento completo.
+    Con `contenido` (bytes ya leídos) no se vuelve a abrir el archivo.
+    Devuelve (almacén nuevo, conteos).
+    """
+    import io
+    from importacion import iterar_registros
+    nuevo = Almacen()
+    conteo = {'alumnos': 0, 'cursos': 0, 'servidores': 0}
+    with (open(path, 'rb') if contenido is None else io.BytesIO(contenido)) as f:
+        for bloque, r in iterar_registros(f):
+            if bloque == "alumnos":
+                nuevo.agregar_alumno(Alumno(**r))
+            elif bloque == "cursos":
+                nuevo.agregar_curso(Curso(r['codigo'], r['estado'], r['nombre'], r['alumnos'], r['servidores']))
+            elif bloque == "servidores":
+                nuevo.agregar_servidor(Servidor(r['nombre'], r['ip'], r['servicios']))
+            else:
+                continue
+            conteo[bloque] += 1
+    return nuevo, conteo
+
+def importar_archivo(path, fusionar=False):
+    """
+    Importa un YAML con leer_archivo y, si todo el archivo es válido,
+    reemplaza los datos actuales o, con fusionar=True, los agrega/actualiza.
+    Las conexiones activas se conservan al fusionar; al reemplazar se
+    descartan y se encola el borrado de sus flows (y de las reglas de los
+    cursos compilados que ya no existen). Solo el cambio final se hace
+    bajo `estado_lock`. Devuelve un dict con los conteos y el tiempo de
+    lectura.
+    """
+    from importacion import LIBYAML
+    inicio = time.perf_counter()
+    nuevo, conteo = leer_archivo(path)
+    descartados, quitados = [], []
+    with estado_lock:
+        if fusionar:
+            almacen.cargar(nuevo.alumnos, nuevo.cursos, nuevo.servidores)
+        else:
+            descartados = [n for c in almacen.registro.todas() for n in nombres_flows(c)]
+            almacen.registro.limpiar()
+            almacen.adoptar(nuevo)
+            quitados = quitar_compilados_eliminados()
+    if descartados:
+        encolar_delete(descartados)
+    aplicar_politica_eliminados(quitados)
+    conteo['segundos'] = time.perf_counter() - inicio
+    conteo['libyaml'] = LIBYAML
+    m_importacion.observar(conteo['segundos'], formato="yaml")
+    for bloque in ("alumnos", "cursos", "servidores"):
+        m_registros.incrementar(conteo[bloque], bloque=bloque)
+    return conteo
+
 def importar_datos():
-    entrada = input("Nombre del archivo YAML : ").strip()
+    entrada = input("Nombre del archivo YAML (o snapshot .snap) : ").strip()
+    if entrada.endswith(".snap"):
+        importar_snapshot(entrada)
+        return
     if not entrada.endswith(".yaml"):
         entrada += ".yaml"
+    fusionar = False
+    if almacen.hay_conexiones():
+        # Con conexiones activas, aplicar solo los cambios en vez de borrarlas
+        print("Hay conexiones activas:")
+        print("1) Aplicar solo los cambios (conserva las conexiones no afectadas)")
+        print("2) Fusionar con los datos actuales (agregar/actualizar, sin bajas)")
+        print("3) Reemplazar todo (se descartan las conexiones)")
+        modo = input(">> ").strip() or "1"
+        if modo == "1":
+            recargar_datos(entrada)
+            return
+        fusionar = modo == "2"
     try:
-        with open(entrada, 'r') as f:
-            data = yaml.safe_load(f)
+        conteo = importar_archivo(entrada, fusionar=fusionar)
     except Exception as e:
         print(f"❌ Error al importar '{entrada}': {e}")
         return
 
-    alumnos.clear()
-    cursos.clear()
-    servidores.clear()
-    conexiones.clear()
+    print(f"✔ Datos importados correctamente desde '{entrada}'.")
+    print(f"  {conteo['alumnos']} alumnos, {conteo['cursos']} cursos, {conteo['servidores']} servidores "
+          f"en {conteo['segundos']:.3f}s ({'libyaml' if conteo['libyaml'] else 'PyYAML puro'})")
+
+# ----- Recarga en caliente -----
+def leer_politica(path, contenido=None):
+    """
+    Lee un YAML (o snapshot .snap) a un almacén nuevo, sin tocar el actual.
+    """
+    if path.endswith(".snap"):
+        nuevo = Almacen()
+        snapshot.cargar(path, nuevo, Alumno, Curso, Servidor, conexiones=False)
+        return nuevo
+    return leer_archivo(path, contenido)[0]
+
+def recargar_archivo(path, contenido=None):
+    """
+    Aplica solo la diferencia entre la política actual y `path`: los
+    índices se actualizan bajo `estado_lock` y después se retiran y crean
+    las conexiones de los alumnos afectados (las demás no se tocan).
+    Devuelve {tipo de cambio: cantidad} y los segundos.
+    """
+    inicio = time.perf_counter()
+    nuevo = leer_politica(path, contenido)
+    with estado_lock:
+        diferencia = recarga.diferencias(almacen, nuevo)
+        revocar, otorgar, cursos, rehacer = recarga.aplicar(almacen, diferencia)
+        quitados = quitar_compilados_eliminados()
+    nuevo.registro.close()
+    revocar_permisos(revocar)
+    rehacer_conexiones(rehacer)
+    aplicar_politica_eliminados(quitados)
+    otorgar_permisos(otorgar)
+    for codigo, alumnos in cursos:
+        recompilar_curso(codigo, alumnos)
+    conteo = {k: v for k, v in recarga.resumen(diferencia).items() if v}
+    conteo['segundos'] = time.perf_counter() - inicio
+    m_importacion.observar(conteo['segundos'], formato="recarga")
+    return conteo
+
+def mostrar_recarga(path, conteo):
+    cambios = {k: v for k, v in conteo.items() if k != 'segundos'}
+    if not cambios:
+        print(f"✔ '{path}' no tiene cambios respecto de los datos actuales.")
+        return
+    print(f"✔ Cambios de '{path}' aplicados en {conteo['segundos']:.3f}s:")
+    for tipo, cantidad in cambios.items():
+        print(f"  {tipo.replace('_', ' ')}: {cantidad}")
+
+def recargar_datos(path):
+    try:
+        conteo = recargar_archivo(path)
+    except Exception as e:
+        print(f"❌ Error al recargar '{path}': {e}")
+        return
+    mostrar_recarga(path, conteo)
+
+def vigilar_politica(path):
+    """
+    Aplica ya las diferencias con `path` y lo vigila en segundo plano:
+    cada cambio de contenido se aplica con recargar_archivo.
+    """
+    vigilante.detener()
+    vigilante.path = path
+    with open(path, 'rb') as f:
+        contenido = f.read()
+    vigilante.marcar(contenido)
+    mostrar_recarga(path, recargar_archivo(path, contenido))
+    vigilante.iniciar(lambda nuevo: _recargar_vigilado(path, nuevo))
 
-    for a in data.get("alumnos", []):
-        alumnos.append(Alumno(**a))
-    for c in data.get("cursos", []):
-        cursos.append(Curso(c['codigo'], c['estado'], c['nombre'], c['alumnos'], c['servidores']))
-    for s in data.get("servidores", []):
-        servidores.append(Servidor(s['nombre'], s['ip'], s['servicios']))
+def _recargar_vigilado(path, contenido):
+    try:
+        conteo = recargar_archivo(path, contenido)
+    except Exception as e:
+        print(f"❌ No se pudo recargar '{path}' (se mantienen los datos actuales): {e}")
+        return
+    mostrar_recarga(path, conteo)
 
-    print(f"✔ Datos importados correctamente desde '{entrada}'.")
+def exportar_archivo(path):
+    """
+    Exporta alumnos, cursos y servidores a `path` en YAML. Lanza la
+    excepción si no se puede escribir.
+    """
+    import yaml
+    data = {
+        'alumnos': [a.como_dict() for a in almacen.alumnos],
+        'cursos': [c.como_dict() for c in almacen.cursos],
+        'servidores': [s.como_dict() for s in almacen.servidores]
+    }
+    with m_exportacion.medir(formato="yaml"), open(path, 'w') as f:
+        yaml.dump(data, f)
 
 def exportar_datos():
-    path = input("Nombre del archivo de salida : ").strip()
+    path = input("Nombre del archivo de salida (.yaml o .snap) : ").strip()
+    if path.endswith(".snap"):
+        exportar_snapshot(path)
+        return
     if not path.endswith(".yaml"):
         path += ".yaml"
-    data = {
-        'alumnos': [vars(a) for a in alumnos],
-        'cursos': [{
-            'codigo': c.codigo,
-            'estado': c.estado,
-            'nombre': c.nombre,
-            'alumnos': c.alumnos,
-            'servidores': c.servidores
-        } for c in cursos],
-        'servidores': [vars(s) for s in servidores]
-    }
     try:
-        with open(path, 'w') as f:
-            yaml.dump(data, f)
+        exportar_archivo(path)
         print(f"✔ Datos exportados correctamente a '{path}'.")
     except Exception as e:
         print(f"❌ Error al exportar: {e}")
 
-# ===== insertar y eliminar flows =====
-def push_flow(flow):
-    url = f"{FLOODLIGHT_URL}/wm/staticflowpusher/json"
-    headers = {"Content-Type": "application/json"}
+# ===== Snapshot binario (arranque rápido) =====
+def importar_snapshot(path):
     try:
-        response = requests.post(url, json=flow, headers=headers)
-        if response.status_code == 200:
-            print("✔ Flow instalado en Floodlight.")
-        else:
-            print(f"❌ Error al instalar flow: {response.text}")
+        inicio = time.perf_counter()
+        datos = snapshot.cargar(path, almacen, Alumno, Curso, Servidor)
     except Exception as e:
-        print(f"❌ No se pudo conectar a Floodlight: {e}")
+        print(f"❌ Error al cargar el snapshot '{path}': {e}")
+        return False
+    m_importacion.observar(time.perf_counter() - inicio, formato="snap")
+    cursos_compilados.clear()
+    # La política se recompila al primer cambio; mientras tanto cada curso
+    # recuerda sus reglas instaladas para poder retirarlas
+    politica.adoptar(compilador.PoliticaCompilada())
+    for codigo, reglas in datos.get('compilados', ()):
+        cursos_compilados[codigo] = None
+        politica.heredar(codigo, reglas)
+    print(f"✔ Snapshot '{path}' cargado: {len(datos['alumnos'])} alumnos, {len(datos['cursos'])} cursos, "
+          f"{len(datos['servidores'])} servidores, {len(datos['conexiones'])} conexiones "
+          f"en {(time.perf_counter() - inicio) * 1000:.1f} ms")
+    return True
 
-def delete_flow(flow_name):
-    url = f"{FLOODLIGHT_URL}/wm/staticflowpusher/json"
-    data = {"name": flow_name}
-    headers = {"Content-Type": "application/json"}
+def exportar_snapshot(path):
     try:
-        response = requests.delete(url, json=data, headers=headers)
-        if response.status_code == 200:
-            print("✔ Flow eliminado de Floodlight.")
-        else:
-            print(f"❌ Error al eliminar flow: {response.text}")
+        with m_exportacion.medir(formato="snap"):
+            with estado_lock:
+                compilados = {c: politica.reglas_de(c) for c in cursos_compilados}
+            snapshot.guardar(path, almacen, compilados)
+        print(f"✔ Snapshot guardado en '{path}'.")
     except Exception as e:
-        print(f"❌ No se pudo conectar a Floodlight: {e}")
+        print(f"❌ Error al guardar el snapshot: {e}")
+        return False
+    return True
+
+# ===== insertar y eliminar flows =====
+# Las operaciones del menú se encolan y vuelven enseguida; las que necesitan
+# el resultado (lotes, API, reconciliación) usan cola.push_flows/delete_flows,
+# que esperan. Así todas quedan ordenadas por nombre de flow.
+def encolar_push(flows, nuevos=False, al_terminar=None):
+    cola.encolar_push(flows, nuevo=nuevos, al_terminar=al_terminar)
+    _informar_cola()
+
+def encolar_delete(flow_names):
+    cola.encolar_delete(flow_names)
+    _informar_cola()
+
+def deshacer_si_falla(conexion):
+    """
+    Aviso de la cola para una conexión creada sin esperar sus flows: si
+    alguno no se pudo instalar, da de baja la conexión y retira los que sí
+    llegaron (igual que crear_conexion).
+    """
+    def al_terminar(resultados):
+        errores = [r for r in resultados if not r['ok']]
+        if not errores:
+            return
+        with estado_lock:
+            if almacen.buscar_conexion(conexion['handler']) is None:
+                return  # ya se eliminó mientras se instalaba
+            almacen.eliminar_conexion(conexion['handler'])
+        cola.encolar_delete([r['name'] for r in resultados if r['ok']])
+        print(f"\n❌ Conexión {conexion['handler']} deshecha: {len(errores)} flows no se pudieron "
+              f"instalar ({errores[0]['error']}).")
+    return al_terminar
+
+def _informar_cola():
+    if cola.profundidad:
+        print(f"⏳ {cola.profundidad} operaciones de flows en cola (ver Conexiones > Cola de flows).")
+
+def mostrar_cola():
+    estado = cola.estado()
+    print("\n--- Cola de flows ---")
+    print(f"Pendientes: {estado['pendientes']} ({estado['reintentando']} esperando reintento)")
+    print(f"En curso: {estado['en_vuelo']}")
+    fallidos = cola.revisar_fallidos()
+    if fallidos:
+        print(f"❌ Fallidas desde la última revisión: {len(fallidos)} (use Reconciliar para reintentar)")
+        for f in fallidos[-10:]:
+            print(f"  - {f['operacion']} {f['name']} ({f['intentos']} intentos): {f['error']}")
+    elif not cola.profundidad:
+        print("✔ Sin operaciones pendientes.")
+
+
+def mostrar_recoleccion(resumen):
+    print(f"Switches consultados: {resumen['switches']}"
+          + (f" (❌ {resumen['switches_con_error']} con error)" if resumen['switches_con_error'] else ""))
+    print(f"Conexiones medidas: {resumen['medidas']}")
+    print(f"✔ Eliminadas por inactividad: {resumen['eliminadas']} en {resumen['segundos']:.2f}s")
+
+def menu_inactivas():
+    print("\n--- Conexiones inactivas ---")
+    estado = f"revisando cada {recolector.intervalo:g}s" if recolector.activo else "detenido"
+    print(f"Umbral: {recolector.umbral:g}s sin tráfico (recolector {estado})")
+    if recolector.ultima:
+        print("Última revisión:")
+        mostrar_recoleccion(recolector.ultima)
+    if input("¿Revisar ahora? (s/n): ").strip().lower() == 's':
+        try:
+            umbral = float(input(f"Umbral en segundos [{recolector.umbral:g}]: ").strip() or recolector.umbral)
+        except ValueError:
+            print("❌ Umbral inválido.")
+            return
+        recolector.umbral = umbral
+        mostrar_recoleccion(recolector.recolectar())
+        _informar_cola()
+    if not recolector.activo and input("¿Revisar en segundo plano? (s/n): ").strip().lower() == 's':
+        recolector.iniciar()
+        print(f"✔ Recolector iniciado (cada {recolector.intervalo:g}s).")
 
 
 # ===== Submenú Cursos =====
@@ -122,69 +459,115 @@ def menu_cursos():
         print("1) Listar todos los cursos")
         print("2) Ver detalle de un curso")
         print("3) Agregar/eliminar alumno en curso")
-        print("4) Volver")
+        print("4) Compilar política del curso (reglas agregadas)")
+        print("5) Cambiar estado del curso")
+        print("6) Volver")
         op = input(">> ")
 
         if op == '1':
             # Listar todos los cursos
-            if not cursos:
+            if not almacen.curso_por_codigo:
                 print("No hay cursos cargados.")
             else:
                 print("\n--- Lista de Todos los Cursos ---")
-                for c in cursos:
+                for c in almacen.cursos:
                     print(f"{c.codigo} - {c.nombre} [{c.estado}]")
 
         elif op == '2':
             # Mostrar detalle de un curso
             codigo = input("Código del curso: ")
-            for c in cursos:
-                if c.codigo == codigo:
-                    print(f"\nCurso: {c.nombre}")
-                    print(f"Estado: {c.estado}")
-                    print(f"Alumnos: {', '.join(c.alumnos)}")
-                    print("Servidores permitidos:")
-                    for s in c.servidores:
-                        print(f"  - {s['nombre']}: {', '.join(s['servicios_permitidos'])}")
-                    break
+            c = almacen.buscar_curso(codigo)
+            if c:
+                print(f"\nCurso: {c.nombre}")
+                print(f"Estado: {c.estado}")
+                print(f"Alumnos: {', '.join(c.alumnos)}")
+                print("Servidores permitidos:")
+                for s in c.servidores:
+                    print(f"  - {s['nombre']}: {', '.join(s['servicios_permitidos'])}")
             else:
                 print("❌ Curso no encontrado.")
 
         elif op == '3':
             # Agregar o eliminar alumno en curso
             codigo = input("Código del curso: ")
-            for c in cursos:
-                if c.codigo == codigo:
-                    # Mini leyenda de que solo se pueden agregar alumnos en cursos activos (DICTANDO)
-                    if c.estado != "DICTANDO":
-                        print("⚠️ Solo se pueden agregar alumnos a cursos con estado 'DICTANDO'.")
-                        continue
-                    
-                    print("1) Agregar alumno\n2) Eliminar alumno")
-                    ac = input("Elija: ")
-                    if ac == '1':
-                        nuevo = input("Código del alumno a agregar: ")
-                        if nuevo not in c.alumnos:
-                            c.alumnos.append(nuevo)
-                            # Buscar el nombre del alumno para la confirmación
-                            alumno = next((a for a in alumnos if a.codigo == nuevo), None)
-                            if alumno:
-                                print(f"✔ Alumno {alumno.nombre} agregado al curso {c.nombre}.")
-                            else:
-                                print("❌ Alumno no encontrado.")
-                        else:
-                            print("Ya estaba inscrito.")
-                    elif ac == '2':
-                        borrar = input("Código del alumno a eliminar: ")
-                        if borrar in c.alumnos:
-                            c.alumnos.remove(borrar)
-                            print("✔ Alumno eliminado del curso.")
-                        else:
-                            print("No estaba inscrito.")
-                    break
-            else:
+            c = almacen.buscar_curso(codigo)
+            if c is None:
                 print("❌ Curso no encontrado.")
+            # Mini leyenda de que solo se pueden agregar alumnos en cursos activos (DICTANDO)
+            elif c.estado != "DICTANDO":
+                print("⚠️ Solo se pueden agregar alumnos a cursos con estado 'DICTANDO'.")
+            else:
+                print("1) Agregar alumno\n2) Eliminar alumno")
+                ac = input("Elija: ")
+                if ac == '1':
+                    nuevo = input("Código del alumno a agregar: ")
+                    if aplicar_cambio("inscribir", c.codigo, nuevo):
+                        # Buscar el nombre del alumno para la confirmación
+                        alumno = almacen.buscar_alumno(nuevo)
+                        if alumno:
+                            print(f"✔ Alumno {alumno.nombre} agregado al curso {c.nombre}.")
+                        else:
+                            print("❌ Alumno no encontrado.")
+                    else:
+                        print("Ya estaba inscrito.")
+                elif ac == '2':
+                    borrar = input("Código del alumno a eliminar: ")
+                    if aplicar_cambio("desinscribir", c.codigo, borrar):
+                        print("✔ Alumno eliminado del curso.")
+                    else:
+                        print("No estaba inscrito.")
 
         elif op == '4':
+            codigo = input("Código del curso: ")
+            c = almacen.buscar_curso(codigo)
+            if c is None:
+                print("❌ Curso no encontrado.")
+                continue
+            if c.estado != "DICTANDO":
+                print("⚠️ Solo se compilan cursos con estado 'DICTANDO'.")
+                continue
+            try:
+                _, resumen = compilar_curso(codigo)
+            except Exception as e:
+                print(f"❌ No se pudo obtener la topología de Floodlight: {e}")
+                continue
+            mostrar_resumen_compilacion(codigo, resumen)
+            if resumen['reglas'] and input("¿Instalar las reglas compiladas? (s/N): ").strip().lower() == 's':
+                try:
+                    cargar_politica([codigo])
+                except Exception as e:
+                    print(f"❌ No se pudo obtener la topología de Floodlight: {e}")
+                    continue
+                with estado_lock:
+                    # Se registra recién con la política cargada: si no, cubierto_por_compilado
+                    # dejaría al curso sin conexiones y sin reglas
+                    cursos_compilados[codigo] = None
+                    instalar, retirar = politica.cambios()
+                resultados = cola.push_flows(instalar)
+                if retirar:
+                    encolar_delete(retirar)
+                errores = sum(1 for r in resultados if not r['ok'])
+                print(f"✔ {len(resultados) - errores} reglas instaladas"
+                      + (f" ({resumen['reglas'] - len(instalar)} ya las tenían otros cursos)"
+                         if len(instalar) < resumen['reglas'] else "")
+                      + (f", ❌ {errores} con error (use Reconciliar para reintentar)." if errores else "."))
+
+        elif op == '5':
+            codigo = input("Código del curso: ")
+            c = almacen.buscar_curso(codigo)
+            if c is None:
+                print("❌ Curso no encontrado.")
+                continue
+            estado = input(f"Nuevo estado (actual: {c.estado}) [DICTANDO/INACTIVO]: ").strip().upper()
+            if not estado:
+                continue
+            # Los permisos que aparecen o desaparecen se aplican en la red al instante
+            if aplicar_cambio("cambiar_estado", codigo, estado):
+                print(f"✔ Curso {c.codigo} ahora está {estado}.")
+            else:
+                print(f"El curso ya estaba {estado}.")
+
+        elif op == '6':
             break  # Volver al menú principal
         else:
             print("❌ Opción inválida.")
@@ -198,7 +581,8 @@ def menu_alumnos():
         print("2) Listar alumnos")
         print("3) Ver detalle de un alumno")
         print("4) Eliminar un alumno")
-        print("5) Volver")
+        print("5) Servicios a los que puede acceder un alumno")
+        print("6) Volver")
         op = input(">> ")
 
         if op == '1':
@@ -209,7 +593,8 @@ def menu_alumnos():
 
             # Crear el nuevo alumno y agregarlo a la lista
             nuevo_alumno = Alumno(nombre, codigo, mac)
-            alumnos.append(nuevo_alumno)  # Agregar el nuevo alumno a la lista de alumnos
+            # Por el motor, como la recarga: si ya figura inscrito en un curso, recibe sus permisos
+            aplicar_cambio("agregar_alumno", nuevo_alumno)
             print(f"✔ Alumno {nombre} agregado correctamente con código {codigo} y MAC {mac}.")
 
         elif op == '2':
@@ -221,26 +606,19 @@ def menu_alumnos():
 
             if sub_op == '1':
                 # Listar todos los alumnos
-                if not alumnos:
+                if not almacen.alumno_por_codigo:
                     print("No hay alumnos cargados.")
                 else:
                     print("\n--- Lista de Todos los Alumnos ---")
-                    for a in alumnos:
+                    for a in almacen.alumnos:
                         print(a)  # Imprime el string que devuelve el método __str__ de Alumno
             
             elif sub_op == '2':
                 # Listar alumnos por curso
                 curso_codigo = input("Ingrese el código del curso (ej. TEL354): ").strip()
-                alumnos_en_curso = []
-                curso_nombre = ""
-                for curso in cursos:
-                    if curso.codigo == curso_codigo:
-                        curso_nombre = curso.nombre
-                        for alumno_codigo in curso.alumnos:
-                            for a in alumnos:
-                                if a.codigo == alumno_codigo:
-                                    alumnos_en_curso.append(a)
-                        break  # Salir del ciclo si encontramos el curso
+                curso = almacen.buscar_curso(curso_codigo)
+                curso_nombre = curso.nombre if curso else ""
+                alumnos_en_curso = almacen.alumnos_de_curso(curso_codigo)
                 if alumnos_en_curso:
                     print(f"\n--- Alumnos en el curso {curso_codigo} - {curso_nombre} ---")
                     for alumno in alumnos_en_curso:
@@ -251,27 +629,35 @@ def menu_alumnos():
         elif op == '3':
             # Ver detalle de un alumno
             codigo = input("Código del alumno: ")
-            encontrado = False
-            for a in alumnos:
-                if a.codigo == codigo:
-                    print(f"Nombre: {a.nombre}\nCódigo: {a.codigo}\nMAC: {a.mac}")
-                    encontrado = True
-                    break
-            if not encontrado:
+            a = almacen.buscar_alumno(codigo)
+            if a:
+                print(f"Nombre: {a.nombre}\nCódigo: {a.codigo}\nMAC: {a.mac}")
+            else:
                 print("❌ Alumno no encontrado.")
         
         elif op == '4':
             # Eliminar un alumno
             codigo = input("Código del alumno a eliminar: ")
-            for i, a in enumerate(alumnos):
-                if a.codigo == codigo:
-                    alumnos.pop(i)
-                    print("✔ Alumno eliminado.")
-                    break
+            if aplicar_cambio("eliminar_alumno", codigo):
+                print("✔ Alumno eliminado.")
             else:
                 print("❌ Alumno no encontrado.")
-        
+
         elif op == '5':
+            # Permisos efectivos según la matriz de acceso
+            codigo = input("Código del alumno: ").strip()
+            if almacen.buscar_alumno(codigo) is None:
+                print("❌ Alumno no encontrado.")
+            else:
+                permisos = sorted(almacen.matriz.permisos_de(codigo))
+                if permisos:
+                    print(f"\n--- Servicios accesibles para {codigo} ---")
+                    for nombre_servidor, servicio in permisos:
+                        print(f"  - {servicio} en {nombre_servidor}")
+                else:
+                    print(f"⚠️ El alumno {codigo} no tiene acceso a ningún servicio.")
+
+        elif op == '6':
             break  # Volver al menú principal
         else:
             print("❌ Opción inválida.")
@@ -283,29 +669,30 @@ def menu_servidores():
         print("1) Listar servidores")
         print("2) Ver detalle de un servidor")
         print("3) Consultar acceso a servicios en un servidor")  # Opción para consultar acceso a servicios
-        print("4) Volver")
+        print("4) Alumnos con acceso a un servicio")
+        print("5) Simular cambio de estado de un curso")
+        print("6) Volver")
         op = input(">> ")
 
         if op == '1':
             # Listar únicamente los nombres de los servidores
-            if not servidores:
+            if not almacen.servidor_por_nombre:
                 print("No hay servidores cargados.")
             else:
                 print("\n--- Lista de Servidores ---")
-                for s in servidores:
+                for s in almacen.servidores:
                     print(s.nombre)  # Solo muestra el nombre del servidor
         
         elif op == '2':
             # Ver detalles completos de un servidor
             nombre = input("Nombre del servidor: ")
-            for s in servidores:
-                if s.nombre.lower() == nombre.lower():
-                    print(f"\n--- Detalles del Servidor {s.nombre} ---")
-                    print(f"Nombre: {s.nombre}")
-                    print(f"IP: {s.ip}")
-                    for servicio in s.servicios:
-                        print(f"  - {servicio['nombre']} ({servicio['protocolo']}:{servicio['puerto']})")
-                    break
+            s = almacen.buscar_servidor(nombre, ignorar_mayusculas=True)
+            if s:
+                print(f"\n--- Detalles del Servidor {s.nombre} ---")
+                print(f"Nombre: {s.nombre}")
+                print(f"IP: {s.ip}")
+                for servicio in s.servicios:
+                    print(f"  - {servicio['nombre']} ({servicio['protocolo']}:{servicio['puerto']})")
             else:
                 print("❌ Servidor no encontrado.")
 
@@ -314,11 +701,7 @@ def menu_servidores():
             print("\n--- CONSULTAR ACCESO A SERVICIOS ---")
             nombre_servidor = input("Ingrese el nombre del servidor: ").strip()
             servicio = input("Ingrese el nombre del servicio (ej. ssh, http, ftp): ").strip()
-            cursos_con_acceso = []
-            for curso in cursos:
-                for servidor in curso.servidores:
-                    if servidor['nombre'] == nombre_servidor and servicio in servidor['servicios_permitidos']:
-                        cursos_con_acceso.append(curso)
+            cursos_con_acceso = almacen.cursos_que_permiten(nombre_servidor, servicio)
 
             if cursos_con_acceso:
                 print(f"Cursos con acceso al servicio {servicio} en el servidor {nombre_servidor}:")
@@ -328,26 +711,64 @@ def menu_servidores():
                 print(f"❌ No se encontraron cursos con acceso al servicio {servicio} en el servidor {nombre_servidor}.")
 
         elif op == '4':
+            # Consulta masiva sobre la matriz de acceso
+            nombre_servidor = input("Ingrese el nombre del servidor: ").strip()
+            servicio = input("Ingrese el nombre del servicio (ej. ssh, http, ftp): ").strip()
+            codigos = almacen.matriz.alumnos_con_acceso(nombre_servidor, servicio)
+            if not codigos:
+                print(f"❌ Ningún alumno tiene acceso a {servicio} en {nombre_servidor}.")
+            else:
+                print(f"{len(codigos)} alumno(s) con acceso a {servicio} en {nombre_servidor}.")
+                if input("¿Listarlos? (s/n): ").strip().lower() == 's':
+                    for cod in codigos:
+                        print(almacen.buscar_alumno(cod))
+
+        elif op == '5':
+            # Qué pasaría si un curso cambia de estado, sin aplicarlo
+            codigo_curso = input("Código del curso: ").strip()
+            curso = almacen.buscar_curso(codigo_curso)
+            if curso is None:
+                print("❌ Curso no encontrado.")
+                continue
+            estado = input(f"Nuevo estado (actual {curso.estado}): ").strip().upper()
+            cambios = almacen.matriz.simular_estado(codigo_curso, estado)
+            if not cambios['ganan'] and not cambios['pierden']:
+                print("✔ El cambio no modifica ningún acceso.")
+            for tipo, titulo in (('ganan', "Ganan acceso"), ('pierden', "Pierden acceso")):
+                for (nombre_servidor, servicio), bits in sorted(cambios[tipo].items()):
+                    codigos = almacen.matriz.codigos(bits)
+                    print(f"{titulo} a {servicio} en {nombre_servidor}: {len(codigos)} alumno(s)")
+                    for cod in codigos[:20]:
+                        print(f"  - {cod}")
+                    if len(codigos) > 20:
+                        print(f"  ... y {len(codigos) - 20} más")
+
+        elif op == '6':
             break  # Volver al menú principal
         else:
             print("❌ Opción inválida.")
 
 
 # ===== Submenú Conexiones =====
+def autorizar(cod_alumno, servidor, servicio):
+    """
+    Chequeo de autorización sin salida por pantalla (lo usan el menú y la API).
+    """
+    # Solo cursos DICTANDO en los que el alumno está inscrito (búsqueda indexada)
+    inicio = time.perf_counter()
+    if almacen.puede_conectarse(cod_alumno, servidor, servicio):
+        m_permitido(time.perf_counter() - inicio)
+        return True
+    m_denegado(time.perf_counter() - inicio)
+    return False
+
 def alumno_puede_conectarse(cod_alumno, servidor, servicio):
     """
     Verifica si un alumno tiene acceso al servicio de un servidor
     según los cursos y servicios permitidos.
     """
-    for curso in cursos:
-        if curso.estado != "DICTANDO":
-            continue  # Solo permite acceso a cursos activos
-        if cod_alumno not in curso.alumnos:
-            continue  # El alumno no está en este curso
-        for s in curso.servidores:
-            if s['nombre'] == servidor:
-                if servicio in s['servicios_permitidos']:
-                    return True  # El alumno tiene acceso al servicio
+    if autorizar(cod_alumno, servidor, servicio):
+        return True  # El alumno tiene acceso al servicio
     print(f"❌ El alumno {cod_alumno} no tiene acceso al servicio {servicio} en el servidor {servidor}.")
     return False  # El alumno no está autorizado
 
@@ -360,6 +781,7 @@ def build_arp_flow(handler, dpid, ip_src, ip_dst, out_port, sentido="arp"):
     flow = {
         "switch": dpid,
         "name": f"{handler}_{sentido}",
+        "cookie": str(cookie_flow(f"{handler}_{sentido}")),  # Cookie propia (ver inactividad)
         "priority": "32769",  # Priorizamos ARP
         "eth_type": "0x0806",  # ARP
         "arp_spa": ip_src,  # IP de origen
@@ -376,6 +798,7 @@ def build_flow(handler, dpid, mac_src, ip_src, mac_dst, ip_dst, tcp_port, out_po
     flow = {
         "switch": dpid,  # DPID del switch
         "name": f"{handler}_{sentido}",  # Flow name (handler + dirección)
+        "cookie": str(cookie_flow(f"{handler}_{sentido}")),  # Cookie propia: identifica el flow en las estadísticas
         "priority": "32768",  # Prioridad del flow
         "eth_type": "0x0800",  # Tipo de Ethernet: IPv4
         "ipv4_src": ip_src,  # Dirección IP de origen
@@ -389,16 +812,653 @@ def build_flow(handler, dpid, mac_src, ip_src, mac_dst, ip_dst, tcp_port, out_po
 
 def get_route(src_dpid, src_port, dst_dpid, dst_port):
     """
-    Función simulada para obtener una ruta entre dos dispositivos en la red SDN.
-    Debe devolver una lista de switches y puertos (dpid y port) entre el origen y el destino.
+    Obtiene la ruta más corta entre dos dispositivos en la red SDN.
+    Devuelve una lista de saltos {'dpid', 'in_port', 'port'} (puerto de entrada
+    y de salida en cada switch) o None si no hay camino. La topología se
+    descarga de Floodlight una sola vez y las rutas quedan en caché por par.
+    """
+    with m_ruta.medir():
+        topologia.asegurar_cargada()
+        saltos = topologia.saltos(src_dpid, src_port, dst_dpid, dst_port)
+    m_rutas.incrementar(resultado="encontrada" if saltos is not None else "sin_camino")
+    return saltos
+
+def actualizar_topologia():
+    """
+    Vuelve a consultar switches y enlaces e invalida solo las rutas
+    afectadas. Las conexiones ya instaladas siguen con su ruta anterior
+    hasta Reconciliar, que reconstruye sus flows con las rutas nuevas.
+    """
+    return topologia.actualizar()
+
+def menu_topologia():
+    print("\n--- Topología de la red ---")
+    estado = topologia.estado()
+    if not estado['cargada']:
+        print("Todavía no se cargó (se descarga con la primera ruta).")
+    else:
+        print(f"Switches: {estado['switches']}, enlaces: {estado['enlaces']}, "
+              f"rutas en caché: {estado['rutas_en_cache']}")
+    print(f"Refresco: {f'cada {TOPOLOGIA_INTERVALO:g}s' if estado['refresco'] else 'solo a pedido'}")
+    if input("¿Actualizar ahora? (s/n): ").strip().lower() != 's':
+        return
+    try:
+        cambios = actualizar_topologia()
+    except Exception as e:
+        print(f"❌ No se pudo obtener la topología de Floodlight: {e}")
+        return
+    print(f"✔ Topología actualizada: {cambios['switches']} switches")
+    print(f"  Enlaces: +{cambios['enlaces_agregados']} / -{cambios['enlaces_eliminados']}, "
+          f"switches: +{cambios['switches_agregados']} / -{cambios['switches_eliminados']}")
+    print(f"  Rutas invalidadas: {cambios['rutas_invalidadas']}")
+    if cambios['rutas_invalidadas'] and almacen.hay_conexiones():
+        print("⚠️ Use Reconciliar para mover las conexiones existentes a las rutas nuevas.")
+
+
+SENTIDOS = ("fw", "bw", "arp_fw", "arp_bw")
+
+def nombres_flows(conexion):
+    """
+    Nombres de los flows que instaló una conexión (cuatro por switch de la ruta).
+    """
+    if conexion.get('flows'):
+        return list(conexion['flows'])
+    return [f"{conexion['handler']}_{sentido}" for sentido in SENTIDOS]
+
+def ubicar_servidor(nombre_servidor):
+    """
+    (dpid, puerto) del servidor según la caché de ubicaciones, o None.
+    """
+    try:
+        return ubicaciones.buscar_ip(almacen.buscar_servidor(nombre_servidor).ip)
+    except Exception as e:
+        print(f"⚠️ No se pudo consultar el device tracker de Floodlight: {e}")
+        return None
+
+def ubicar_conexion(conexion):
+    """
+    Completa dpid/puerto del servidor y dpid_alumno/puerto_alumno con la caché
+    de ubicaciones cuando no vienen dados. Devuelve True si se conoce la
+    ubicación del servidor.
+    """
+    if not conexion.get('dpid'):
+        ap = ubicar_servidor(conexion['servidor'])
+        if ap:
+            conexion['dpid'], conexion['puerto'] = ap
+    try:
+        if not conexion.get('dpid_alumno'):
+            ap = ubicaciones.buscar_mac(almacen.buscar_alumno(conexion['alumno']).mac)
+            if ap:
+                conexion['dpid_alumno'], conexion['puerto_alumno'] = ap
+    except Exception as e:
+        print(f"⚠️ No se pudo consultar el device tracker de Floodlight: {e}")
+    return bool(conexion.get('dpid'))
+
+def saltos_conexion(conexion):
+    """
+    Saltos de la conexión: la ruta real entre el switch del alumno y el del
+    servidor si se conoce la ubicación del alumno, o un único salto en el
+    switch del servidor. None si no hay camino.
+    """
+    if conexion.get('dpid_alumno'):
+        return get_route(conexion['dpid_alumno'], conexion['puerto_alumno'],
+                         conexion['dpid'], conexion['puerto'])
+    return [{'dpid': conexion['dpid'], 'in_port': 1, 'port': conexion['puerto']}]
+
+def flows_conexion(conexion, saltos=None):
+    """
+    Construye los flows (fw, bw, arp_fw, arp_bw) de una conexión en cada
+    switch de su ruta. El salto final (switch del servidor) conserva los
+    nombres {handler}_{sentido}; los intermedios agregan _h{i}.
+    """
+    if saltos is None:
+        saltos = saltos_conexion(conexion)
+    handler = conexion['handler']
+    ip_servidor = almacen.buscar_servidor(conexion['servidor']).ip
+    mac_alumno = almacen.buscar_alumno(conexion['alumno']).mac
+    puerto_servicio = puerto_de_servicio(conexion['servicio'])
+    flows = []
+    for i, hop in enumerate(saltos):
+        sufijo = "" if i == len(saltos) - 1 else f"_h{i}"
+        dpid, out_port, in_port = hop['dpid'], hop['port'], hop['in_port']
+        flows += [
+            # Flow de alumno a servidor (forwarding)
+            build_flow(handler, dpid, mac_alumno, ip_servidor, mac_alumno, ip_servidor, puerto_servicio, out_port, sentido=f"fw{sufijo}"),
+            # Flow de servidor a alumno (reverse flow)
+            build_flow(handler, dpid, mac_alumno, ip_servidor, mac_alumno, ip_servidor, puerto_servicio, in_port, sentido=f"bw{sufijo}"),
+            # Flujos ARP (para resolución de IPs)
+            build_arp_flow(handler, dpid, ip_servidor, ip_servidor, out_port, sentido=f"arp_fw{sufijo}"),
+            build_arp_flow(handler, dpid, ip_servidor, ip_servidor, in_port, sentido=f"arp_bw{sufijo}"),
+        ]
+    return flows
+
+def puerto_de_servicio(nombre_servicio):
+    return 23 if nombre_servicio == "ssh" else 80  # Asumir puerto SSH o HTTP
+
+def nuevo_handler():
+    return os.urandom(4).hex()  # 8 dígitos hex aleatorios
+
+
+# ===== Aprovisionamiento en lote =====
+def expandir_curso(codigo_curso, alumnos=None):
+    """
+    Devuelve todas las tuplas (alumno, servidor, servicio) autorizadas por un
+    curso DICTANDO: cada alumno inscrito (y registrado) por cada servicio
+    permitido del curso. Con `alumnos` (códigos), solo las de esos alumnos.
+    """
+    curso = almacen.buscar_curso(codigo_curso)
+    if curso is None or curso.estado != "DICTANDO":
+        return []
+    if alumnos is None:
+        inscritos = almacen.alumnos_de_curso(codigo_curso)
+    else:
+        inscritos = [a for a in map(almacen.buscar_alumno, alumnos)
+                     if a is not None and codigo_curso in almacen.cursos_de_alumno.get(a.codigo, ())]
+    return [(a.codigo, s['nombre'], servicio)
+            for a in inscritos
+            for s in curso.servidores
+            for servicio in s['servicios_permitidos']]
+
+def leer_solicitudes(path):
+    """
+    Lee solicitudes de conexión desde un CSV (cabecera alumno,servidor,servicio
+    y opcionalmente dpid,puerto,dpid_alumno,puerto_alumno) o un YAML con una
+    lista de esos mismos campos.
+    En el YAML, las entradas con 'curso' se expanden a todo el curso.
+    """
+    if path.endswith(".csv"):
+        with open(path, newline='') as f:
+            filas = list(csv.DictReader(f))
+    else:
+        import yaml
+        with open(path, 'r') as f:
+            filas = yaml.safe_load(f) or []
+        if isinstance(filas, dict):
+            filas = filas.get("conexiones", [])
+
+    solicitudes = []
+    for fila in filas:
+        extra = {k: str(fila[k]) for k in ('dpid', 'puerto', 'dpid_alumno', 'puerto_alumno')
+                 if fila.get(k) not in (None, "")}
+        if fila.get('curso'):
+            solicitudes.extend(dict(zip(('alumno', 'servidor', 'servicio'), t), **extra)
+                               for t in expandir_curso(str(fila['curso'])))
+        else:
+            solicitudes.append(dict(alumno=str(fila['alumno']), servidor=fila['servidor'],
+                                    servicio=fila['servicio'], **extra))
+    return solicitudes
+
+def provisionar_lote(solicitudes, dpid=None, out_port=None):
+    """
+    Valida las solicitudes con la política indexada, ubica alumno y servidor
+    con la caché de ubicaciones, construye todos los flows y los instala en un
+    único lote paralelo. dpid/out_port son el valor por defecto para servidores
+    que no se puedan ubicar. Solo se registran las conexiones cuyos flows
+    quedaron instalados; el registro se hace bajo `estado_lock`, volviendo a
+    validar cada conexión como en crear_conexion. Los flows que sobran (de
+    conexiones incompletas o que ya no corresponden) se borran en un lote.
+    Devuelve un resumen con conteos y throughput.
+    """
+    def validar(clave):
+        if clave in vistas or almacen.registro.existe(*clave):
+            return 'repetida'
+        if (not almacen.puede_conectarse(*clave) or almacen.buscar_alumno(clave[0]) is None
+                or almacen.buscar_servidor(clave[1]) is None):
+            return 'rechazada'
+        return None
+
+    inicio = time.perf_counter()
+    vistas = set()
+    nuevas, rechazadas, repetidas = [], 0, 0
+    for sol in solicitudes:
+        clave = (sol['alumno'], sol['servidor'], sol['servicio'])
+        fallo = validar(clave)
+        if fallo == 'repetida':
+            repetidas += 1
+            continue
+        vistas.add(clave)
+        if fallo:
+            rechazadas += 1
+            continue
+        conexion = {'handler': nuevo_handler(), 'alumno': sol['alumno'], 'servidor': sol['servidor'],
+                    'servicio': sol['servicio']}
+        for k in ('dpid', 'puerto', 'dpid_alumno', 'puerto_alumno'):
+            if sol.get(k):
+                conexion[k] = sol[k]
+        if not ubicar_conexion(conexion):
+            if not dpid:
+                rechazadas += 1
+                continue
+            conexion['dpid'], conexion['puerto'] = dpid, out_port
+        saltos = saltos_conexion(conexion)
+        if saltos is None:
+            rechazadas += 1
+            continue
+        flows_c = flows_conexion(conexion, saltos)
+        conexion['flows'] = [f['name'] for f in flows_c]
+        nuevas.append((conexion, flows_c))
+
+    flows = [f for _, flows_c in nuevas for f in flows_c]
+    resultados = cola.push_flows(flows)
+    fallidos = {r['name'] for r in resultados if not r['ok']}
+
+    # ----- Alta atómica: la política pudo cambiar durante el envío -----
+    completas, sobrantes = [], []
+    with estado_lock:
+        vistas = set()
+        for c, _ in nuevas:
+            clave = (c['alumno'], c['servidor'], c['servicio'])
+            if fallidos.isdisjoint(c['flows']) and validar(clave) is None:
+                vistas.add(clave)
+                completas.append(c)
+            else:
+                sobrantes.extend(n for n in c['flows'] if n not in fallidos)
+        almacen.agregar_conexiones(completas)
+    # No dejar flows huérfanos de conexiones incompletas o descartadas
+    if sobrantes:
+        cola.delete_flows(sobrantes)
+    creadas = len(completas)
+
+    duracion = time.perf_counter() - inicio
+    return {
+        'solicitudes': len(solicitudes),
+        'creadas': creadas,
+        'rechazadas': rechazadas,
+        'repetidas': repetidas,
+        'fallidas': len(nuevas) - creadas,
+        'flows': len(flows),
+        'flows_fallidos': len(fallidos),
+        'segundos': duracion,
+        'flows_por_segundo': len(flows) / duracion if duracion > 0 else 0.0,
+    }
+
+def mostrar_resumen_lote(resumen):
+    print("\n--- Resumen del aprovisionamiento ---")
+    print(f"Solicitudes: {resumen['solicitudes']}")
+    print(f"✔ Conexiones creadas: {resumen['creadas']}")
+    print(f"⛔ No autorizadas: {resumen['rechazadas']}")
+    print(f"Ya existentes/duplicadas: {resumen['repetidas']}")
+    print(f"❌ Fallidas: {resumen['fallidas']} ({resumen['flows_fallidos']} flows con error)")
+    print(f"Flows enviados: {resumen['flows']} en {resumen['segundos']:.2f}s "
+          f"({resumen['flows_por_segundo']:.1f} flows/s)")
+
+
+# ===== Operaciones sin interacción (API) =====
+def _fallo(motivo, error):
+    return {'ok': False, 'motivo': motivo, 'error': error, 'conexion': None}
+
+def crear_conexion(cod_alumno, nombre_servidor, nombre_servicio, **ubicacion):
+    """
+    Crea una conexión sin pedir datos. `ubicacion` puede traer dpid, puerto,
+    dpid_alumno y puerto_alumno; lo que falte se busca en la caché de
+    ubicaciones. Las consultas al controlador (ubicación y ruta) se hacen
+    sin tomar `estado_lock`; después, bajo el lock, se vuelve a validar
+    (permiso, alumno, servidor y que no exista) y se da de alta, así dos
+    solicitudes iguales no crean dos conexiones. Los flows se instalan
+    después, fuera del lock y en paralelo. Si algún flow falla, la conexión
+    se deshace. Devuelve un dict con ok, motivo (no_autorizado, existente,
+    sin_ubicacion, sin_ruta o controlador), error y la conexión.
+    """
+    conexion = {'handler': nuevo_handler(), 'alumno': cod_alumno, 'servidor': nombre_servidor,
+                'servicio': nombre_servicio}
+    for k in ('dpid', 'puerto', 'dpid_alumno', 'puerto_alumno'):
+        if ubicacion.get(k) not in (None, ""):
+            conexion[k] = str(ubicacion[k])
+
+    def validar():
+        if (not autorizar(cod_alumno, nombre_servidor, nombre_servicio)
+                or almacen.buscar_alumno(cod_alumno) is None or almacen.buscar_servidor(nombre_servidor) is None):
+            return _fallo('no_autorizado', f"El alumno {cod_alumno} no tiene acceso al servicio "
+                                           f"{nombre_servicio} en el servidor {nombre_servidor}")
+        if almacen.registro.existe(cod_alumno, nombre_servidor, nombre_servicio):
+            return _fallo('existente', "La conexión ya existe")
+        return None
+
+    # Chequeo previo para no consultar al controlador en vano
+    fallo = validar()
+    if fallo:
+        return fallo
+    # ----- Consultas de red, sin el lock -----
+    try:
+        if not ubicar_conexion(conexion):
+            return _fallo('sin_ubicacion', f"No se conoce la ubicación del servidor {nombre_servidor}")
+        saltos = saltos_conexion(conexion)
+    except Exception as e:
+        return _fallo('controlador', f"No se pudo obtener la topología de Floodlight: {e}")
+    if saltos is None:
+        return _fallo('sin_ruta', "No existe una ruta entre el alumno y el servidor")
+
+    # ----- Alta atómica: la política pudo cambiar durante las consultas -----
+    with estado_lock:
+        fallo = validar()
+        if fallo:
+            return fallo
+        flows = flows_conexion(conexion, saltos)
+        conexion['flows'] = [f['name'] for f in flows]
+        almacen.agregar_conexion(conexion)
+
+    resultados = cola.push_flows(flows)
+    errores = [r for r in resultados if not r['ok']]
+    if errores:
+        cola.delete_flows([r['name'] for r in resultados if r['ok']])
+        with estado_lock:
+            almacen.eliminar_conexion(conexion['handler'])
+        return _fallo('controlador', f"{len(errores)} flows no se pudieron instalar: {errores[0]['error']}")
+    return {'ok': True, 'motivo': None, 'error': None, 'conexion': conexion}
+
+def eliminar_inactivas(handlers):
+    """
+    Elimina en lote las conexiones inactivas y encola el borrado de sus
+    flows. Devuelve la cantidad eliminada.
+    """
+    with estado_lock:
+        eliminadas = almacen.registro.eliminar_handlers(handlers)
+    if eliminadas:
+        cola.encolar_delete([n for c in eliminadas for n in nombres_flows(c)])
+        m_inactivas.incrementar(len(eliminadas))
+    return len(eliminadas)
+
+def borrar_conexion(handler):
+    """
+    Elimina una conexión y sus flows. Devuelve None si el handler no existe
+    o un dict con la conexión y los resultados con error.
+    """
+    with estado_lock:
+        conexion = almacen.buscar_conexion(handler)
+        if conexion is None:
+            return None
+        almacen.eliminar_conexion(handler)
+    errores = [r for r in cola.delete_flows(nombres_flows(conexion)) if not r['ok']]
+    return {'conexion': conexion, 'errores': errores}
+
+
+# ===== Compilación de políticas por curso =====
+def permisos_curso(codigo_curso):
+    """
+    Lista de permisos (alumno, servidor, servicio) del curso con la ruta de
+    cada alumno hasta el servidor, en el formato que espera el compilador.
+    Se omiten los permisos sin ubicación conocida del servidor.
+    """
+    return permisos_de(expandir_curso(codigo_curso))
+
+def permisos_de(tuplas):
+    permisos = []
+    for cod_alumno, nombre_servidor, servicio in tuplas:
+        c = {'alumno': cod_alumno, 'servidor': nombre_servidor, 'servicio': servicio}
+        if not ubicar_conexion(c):
+            continue
+        saltos = saltos_conexion(c)
+        if saltos is None:
+            continue
+        permisos.append({
+            'alumno': cod_alumno,
+            'mac': almacen.buscar_alumno(cod_alumno).mac,
+            'servidor': nombre_servidor,
+            'ip': almacen.buscar_servidor(nombre_servidor).ip,
+            'servicio': servicio,
+            'tcp_port': puerto_de_servicio(servicio),
+            'saltos': saltos,
+        })
+    return permisos
+
+def compilar_curso(codigo_curso):
+    """
+    Compila la política del curso por separado (para mostrar el ahorro).
+    Devuelve (permisos, resumen con las reglas ahorradas).
+    """
+    permisos = permisos_curso(codigo_curso)
+    return permisos, compilador.resumen(permisos, compilador.compilar(permisos))
+
+def mostrar_resumen_compilacion(codigo_curso, resumen):
+    print(f"\n--- Política compilada de {codigo_curso} ---")
+    print(f"Permisos (alumno × servicio): {resumen['permisos']}")
+    print(f"Flows por conexión: {resumen['sin_compilar']}")
+    print(f"Reglas compiladas: {resumen['reglas']}")
+    print(f"✔ Ahorro: {resumen['ahorro']} reglas ({resumen['porcentaje']:.1f}%)")
+
+
+# ===== Actualización incremental de la red =====
+def cubierto_por_compilado(cod_alumno, nombre_servidor, servicio):
+    """
+    True si el permiso ya lo otorga la política compilada de algún curso
+    DICTANDO del alumno (no hace falta una conexión propia).
+    """
+    permitidos = almacen.cursos_con_permiso.get((nombre_servidor, servicio), {})
+    return any(c in cursos_compilados and c in permitidos and almacen.curso_por_codigo[c].estado == "DICTANDO"
+               for c in almacen.cursos_de_alumno.get(cod_alumno, ()))
+
+def otorgar_permisos(tuplas):
+    """
+    Crea en lote las conexiones de los permisos que acaban de aparecer.
+    """
+    solicitudes = [{'alumno': a, 'servidor': s, 'servicio': v} for a, s, v in tuplas
+                   if not cubierto_por_compilado(a, s, v)]
+    if not solicitudes:
+        return
+    try:
+        resumen = provisionar_lote(solicitudes)
+    except Exception as e:
+        print(f"❌ No se pudieron crear las conexiones nuevas: {e}")
+        return
+    print(f"✔ Acceso otorgado: {resumen['creadas']} conexiones creadas"
+          + (f", ⚠️ {resumen['rechazadas'] + resumen['fallidas']} sin crear (sin ubicación o con error)."
+             if resumen['rechazadas'] + resumen['fallidas'] else "."))
+
+def revocar_permisos(tuplas):
+    """
+    Elimina las conexiones de los permisos que acaban de desaparecer y
+    encola el borrado de sus flows.
+    """
+    eliminadas = [c for a, s, v in tuplas for c in almacen.registro.eliminar_por(alumno=a, servidor=s, servicio=v)]
+    if not eliminadas:
+        return
+    print(f"✔ Acceso revocado: {len(eliminadas)} conexiones eliminadas.")
+    encolar_delete([n for c in eliminadas for n in nombres_flows(c)])
+
+def rehacer_conexiones(conexiones):
+    """
+    Reconstruye en el lugar los flows de conexiones que siguen permitidas
+    pero cuyo servidor cambió (p. ej. de IP): mismo handler y misma
+    ubicación guardada, así que cada push reemplaza al flow del mismo
+    nombre. Si cambió la ruta se retiran los flows que sobran. Una
+    conexión sin ruta conserva sus flows hasta Reconciliar.
     """
-    # Aquí llamarías a la API de Floodlight o usarías un algoritmo de enrutamiento
-    # Esto es solo un ejemplo
-    route = [
-        {'dpid': src_dpid, 'port': src_port},
-        {'dpid': dst_dpid, 'port': dst_port}
-    ]
-    return route
+    flows, sobrantes, actualizadas, sin_ruta = [], [], [], 0
+    for c in conexiones:
+        try:
+            saltos = saltos_conexion(c)
+        except Exception as e:
+            print(f"⚠️ No se pudo obtener la topología de Floodlight: {e}")
+            saltos = None
+        if saltos is None:
+            sin_ruta += 1
+            continue
+        nuevos = flows_conexion(c, saltos)
+        nombres = [f['name'] for f in nuevos]
+        sobrantes += [n for n in nombres_flows(c) if n not in nombres]
+        if nombres != c.get('flows'):
+            c['flows'] = nombres
+            actualizadas.append(c)
+        flows += nuevos
+    if actualizadas:
+        almacen.agregar_conexiones(actualizadas)
+    if flows:
+        print(f"✔ Flows reconstruidos: {len(conexiones) - sin_ruta} conexiones.")
+        encolar_push(flows)
+        encolar_delete(sobrantes)
+    if sin_ruta:
+        print(f"⚠️ {sin_ruta} conexiones sin ruta conservan sus flows anteriores (use Reconciliar).")
+
+def recompilar_curso(codigo_curso, alumnos=None):
+    """
+    Si el curso usa política compilada, vuelve a cargar sus permisos (solo
+    los de `alumnos` si se indican) y aplica solo la diferencia con las
+    reglas instaladas. Una regla que otro curso compilado sigue
+    necesitando no se retira.
+    """
+    if codigo_curso not in cursos_compilados:
+        return
+    try:
+        if alumnos is None or codigo_curso not in politica.cursos:
+            cargar_politica([codigo_curso])
+        else:
+            cargar_alumnos(codigo_curso, alumnos)
+    except Exception as e:
+        print(f"❌ No se pudo recompilar la política de {codigo_curso}: {e}")
+        return
+    aplicar_politica(codigo_curso)
+
+def cargar_politica(codigos):
+    """
+    Carga en `politica` los permisos de `codigos` y los de los cursos
+    compilados que aún no están cargados: tras restaurar un snapshot la
+    política empieza vacía y las reglas compartidas deben salir completas.
+    Las rutas se calculan fuera del lock.
+    """
+    codigos = list(dict.fromkeys(list(codigos) + [c for c in cursos_compilados if c not in politica.cursos]))
+    permisos = {c: permisos_curso(c) for c in codigos}
+    with estado_lock:
+        for codigo, lista in permisos.items():
+            politica.cargar_curso(codigo, lista)
+
+def cargar_alumnos(codigo_curso, alumnos):
+    """
+    Reemplaza en `politica` solo los permisos de `alumnos` en el curso: las
+    reglas que se regeneran son las de los switches por los que pasan.
+    """
+    cargar_politica([])
+    permisos = permisos_de(expandir_curso(codigo_curso, alumnos))
+    with estado_lock:
+        for cod_alumno in alumnos:
+            politica.quitar(codigo_curso, cod_alumno)
+        for permiso in permisos:
+            politica.agregar(codigo_curso, permiso)
+
+def aplicar_politica(titulo):
+    """
+    Encola el delta de las reglas compiladas desde el último cambio.
+    """
+    with estado_lock:
+        instalar, retirar = politica.cambios()
+    if instalar or retirar:
+        print(f"✔ Política de {titulo}: {len(instalar)} reglas a instalar, {len(retirar)} a retirar.")
+        encolar_push(instalar)
+        encolar_delete(retirar)
+
+def quitar_compilados_eliminados():
+    """
+    Bajo `estado_lock`: quita de la política los cursos compilados que ya
+    no existen en el almacén. Devuelve sus códigos.
+    """
+    quitados = [c for c in cursos_compilados if c not in almacen.curso_por_codigo]
+    for c in quitados:
+        del cursos_compilados[c]
+        politica.quitar(c)
+    return quitados
+
+def aplicar_politica_eliminados(quitados):
+    """
+    Retira las reglas de los cursos compilados quitados. Antes carga los
+    compilados que siguen sin cargar (tras un snapshot): sus reglas
+    compartidas todavía incluyen a los alumnos de los cursos quitados.
+    """
+    if quitados:
+        try:
+            cargar_politica([])
+        except Exception as e:
+            print(f"❌ No se pudo recompilar la política de los cursos restantes: {e}")
+    aplicar_politica("los cursos eliminados")
+
+# Todos los cambios de inscripción/estado/bajas pasan por el motor
+motor = MotorIncremental(almacen, otorgar=otorgar_permisos, revocar=revocar_permisos,
+                         recompilar=recompilar_curso)
+
+def aplicar_cambio(operacion, *args):
+    """
+    Ejecuta una operación del motor (inscribir, desinscribir, cambiar_estado,
+    agregar_alumno, eliminar_alumno) como la recarga en caliente: el almacén
+    se modifica bajo `estado_lock` y las conexiones y reglas se aplican
+    después, fuera del lock. Devuelve el resultado del cambio en el almacén.
+    """
+    otorgados, revocados, cursos = [], [], []
+    diferido = MotorIncremental(almacen, otorgar=otorgados.extend, revocar=revocados.extend,
+                                recompilar=lambda curso, alumnos=None: cursos.append((curso, alumnos)))
+    with estado_lock:
+        resultado = getattr(diferido, operacion)(*args)[0]
+    revocar_permisos(revocados)
+    otorgar_permisos(otorgados)
+    for codigo, alumnos in cursos:
+        recompilar_curso(codigo, alumnos)
+    return resultado
+
+
+# ===== Reconciliación con el controlador =====
+def flows_deseados():
+    """
+    Compila el conjunto de flows deseado a partir de las conexiones activas
+    y de los cursos compilados (con las rutas actuales). Devuelve
+    ({nombre: flow}, nombres a conservar de conexiones que no se pudieron
+    reconstruir, conexiones cuyos nombres de flows cambiaron, política
+    compilada recalculada).
+    """
+    deseados, conservar, actualizadas = {}, set(), []
+    for c in almacen.conexiones:
+        try:
+            saltos = saltos_conexion(c)
+            flows = flows_conexion(c, saltos) if saltos else None
+        except (AttributeError, KeyError):
+            flows = None  # alumno o servidor ya no existen en la política
+        if flows is None:
+            conservar.update(nombres_flows(c))
+            continue
+        nombres = [f['name'] for f in flows]
+        if nombres != c.get('flows'):
+            c['flows'] = nombres
+            actualizadas.append(c)
+        deseados.update((f['name'], f) for f in flows)
+    # Reglas compiladas de los cursos que siguen DICTANDO
+    recalculada = compilador.PoliticaCompilada()
+    for codigo in cursos_compilados:
+        recalculada.cargar_curso(codigo, permisos_curso(codigo))
+    recalculada.cambios()
+    deseados.update(recalculada.reglas)
+    return deseados, conservar, actualizadas, recalculada
+
+def planificar_reconciliacion():
+    """
+    Descarga la lista de flows del controlador (una sola petición) y calcula
+    el delta contra el estado deseado. Antes vacía la cola de flows para
+    comparar contra lo que ya se envió.
+    """
+    cola.esperar()
+    deseados, conservar, actualizadas, recalculada = flows_deseados()
+    instalados = reconciliacion.listar_instalados(floodlight)
+    plan = reconciliacion.planificar(deseados, instalados, conservar)
+    plan['actualizadas'] = actualizadas
+    plan['politica'] = recalculada
+    plan['conservados'] = len(conservar)
+    return plan
+
+def aplicar_reconciliacion(plan):
+    """
+    Aplica el delta en lote y guarda los nombres de flows actualizados.
+    Devuelve los resultados con error.
+    """
+    errores = reconciliacion.aplicar(cola, plan)
+    if plan['actualizadas']:
+        almacen.agregar_conexiones(plan['actualizadas'])
+    with estado_lock:
+        politica.adoptar(plan['politica'])
+    return errores
+
+def mostrar_plan(plan):
+    print("\n--- Reconciliación ---")
+    print(f"✔ Correctos: {plan['correctos']}")
+    print(f"Faltantes: {len(plan['faltantes'])}")
+    print(f"Con contenido distinto: {len(plan['cambiados'])}")
+    print(f"Obsoletos (propios, sin conexión): {len(plan['obsoletos'])}")
+    if plan['conservados']:
+        print(f"⚠️ Conservados sin verificar (alumno/servidor eliminado): {plan['conservados']}")
 
 
 def menu_conexiones():
@@ -407,7 +1467,15 @@ def menu_conexiones():
         print("1) Crear conexión")
         print("2) Listar conexiones")
         print("3) Eliminar conexión")
-        print("4) Volver")
+        print("4) Crear conexiones en lote (archivo o curso)")
+        print("5) Eliminar conexiones en lote (por alumno/servidor/servicio)")
+        print("6) Reconciliar con el controlador")
+        print("7) Cola de flows")
+        print("8) Conexiones inactivas")
+        print("9) Topología de la red")
+        print("10) Volver")
+        if cola.sin_revisar:
+            print(f"⚠️ {cola.sin_revisar} operaciones de flows fallaron (opción 7).")
         op = input(">> ")
 
         if op == '1':
@@ -422,69 +1490,232 @@ def menu_conexiones():
                 continue
 
             # Asignar un handler único para la conexión
-            handler = str(uuid.uuid4())[:8]
-            conexiones.append({'handler': handler, 'alumno': cod_alumno, 'servidor': nombre_servidor, 'servicio': nombre_servicio})
-            print(f"✔ Conexión creada. Handler: {handler}")
-
-            # Obtener los datos necesarios para los flows
-            ip_servidor = next(s.ip for s in servidores if s.nombre == nombre_servidor)
-            mac_alumno = next(a.mac for a in alumnos if a.codigo == cod_alumno)
+            handler = nuevo_handler()
+            conexion = {'handler': handler, 'alumno': cod_alumno, 'servidor': nombre_servidor, 'servicio': nombre_servicio}
 
-            # Solicitar DPID y puerto de salida
-            dpid = input("Ingrese el DPID del switch conectado al servidor : ")
-            out_port = input("Ingrese el puerto de salida para el servidor: ")
+            # Ubicar alumno y servidor con la caché; solo se pregunta si el controlador no los conoce
+            if not ubicar_conexion(conexion):
+                conexion['dpid'] = input("Ingrese el DPID del switch conectado al servidor : ")
+                conexion['puerto'] = input("Ingrese el puerto de salida para el servidor: ")
+            if not conexion.get('dpid_alumno'):
+                # Ubicación del alumno (opcional): permite instalar flows en toda la ruta
+                dpid_alumno = input("DPID del switch del alumno (vacío = mismo switch): ").strip()
+                if dpid_alumno:
+                    conexion['dpid_alumno'] = dpid_alumno
+                    conexion['puerto_alumno'] = input("Puerto del alumno en ese switch: ")
 
-            puerto_servicio = 23 if nombre_servicio == "ssh" else 80  # Asumir puerto SSH o HTTP
-
-            # Crear el flow de alumno a servidor (forwarding)
-            flow_fw = build_flow(handler, dpid, mac_alumno, ip_servidor, mac_alumno, ip_servidor, puerto_servicio, out_port, sentido="fw")
-            push_flow(flow_fw)
-            print(f"✔ Flow de Forwarding instalado: {flow_fw['name']}")
-
-            # Crear el flow de servidor a alumno (reverse flow)
-            flow_bw = build_flow(handler, dpid, mac_alumno, ip_servidor, mac_alumno, ip_servidor, puerto_servicio, 1, sentido="bw")
-            push_flow(flow_bw)
-            print(f"✔ Flow de Reverse instalado: {flow_bw['name']}")
+            try:
+                saltos = saltos_conexion(conexion)
+            except Exception as e:
+                print(f"❌ No se pudo obtener la topología de Floodlight: {e}")
+                continue
+            if saltos is None:
+                print("❌ No existe una ruta entre el alumno y el servidor.")
+                continue
 
-            # Flujos ARP (para resolución de IPs)
-            flow_arp_fw = build_arp_flow(handler, dpid, ip_servidor, ip_servidor, out_port, sentido="arp_fw")
-            push_flow(flow_arp_fw)
-            print(f"✔ Flow ARP Forward instalado: {flow_arp_fw['name']}")
+            flows = flows_conexion(conexion, saltos)
+            conexion['flows'] = [f['name'] for f in flows]
+            almacen.agregar_conexion(conexion)
+            print(f"✔ Conexión creada. Handler: {handler}")
 
-            flow_arp_bw = build_arp_flow(handler, dpid, ip_servidor, ip_servidor, 1, sentido="arp_bw")
-            push_flow(flow_arp_bw)
-            print(f"✔ Flow ARP Reverse instalado: {flow_arp_bw['name']}")
+            # Los flows de la ruta se instalan en segundo plano (con reintentos);
+            # si no llegan todos, la conexión se deshace
+            encolar_push(flows, nuevos=True, al_terminar=deshacer_si_falla(conexion))
 
         elif op == '2':
-            if not conexiones:
+            if not almacen.hay_conexiones():
                 print("No hay conexiones creadas.")
-            else:
-                for c in conexiones:
+                continue
+            filtros = pedir_filtros("Filtrar por")
+            total = almacen.registro.contar(**filtros)
+            if total == 0:
+                print("❌ No hay conexiones que cumplan el filtro.")
+            cursor, mostradas = 0, 0
+            while total:
+                pagina, cursor = almacen.registro.listar(cursor, TAM_PAGINA, **filtros)
+                for c in pagina:
                     print(f"Handler: {c['handler']}, Alumno: {c['alumno']}, Servidor: {c['servidor']}, Servicio: {c['servicio']}")
+                mostradas += len(pagina)
+                if cursor is None or \
+                        input(f"-- {mostradas}/{total} -- Enter para continuar, 'q' para salir: ").strip().lower() == 'q':
+                    break
 
         elif op == '3':
             handler = input("Handler de la conexión a eliminar: ")
-            for i, c in enumerate(conexiones):
-                if c['handler'] == handler:
-                    # Eliminar los flows correspondientes en Floodlight
-                    delete_flow(f"{handler}_fw")
-                    delete_flow(f"{handler}_bw")
-                    delete_flow(f"{handler}_arp_fw")
-                    delete_flow(f"{handler}_arp_bw")
-
-                    # Eliminar la conexión de la lista
-                    conexiones.pop(i)
-                    print("✔ Conexión eliminada y flows removidos.")
-                    break
+            conexion = almacen.buscar_conexion(handler)
+            if conexion:
+                # Eliminar la conexión del almacén y encolar el borrado de sus flows
+                almacen.eliminar_conexion(handler)
+                print("✔ Conexión eliminada.")
+                encolar_delete(nombres_flows(conexion))
             else:
                 print("❌ No se encontró el handler.")
 
         elif op == '4':
+            # Aprovisionamiento masivo: archivo CSV/YAML o un curso completo
+            origen = input("Archivo (.csv/.yaml) o código de curso: ").strip()
+            try:
+                if origen.endswith((".csv", ".yaml", ".yml")):
+                    solicitudes = leer_solicitudes(origen)
+                else:
+                    solicitudes = [dict(zip(('alumno', 'servidor', 'servicio'), t)) for t in expandir_curso(origen)]
+            except Exception as e:
+                print(f"❌ Error al leer '{origen}': {e}")
+                continue
+            if not solicitudes:
+                print("❌ No hay conexiones autorizadas que crear.")
+                continue
+
+            # DPID y puerto por defecto solo si hay servidores que el controlador no ubica
+            dpid = out_port = None
+            sin_ubicar = {s for s in {sol['servidor'] for sol in solicitudes if not sol.get('dpid')}
+                          if almacen.buscar_servidor(s) and not ubicar_servidor(s)}
+            if sin_ubicar:
+                print(f"⚠️ Sin ubicación en el controlador: {', '.join(sorted(sin_ubicar))}")
+                dpid = input("Ingrese el DPID del switch conectado al servidor : ")
+                out_port = input("Ingrese el puerto de salida para el servidor: ")
+            try:
+                mostrar_resumen_lote(provisionar_lote(solicitudes, dpid, out_port))
+            except Exception as e:
+                print(f"❌ No se pudo obtener la topología de Floodlight: {e}")
+
+        elif op == '5':
+            filtros = pedir_filtros("Eliminar conexiones de")
+            if not any(filtros.values()):
+                print("❌ Indique al menos un filtro.")
+                continue
+            total = almacen.registro.contar(**filtros)
+            if total == 0:
+                print("❌ No hay conexiones que cumplan el filtro.")
+                continue
+            if input(f"Se eliminarán {total} conexiones. ¿Continuar? (s/N): ").strip().lower() != 's':
+                continue
+            eliminadas = almacen.registro.eliminar_por(**filtros)
+            print(f"✔ {len(eliminadas)} conexiones eliminadas.")
+            encolar_delete([n for c in eliminadas for n in nombres_flows(c)])
+
+        elif op == '6':
+            try:
+                plan = planificar_reconciliacion()
+            except Exception as e:
+                print(f"❌ No se pudo consultar Floodlight: {e}")
+                continue
+            mostrar_plan(plan)
+            cambios = len(plan['faltantes']) + len(plan['cambiados']) + len(plan['obsoletos'])
+            if cambios == 0:
+                print("✔ El controlador ya coincide con el estado deseado.")
+            elif input(f"¿Aplicar {cambios} cambios? (s/N): ").strip().lower() == 's':
+                errores = aplicar_reconciliacion(plan)
+                print(f"✔ Reconciliación aplicada ({cambios - len(errores)} cambios)"
+                      + (f", ❌ {len(errores)} con error." if errores else "."))
+
+        elif op == '7':
+            mostrar_cola()
+
+        elif op == '8':
+            menu_inactivas()
+
+        elif op == '9':
+            menu_topologia()
+
+        elif op == '10':
             break  # Volver al menú principal
 
         else:
             print("❌ Opción inválida.")
 
+def pedir_filtros(titulo):
+    """
+    Pide los filtros opcionales (alumno, servidor, servicio) de una consulta
+    de conexiones. Los vacíos se ignoran.
+    """
+    print(f"{titulo} (Enter para omitir):")
+    return {
+        'alumno': input("  Código del alumno: ").strip(),
+        'servidor': input("  Nombre del servidor: ").strip(),
+        'servicio': input("  Nombre del servicio: ").strip(),
+    }
+
+# ===== Submenú Estadísticas =====
+def mostrar_estadisticas():
+    filas = metricas.resumen()
+    if not filas:
+        print("No hay métricas registradas.")
+        return
+    ancho = max(len(nombre + etiquetas) for nombre, etiquetas, _ in filas)
+    for nombre, etiquetas, valor in filas:
+        print(f"  {(nombre + etiquetas).ljust(ancho)}  {valor}")
+
+def mostrar_controladores():
+    for c in floodlight.estadisticas():
+        marca = "⛔ caído" if c['caido'] else "✔"
+        print(f"  {marca} {c['nombre']} ({c['url']}, {c['hilos']} hilos)")
+        print(f"     ok: {c['ok']}  errores: {c['errores']}  rechazadas: {c['rechazadas']}  "
+              f"en curso: {c['en_curso']}  {c['operaciones_por_segundo']:.1f} ops/s")
+        if c['ultimo_error']:
+            print(f"     último error: {c['ultimo_error'][:120]}")
+
+def menu_estadisticas():
+    while True:
+        print("\n--- Estadísticas ---")
+        print("1) Ver métricas")
+        print("2) Ver texto Prometheus")
+        print(f"3) {'Detener' if servidor_metricas.activo else 'Iniciar'} endpoint /metrics")
+        print(f"4) {'Detener' if perfilador.activo else 'Iniciar'} perfilado (cProfile)")
+        print(f"5) {'Desactivar' if metricas.traza else 'Activar'} traza de operaciones lentas")
+        print("6) Controladores")
+        print("7) Volver")
+        op = input(">>> ")
+
+        if op == '1':
+            mostrar_estadisticas()
+
+        elif op == '2':
+            print(metricas.texto(), end="")
+
+        elif op == '3':
+            if servidor_metricas.activo:
+                servidor_metricas.detener()
+                print("✔ Endpoint de métricas detenido.")
+                continue
+            try:
+                servidor_metricas.iniciar()
+                print(f"✔ Métricas disponibles en {servidor_metricas.url}")
+            except OSError as e:
+                print(f"❌ No se pudo iniciar el endpoint en el puerto {servidor_metricas.puerto}: {e}")
+
+        elif op == '4':
+            if not perfilador.activo:
+                perfilador.iniciar()
+                print("✔ Perfilado iniciado.")
+                continue
+            path = input("Archivo para guardar el perfil (Enter para omitir): ").strip()
+            print(perfilador.detener(path or None))
+            if path:
+                print(f"✔ Perfil guardado en '{path}' (abrir con pstats o snakeviz).")
+
+        elif op == '5':
+            if metricas.traza:
+                metricas.traza = None
+                print("✔ Traza desactivada.")
+                continue
+            try:
+                umbral = float(input("Umbral en ms [100]: ").strip() or 100)
+            except ValueError:
+                print("❌ Umbral inválido.")
+                continue
+            metricas.traza = traza_lentas(umbral / 1000)
+            print(f"✔ Se informarán las operaciones de {umbral:g} ms o más.")
+
+        elif op == '6':
+            mostrar_controladores()
+
+        elif op == '7':
+            break
+
+        else:
+            print("❌ Opción inválida.")
+
 # ===== Banner principal =====
 def mostrar_menu():
     print(r"""
@@ -503,9 +1734,104 @@ def mostrar_menu():
     print("5) Servidores")
     print("6) Políticas")
     print("7) Conexiones")
-    print("8) Salir")
+    print("8) Estadísticas")
+    print("9) Salir")
+
+def iniciar(refresco=True):
+    """
+    Abre el registro y restaura el snapshot. Con refresco=False (comandos
+    de una sola operación) no se lanza el refresco de ubicaciones.
+    """
+    # Un error en el mapa de controladores se informa al arrancar, no en el primer flow
+    try:
+        floodlight.cargar()
+    except Exception as e:
+        raise SystemExit(f"❌ Configuración de controladores inválida ('{CONTROLADORES_PATH}'): {e}")
+    # Conexiones persistentes: sobreviven al cierre del programa
+    almacen.registro = RegistroConexiones(REGISTRO_PATH)
+    # Restaurar el estado anterior (incluidas las conexiones y sus flows) sin re-leer YAML
+    if os.path.exists(SNAPSHOT_PATH):
+        importar_snapshot(SNAPSHOT_PATH)
+    if refresco:
+        ubicaciones.iniciar_refresco()
+        if TOPOLOGIA_INTERVALO:
+            topologia.iniciar_refresco(TOPOLOGIA_INTERVALO)
+        if INACTIVIDAD_UMBRAL:
+            recolector.iniciar()
+        if VIGILAR_PATH:
+            try:
+                vigilar_politica(VIGILAR_PATH)
+            except Exception as e:
+                print(f"❌ No se pudo vigilar '{VIGILAR_PATH}': {e}")
+    if PERFIL_PATH:
+        perfilador.iniciar()
+
+def vaciar_cola():
+    if cola.profundidad:
+        print(f"⏳ Enviando {cola.profundidad} operaciones de flows pendientes...")
+    sin_enviar = cola.detener(timeout=COLA_ESPERA_SALIDA)
+    if sin_enviar:
+        print(f"⚠️ {sin_enviar} operaciones de flows quedaron sin enviar (use Reconciliar al volver).")
+
+def finalizar():
+    cerrar(guardar=True)
+    print("Saliendo del programa.")
+
+def cerrar(guardar=False):
+    """
+    Detiene los hilos, vacía la cola y cierra el cliente y el registro. Con
+    guardar=True guarda el snapshot una vez enviadas las operaciones.
+    """
+    vigilante.detener()
+    recolector.detener()
+    vaciar_cola()
+    if guardar:
+        exportar_snapshot(SNAPSHOT_PATH)
+    if perfilador.activo:
+        perfilador.detener(PERFIL_PATH)
+        print(f"✔ Perfil de la sesión guardado en '{PERFIL_PATH}'.")
+    servidor_metricas.detener()
+    ubicaciones.detener_refresco()
+    topologia.detener_refresco()
+    floodlight.close()
+    almacen.registro.close()
+
+def servir_api(host, puerto):
+    """
+    Modo daemon: sirve la API REST hasta Ctrl+C y guarda el estado al salir.
+    """
+    from api import ServidorAPI
+    iniciar()
+    servidor = ServidorAPI(sys.modules[__name__], host, puerto)
+    print(f"✔ API escuchando en {servidor.url}")
+    try:
+        servidor.servir()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor.detener()
+        finalizar()
+
+def vigilar(path):
+    """
+    Modo vigilancia: aplica los cambios de `path` a medida que se guardan,
+    hasta Ctrl+C, y guarda el estado al salir.
+    """
+    iniciar()
+    try:
+        vigilar_politica(path)
+        print(f"⏳ Vigilando '{path}' cada {vigilante.intervalo:g}s (Ctrl+C para salir)...")
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        pass
+    except Exception as e:
+        print(f"❌ No se pudo vigilar '{path}': {e}")
+    finally:
+        finalizar()
 
 def main():
+    iniciar()
     while True:
         mostrar_menu()
         op = input(">>> ")
@@ -525,10 +1851,14 @@ def main():
         elif op == '7':
             menu_conexiones()
         elif op == '8':
-            print("Saliendo del programa.")
+            menu_estadisticas()
+        elif op == '9':
+            finalizar()
             break
         else:
             print("Opción inválida.")
 
 if __name__ == "__main__":
-    main()
+    # Sin subcomando se abre el menú; ver cli.py para los comandos no interactivos
+    from cli import ejecutar
+    sys.exit(ejecutar(sys.modules[__name__]))
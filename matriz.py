@@ -0,0 +1,235 @@
+# ===== Matriz de acceso =====
+# Bitsets alumno × (servidor, servicio) derivados de los cursos DICTANDO.
+# Solo tienen bit los alumnos registrados: un código inscrito en un curso
+# pero sin alumno cargado (o ya eliminado) no tiene acceso.
+# Cada permiso tiene un bytearray con un bit por id de alumno (tabla
+# CODIGOS): la consulta puntual es O(1), la de un alumno recorre solo los
+# permisos y las masivas (quién tiene acceso, quién lo pierde si un curso
+# cambia de estado) operan en C sobre enteros de Python con &, | y ~.
+# El almacén la actualiza en cada alta, baja, inscripción o cambio de estado.
+
+import re
+
+from compacto import CODIGOS
+
+ACTIVO = "DICTANDO"
+_UNO = re.compile("1")
+
+
+def _activar(bits, i):
+    byte = i >> 3
+    if byte >= len(bits):
+        bits.extend(bytes(byte + 1 - len(bits)))
+    bits[byte] |= 1 << (i & 7)
+
+
+def _desactivar(bits, i):
+    byte = i >> 3
+    if byte < len(bits):
+        bits[byte] &= 0xff ^ (1 << (i & 7))
+
+
+def _encendido(bits, i):
+    byte = i >> 3
+    return byte < len(bits) and bits[byte] >> (i & 7) & 1 == 1
+
+
+def a_entero(bits):
+    return int.from_bytes(bits, "little")
+
+
+def de_ids(ids):
+    """
+    Entero con un bit encendido por cada id.
+    """
+    bits = bytearray()
+    for i in ids:
+        _activar(bits, i)
+    return a_entero(bits)
+
+
+def indices(n):
+    """
+    Lista de ids de los bits encendidos de `n`, en orden creciente.
+    """
+    # bin() con el bit menos significativo primero: la posición de cada "1" es el id
+    return [m.start() for m in _UNO.finditer(bin(n)[:1:-1])]
+
+
+def claves_curso(curso):
+    return [(s['nombre'], servicio) for s in curso.servidores for servicio in s['servicios_permitidos']]
+
+
+class MatrizAcceso:
+    """
+    Matriz de autorización derivada de los índices de un Almacen.
+    `bits[(servidor, servicio)]` tiene encendido el bit de cada alumno
+    registrado e inscrito en algún curso DICTANDO que permite ese servicio.
+    """
+
+    def __init__(self, almacen):
+        self.almacen = almacen
+        self.bits = {}
+
+    def limpiar(self):
+        self.bits.clear()
+
+    # ----- Consultas -----
+    def permite(self, cod_alumno, servidor, servicio):
+        bits = self.bits.get((servidor, servicio))
+        if bits is None:
+            return False
+        i = CODIGOS.buscar(cod_alumno)
+        return i is not None and _encendido(bits, i)
+
+    def permisos_de(self, cod_alumno):
+        """
+        Lista de (servidor, servicio) a los que puede acceder el alumno.
+        """
+        i = CODIGOS.buscar(cod_alumno)
+        if i is None:
+            return []
+        return [clave for clave, bits in self.bits.items() if _encendido(bits, i)]
+
+    def bits_de(self, servidor, servicio):
+        return a_entero(self.bits.get((servidor, servicio), b""))
+
+    def union(self, *claves):
+        n = 0
+        for clave in claves:
+            n |= self.bits_de(*clave)
+        return n
+
+    def interseccion(self, *claves):
+        if not claves:
+            return 0
+        n = self.bits_de(*claves[0])
+        for clave in claves[1:]:
+            n &= self.bits_de(*clave)
+        return n
+
+    def codigos(self, n, registrados=True):
+        """
+        Códigos de alumno de un bitset. Con registrados=True se omiten los
+        códigos inscritos en algún curso pero sin alumno cargado.
+        """
+        tabla = CODIGOS.codigos
+        if not registrados:
+            return [tabla[i] for i in indices(n)]
+        por_codigo = self.almacen.alumno_por_codigo
+        return [c for c in map(tabla.__getitem__, indices(n)) if c in por_codigo]
+
+    def alumnos_con_acceso(self, servidor, servicio, registrados=True):
+        return self.codigos(self.bits_de(servidor, servicio), registrados)
+
+    def contar(self, servidor, servicio):
+        return self.bits_de(servidor, servicio).bit_count()
+
+    def simular_estado(self, codigo_curso, estado):
+        """
+        Qué cambiaría si el curso pasara a `estado`, sin modificar nada.
+        Devuelve {'ganan': {clave: bits}, 'pierden': {clave: bits}} con
+        bitsets (enteros) por (servidor, servicio); solo claves no vacías.
+        """
+        curso = self.almacen.buscar_curso(codigo_curso)
+        resultado = {'ganan': {}, 'pierden': {}}
+        if curso is None or (curso.estado == ACTIVO) == (estado == ACTIVO):
+            return resultado
+        propios = de_ids(self._registrados(curso.ids_alumnos))
+        for clave in claves_curso(curso):
+            actuales = self.bits_de(*clave)
+            if estado == ACTIVO:
+                cambio, tipo = propios & ~actuales, 'ganan'
+            else:
+                # Pierden los que no tienen el permiso por otro curso DICTANDO
+                candidatos = propios & actuales
+                conservan = [i for i in indices(candidatos)
+                             if self._otorgado(CODIGOS.codigo(i), clave, excluir=codigo_curso)]
+                cambio, tipo = candidatos & ~de_ids(conservan), 'pierden'
+            if cambio:
+                resultado[tipo][clave] = cambio
+        return resultado
+
+    # ----- Actualización incremental (la llama el almacén) -----
+    def curso_agregado(self, curso):
+        if curso.estado == ACTIVO:
+            self._encender(self._registrados(curso.ids_alumnos), claves_curso(curso))
+
+    def curso_eliminado(self, curso):
+        if curso.estado == ACTIVO:
+            self._revisar(curso.alumnos, claves_curso(curso))
+
+    def estado_cambiado(self, curso, anterior):
+        if curso.estado == ACTIVO and anterior != ACTIVO:
+            self._encender(self._registrados(curso.ids_alumnos), claves_curso(curso))
+        elif anterior == ACTIVO and curso.estado != ACTIVO:
+            self._revisar(curso.alumnos, claves_curso(curso))
+
+    def alumno_inscrito(self, curso, cod_alumno):
+        if curso.estado == ACTIVO:
+            self._encender(self._registrados([CODIGOS.id(cod_alumno)]), claves_curso(curso))
+
+    def alumno_retirado(self, curso, cod_alumno):
+        if curso.estado == ACTIVO:
+            self._revisar([cod_alumno], claves_curso(curso))
+
+    def alumno_agregado(self, cod_alumno):
+        """
+        Alumno recién registrado: recibe los permisos de los cursos DICTANDO
+        en los que ya figuraba inscrito.
+        """
+        cursos = self.almacen.curso_por_codigo
+        claves = [clave for c in self.almacen.cursos_de_alumno.get(cod_alumno, ())
+                  if cursos[c].estado == ACTIVO for clave in claves_curso(cursos[c])]
+        if claves:
+            self._encender([CODIGOS.id(cod_alumno)], list(dict.fromkeys(claves)))
+
+    def alumno_eliminado(self, cod_alumno):
+        i = CODIGOS.buscar(cod_alumno)
+        if i is None:
+            return
+        for bits in self.bits.values():
+            _desactivar(bits, i)
+
+    def _registrados(self, ids):
+        tabla, por_codigo = CODIGOS.codigos, self.almacen.alumno_por_codigo
+        return [i for i in ids if tabla[i] in por_codigo]
+
+    def _encender(self, ids, claves):
+        if not ids:
+            return
+        if len(claves) == 1 or len(ids) < 32:
+            for clave in claves:
+                bits = self.bits.setdefault(clave, bytearray())
+                for i in ids:
+                    _activar(bits, i)
+            return
+        # Curso grande con varios permisos: armar su bitset una vez y hacer OR
+        propios = de_ids(ids)
+        for clave in claves:
+            actual = self.bits.get(clave, b"")
+            nuevo = a_entero(actual) | propios
+            self.bits[clave] = bytearray(nuevo.to_bytes(max(len(actual), (nuevo.bit_length() + 7) // 8), "little"))
+
+    def _revisar(self, codigos, claves):
+        """
+        Apaga el bit de los alumnos que ya no tienen el permiso por ningún
+        curso (los índices del almacén ya reflejan el cambio).
+        """
+        for clave in claves:
+            bits = self.bits.get(clave)
+            if bits is None:
+                continue
+            for cod in set(codigos):
+                if not self._otorgado(cod, clave):
+                    _desactivar(bits, CODIGOS.id(cod))
+
+    def _otorgado(self, cod_alumno, clave, excluir=None):
+        """
+        Cálculo directo sobre los índices: algún curso DICTANDO del alumno
+        (distinto de `excluir`) permite la clave.
+        """
+        permitidos = self.almacen.cursos_con_permiso.get(clave, ())
+        cursos = self.almacen.curso_por_codigo
+        return any(c != excluir and c in permitidos and cursos[c].estado == ACTIVO
+                   for c in self.almacen.cursos_de_alumno.get(cod_alumno, ()))
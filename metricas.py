@@ -0,0 +1,336 @@
+# ===== Métricas e instrumentación =====
+# Contadores, indicadores e histogramas de latencia en memoria, seguros entre
+# hilos, exportables en el formato de texto de Prometheus (con un servidor
+# HTTP opcional). Incluye ganchos opcionales de traza (operaciones lentas) y
+# de perfilado con cProfile. El servidor HTTP y el perfilador importan sus
+# módulos al iniciarse, para no cargarlos en cada arranque.
+
+import bisect
+import functools
+import threading
+import time
+from contextlib import contextmanager
+
+# Límites (en segundos) de los histogramas de operaciones de red y disco
+LATENCIA = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Límites para búsquedas en memoria (del microsegundo al milisegundo)
+LATENCIA_RAPIDA = (0.000001, 0.0000025, 0.000005, 0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.001)
+
+TIPO_CONTENIDO = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _clave(etiquetas):
+    return tuple(sorted(etiquetas.items())) if etiquetas else ()
+
+
+def _escapar(valor):
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(clave, extra=()):
+    pares = list(clave) + list(extra)
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor):
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class Contador:
+    """
+    Contador monótono con etiquetas.
+    """
+    tipo = "counter"
+
+    def __init__(self, nombre, ayuda):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def incrementar(self, n=1, **etiquetas):
+        clave = _clave(etiquetas)
+        with self._lock:
+            self._valores[clave] = self._valores.get(clave, 0) + n
+
+    def valores(self):
+        with self._lock:
+            return dict(self._valores)
+
+    def lineas(self):
+        for clave, valor in sorted(self.valores().items()):
+            yield f"{self.nombre}{_etiquetas(clave)} {_numero(valor)}"
+
+
+class Indicador:
+    """
+    Valor instantáneo que se calcula al exportar (p. ej. flows propios).
+    """
+    tipo = "gauge"
+
+    def __init__(self, nombre, ayuda, funcion):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.funcion = funcion
+
+    def valor(self):
+        try:
+            return self.funcion()
+        except Exception:
+            return None
+
+    def lineas(self):
+        valor = self.valor()
+        if valor is not None:
+            yield f"{self.nombre} {_numero(valor)}"
+
+
+class Histograma:
+    """
+    Histograma de cubetas fijas por combinación de etiquetas. Guarda los
+    conteos por cubeta, la suma y el total; los cuantiles se estiman
+    interpolando dentro de la cubeta.
+    """
+    tipo = "histogram"
+
+    def __init__(self, nombre, ayuda, limites=LATENCIA, registro=None):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = tuple(limites)
+        self.registro = registro
+        self._series = {}  # clave -> [conteos por cubeta (+Inf al final), suma, total]
+        self._lock = threading.Lock()
+
+    def observar(self, valor, **etiquetas):
+        self._observar(self._serie(_clave(etiquetas)), etiquetas, valor)
+
+    def serie(self, **etiquetas):
+        """
+        Función `observar(valor)` ligada a unas etiquetas fijas, para rutas
+        calientes donde no conviene armar la clave en cada llamada.
+        """
+        return functools.partial(self._observar, self._serie(_clave(etiquetas)), etiquetas)
+
+    def _serie(self, clave):
+        serie = self._series.get(clave)
+        if serie is None:
+            with self._lock:
+                serie = self._series.setdefault(clave, [[0] * (len(self.limites) + 1), 0.0, 0])
+        return serie
+
+    def _observar(self, serie, etiquetas, valor):
+        i = bisect.bisect_left(self.limites, valor)
+        with self._lock:
+            serie[0][i] += 1
+            serie[1] += valor
+            serie[2] += 1
+        if self.registro is not None and self.registro.traza is not None:
+            self.registro.traza(self.nombre, valor, etiquetas)
+
+    @contextmanager
+    def medir(self, **etiquetas):
+        """
+        Mide la duración del bloque `with` (también si lanza una excepción).
+        """
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def series(self):
+        with self._lock:
+            return {clave: (list(c), s, t) for clave, (c, s, t) in self._series.items()}
+
+    def cuantil(self, q, cubetas, total):
+        if total == 0:
+            return 0.0
+        objetivo = q * total
+        acumulado = 0
+        for i, n in enumerate(cubetas):
+            if n and acumulado + n >= objetivo:
+                if i == len(self.limites):
+                    return self.limites[-1]
+                inferior = self.limites[i - 1] if i else 0.0
+                return inferior + (self.limites[i] - inferior) * (objetivo - acumulado) / n
+            acumulado += n
+        return self.limites[-1]
+
+    def lineas(self):
+        for clave, (cubetas, suma, total) in sorted(self.series().items()):
+            acumulado = 0
+            for limite, n in zip(self.limites, cubetas):
+                acumulado += n
+                yield f"{self.nombre}_bucket{_etiquetas(clave, [('le', _numero(limite))])} {acumulado}"
+            yield f"{self.nombre}_bucket{_etiquetas(clave, [('le', '+Inf')])} {total}"
+            yield f"{self.nombre}_sum{_etiquetas(clave)} {_numero(suma)}"
+            yield f"{self.nombre}_count{_etiquetas(clave)} {total}"
+
+
+class Metricas:
+    """
+    Registro de métricas. `traza`, si no es None, se llama con
+    (nombre, segundos, etiquetas) en cada observación de un histograma.
+    """
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+        self.traza = None
+
+    def contador(self, nombre, ayuda):
+        return self._registrar(nombre, lambda: Contador(nombre, ayuda))
+
+    def histograma(self, nombre, ayuda, limites=LATENCIA):
+        return self._registrar(nombre, lambda: Histograma(nombre, ayuda, limites, registro=self))
+
+    def indicador(self, nombre, ayuda, funcion):
+        return self._registrar(nombre, lambda: Indicador(nombre, ayuda, funcion))
+
+    def _registrar(self, nombre, crear):
+        with self._lock:
+            metrica = self._metricas.get(nombre)
+            if metrica is None:
+                metrica = self._metricas[nombre] = crear()
+            return metrica
+
+    def texto(self):
+        """
+        Todas las métricas en el formato de exposición de texto de Prometheus.
+        """
+        lineas = []
+        for m in list(self._metricas.values()):
+            lineas.append(f"# HELP {m.nombre} {m.ayuda}")
+            lineas.append(f"# TYPE {m.nombre} {m.tipo}")
+            lineas.extend(m.lineas())
+        return "\n".join(lineas) + "\n"
+
+    def resumen(self):
+        """
+        Filas legibles para el menú de estadísticas: (nombre, etiquetas, texto).
+        """
+        filas = []
+        for m in list(self._metricas.values()):
+            if isinstance(m, Histograma):
+                for clave, (cubetas, suma, total) in sorted(m.series().items()):
+                    filas.append((m.nombre, _etiquetas(clave),
+                                  f"n={total} media={_ms(suma / total if total else 0.0)} "
+                                  f"p50={_ms(m.cuantil(0.5, cubetas, total))} "
+                                  f"p99={_ms(m.cuantil(0.99, cubetas, total))}"))
+            elif isinstance(m, Contador):
+                for clave, valor in sorted(m.valores().items()):
+                    filas.append((m.nombre, _etiquetas(clave), str(valor)))
+            else:
+                filas.append((m.nombre, "", str(m.valor())))
+        return filas
+
+
+def _ms(segundos):
+    return f"{segundos * 1000:.3f}ms"
+
+
+def traza_lentas(umbral, salida=print):
+    """
+    Gancho de traza que informa las operaciones que tardan `umbral` segundos o más.
+    """
+    def traza(nombre, segundos, etiquetas):
+        if segundos >= umbral:
+            salida(f"⚠️ Lento: {nombre}{_etiquetas(_clave(etiquetas))} {segundos * 1000:.1f} ms")
+    return traza
+
+
+# ===== Endpoint HTTP =====
+class ServidorMetricas:
+    """
+    Expone GET /metrics en un hilo de fondo con ThreadingHTTPServer. Por
+    defecto solo escucha en localhost; para que Prometheus lo lea desde
+    otra máquina hay que pasar el host explícitamente (p. ej. "0.0.0.0").
+    """
+
+    def __init__(self, metricas, host="127.0.0.1", puerto=9108):
+        self.metricas = metricas
+        self.host = host
+        self.puerto = puerto
+        self._servidor = None
+        self._hilo = None
+
+    @property
+    def activo(self):
+        return self._servidor is not None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.puerto}/metrics"
+
+    def iniciar(self):
+        if self.activo:
+            return
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metricas = self.metricas
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                cuerpo = metricas.texto().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", TIPO_CONTENIDO)
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self._servidor = ThreadingHTTPServer((self.host, self.puerto), Manejador)
+        self._servidor.daemon_threads = True
+        self.puerto = self._servidor.server_address[1]
+        self._hilo = threading.Thread(target=self._servidor.serve_forever, name="metricas", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if not self.activo:
+            return
+        self._servidor.shutdown()
+        self._servidor.server_close()
+        self._hilo.join()
+        self._servidor = self._hilo = None
+
+
+# ===== Perfilado =====
+class Perfilador:
+    """
+    Envoltorio de cProfile para perfilar una sesión (solo el hilo que lo
+    inicia). `detener` guarda el perfil en `path` (si se indica) y devuelve
+    las `top` funciones con mayor tiempo acumulado.
+    """
+
+    def __init__(self):
+        self._perfil = None
+
+    @property
+    def activo(self):
+        return self._perfil is not None
+
+    def iniciar(self):
+        if self.activo:
+            return
+        import cProfile
+        self._perfil = cProfile.Profile()
+        self._perfil.enable()
+
+    def detener(self, path=None, top=20):
+        if not self.activo:
+            return ""
+        self._perfil.disable()
+        import io
+        import pstats
+        if path:
+            self._perfil.dump_stats(path)
+        salida = io.StringIO()
+        pstats.Stats(self._perfil, stream=salida).sort_stats("cumulative").print_stats(top)
+        self._perfil = None
+        return salida.getvalue()
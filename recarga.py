@@ -0,0 +1,235 @@
+# ===== Recarga en caliente de la política =====
+# Vigila el archivo de la política (YAML o snapshot): detecta cambios con
+# mtime y tamaño y confirma con un hash del contenido antes de parsear.
+# Con el archivo nuevo leído a un almacén aparte calcula la diferencia
+# estructural (alumnos, cursos, inscripciones y servidores) y la aplica al
+# almacén actual paso a paso a través del motor incremental, así solo se
+# tocan las conexiones de los alumnos afectados.
+
+import hashlib
+import os
+import threading
+
+from compacto import CODIGOS
+from incremental import MotorIncremental
+
+
+def huella(contenido):
+    return hashlib.blake2b(contenido, digest_size=16).digest()
+
+
+class VigilanteArchivo:
+    """
+    Detecta cambios de `path`. `revisar()` devuelve el contenido nuevo
+    (bytes) o None si no cambió; un cambio de mtime sin cambio de
+    contenido no cuenta.
+    """
+
+    def __init__(self, path, intervalo=2.0):
+        self.path = path
+        self.intervalo = intervalo
+        self._firma = None    # (mtime_ns, tamaño) de la última lectura
+        self._huella = None
+        self._hilo = None
+        self._detener = threading.Event()
+
+    def marcar(self, contenido=None):
+        """
+        Toma el estado actual del archivo como ya aplicado.
+        """
+        st = os.stat(self.path)
+        if contenido is None:
+            with open(self.path, "rb") as f:
+                contenido = f.read()
+        self._firma = (st.st_mtime_ns, st.st_size)
+        self._huella = huella(contenido)
+
+    def revisar(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None  # renombrado a mitad de una escritura: se verá en la próxima vuelta
+        firma = (st.st_mtime_ns, st.st_size)
+        if firma == self._firma:
+            return None
+        with open(self.path, "rb") as f:
+            contenido = f.read()
+        self._firma = firma
+        nueva = huella(contenido)
+        if nueva == self._huella:
+            return None
+        self._huella = nueva
+        return contenido
+
+    # ----- Hilo -----
+    @property
+    def activo(self):
+        return self._hilo is not None
+
+    def iniciar(self, al_cambiar):
+        """
+        Revisa cada `intervalo` segundos y llama a `al_cambiar(contenido)`.
+        """
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(al_cambiar,), name="recarga", daemon=True)
+        self._hilo.start()
+
+    def detener(self):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def _bucle(self, al_cambiar):
+        while not self._detener.wait(self.intervalo):
+            try:
+                contenido = self.revisar()
+                if contenido is not None:
+                    al_cambiar(contenido)
+            except Exception:
+                pass  # quien aplica informa sus errores; se sigue vigilando
+
+
+# ----- Diferencias -----
+def diferencias(actual, nuevo):
+    """
+    Diferencia estructural entre dos almacenes (el actual y el leído del
+    archivo). Los objetos agregados o reemplazados son los de `nuevo`.
+    """
+    d = {
+        'alumnos_agregados': [], 'alumnos_modificados': [], 'alumnos_reubicados': [], 'alumnos_eliminados': [],
+        'servidores_agregados': [], 'servidores_modificados': [], 'servidores_eliminados': [],
+        'cursos_agregados': [], 'cursos_reemplazados': [], 'cursos_eliminados': [],
+        'estados': [], 'nombres': [], 'inscripciones': [], 'retiros': [],
+    }
+    for codigo, alumno in nuevo.alumno_por_codigo.items():
+        anterior = actual.alumno_por_codigo.get(codigo)
+        if anterior is None:
+            d['alumnos_agregados'].append(alumno)
+        elif anterior._mac != alumno._mac:
+            d['alumnos_reubicados'].append(alumno)  # otra MAC: otra ubicación en la red
+        elif anterior.nombre != alumno.nombre:
+            d['alumnos_modificados'].append(alumno)
+    d['alumnos_eliminados'] = [c for c in actual.alumno_por_codigo if c not in nuevo.alumno_por_codigo]
+
+    for nombre, servidor in nuevo.servidor_por_nombre.items():
+        anterior = actual.servidor_por_nombre.get(nombre)
+        if anterior is None:
+            d['servidores_agregados'].append(servidor)
+        elif anterior._ip != servidor._ip or anterior.servicios != servidor.servicios:
+            d['servidores_modificados'].append(servidor)
+    d['servidores_eliminados'] = [n for n in actual.servidor_por_nombre if n not in nuevo.servidor_por_nombre]
+
+    for codigo, curso in nuevo.curso_por_codigo.items():
+        anterior = actual.curso_por_codigo.get(codigo)
+        if anterior is None:
+            d['cursos_agregados'].append(curso)
+            continue
+        if anterior.servidores != curso.servidores:
+            d['cursos_reemplazados'].append(curso)  # cambian los permisos: se reemplaza entero
+            continue
+        if anterior.estado != curso.estado:
+            d['estados'].append((codigo, curso.estado))
+        if anterior.nombre != curso.nombre:
+            d['nombres'].append((codigo, curso.nombre))
+        antes, despues = set(anterior.ids_alumnos), set(curso.ids_alumnos)
+        if antes != despues:
+            d['inscripciones'] += [(codigo, i) for i in despues - antes]
+            d['retiros'] += [(codigo, i) for i in antes - despues]
+    d['cursos_eliminados'] = [c for c in actual.curso_por_codigo if c not in nuevo.curso_por_codigo]
+    return d
+
+
+def resumen(d):
+    return {clave: len(valor) for clave, valor in d.items()}
+
+
+def vacia(d):
+    return not any(d.values())
+
+
+# ----- Aplicación -----
+def aplicar(almacen, d):
+    """
+    Aplica la diferencia al almacén (con el lock del programa tomado). No
+    habla con el controlador: devuelve (revocar, otorgar, cursos, rehacer)
+    con las tuplas (alumno, servidor, servicio) cuyas conexiones hay que
+    retirar y crear, en ese orden, los cursos a recompilar como pares
+    (código, alumnos afectados o None si se recompila entero) y las
+    conexiones cuyos flows hay que reconstruir en el lugar, con el mismo
+    handler, porque su servidor cambió de IP. Las conexiones de alumnos
+    reubicados se retiran y se vuelven a crear (cambia su ubicación); las
+    de servicios que el servidor ya no ofrece se revocan. Los servidores y
+    servicios nuevos no crean conexiones.
+    """
+    otorgados, revocados, cursos = [], [], {}  # cursos: código -> set(alumnos) o None (entero)
+
+    def recompilar(curso, alumnos=None):
+        if alumnos is None:
+            cursos[curso] = None
+        elif cursos.get(curso, ()) is not None:
+            cursos.setdefault(curso, set()).update(alumnos)
+    motor = MotorIncremental(almacen, otorgar=otorgados.extend, revocar=revocados.extend, recompilar=recompilar)
+    reinstalar, rehacer = [], []
+
+    # Servidores primero: los cursos nuevos pueden referirse a ellos. Un
+    # servidor o servicio nuevo no abre conexiones por sí solo: quedan
+    # autorizadas y se crean a pedido, como al importar
+    for servidor in d['servidores_agregados']:
+        almacen.agregar_servidor(servidor)
+    for servidor in d['servidores_modificados']:
+        anterior = almacen.buscar_servidor(servidor.nombre)
+        conexiones = almacen.registro.todas(servidor=servidor.nombre)
+        if anterior._ip != servidor._ip:
+            rehacer += conexiones
+        # Servicios quitados: `permitido` decide
+        revocados += [(c['alumno'], c['servidor'], c['servicio']) for c in conexiones]
+        almacen.agregar_servidor(servidor)
+        for clave, codigos in almacen.cursos_con_permiso.items():
+            if clave[0] == servidor.nombre:
+                for codigo in codigos:
+                    recompilar(codigo)
+
+    for alumno in d['alumnos_agregados']:
+        motor.agregar_alumno(alumno)
+    for alumno in d['alumnos_modificados']:
+        almacen.agregar_alumno(alumno)
+    for alumno in d['alumnos_reubicados']:
+        reinstalar += [(c['alumno'], c['servidor'], c['servicio'])
+                       for c in almacen.registro.todas(alumno=alumno.codigo)]
+        almacen.agregar_alumno(alumno)
+        for codigo in almacen.cursos_de_alumno.get(alumno.codigo, ()):
+            recompilar(codigo, [alumno.codigo])  # solo cambian las reglas de esa MAC
+
+    for curso in d['cursos_agregados'] + d['cursos_reemplazados']:
+        motor.agregar_curso(curso)
+    for codigo, nombre in d['nombres']:
+        almacen.curso_por_codigo[codigo].nombre = nombre
+    for codigo, i in d['retiros']:
+        motor.desinscribir(codigo, CODIGOS.codigo(i))
+    for codigo, i in d['inscripciones']:
+        motor.inscribir(codigo, CODIGOS.codigo(i))
+    for codigo, estado in d['estados']:
+        motor.cambiar_estado(codigo, estado)
+    for codigo in d['cursos_eliminados']:
+        motor.eliminar_curso(codigo)
+
+    for codigo in d['alumnos_eliminados']:
+        motor.eliminar_alumno(codigo)
+    for nombre in d['servidores_eliminados']:
+        revocados += [(c['alumno'], c['servidor'], c['servicio']) for c in almacen.registro.todas(servidor=nombre)]
+        almacen.eliminar_servidor(nombre)
+
+    # Un permiso puede aparecer y desaparecer en pasos distintos: manda el estado final
+    def permitido(t):
+        return almacen.buscar_alumno(t[0]) is not None and almacen.buscar_servicio(t[1], t[2]) is not None \
+            and almacen.puede_conectarse(*t)
+    revocar = {t: None for t in revocados if not permitido(t)}
+    revocar.update(dict.fromkeys(reinstalar))
+    otorgar = [t for t in dict.fromkeys(otorgados + reinstalar) if permitido(t)]
+    rehacer = [c for c in rehacer if (c['alumno'], c['servidor'], c['servicio']) not in revocar]
+    return list(revocar), otorgar, [(c, None if a is None else sorted(a)) for c, a in cursos.items()
+                                    if c in almacen.curso_por_codigo], rehacer
@@ -0,0 +1,120 @@
+# ===== Reconciliación con la tabla de flows del controlador =====
+# Compara el conjunto de flows deseado con la lista de flows estáticos de
+# Floodlight (una sola consulta) y calcula el delta mínimo: flows faltantes,
+# flows con contenido distinto y flows propios que ya no deberían existir.
+# La cookie también se compara: un flow instalado sin la cookie propia que
+# se envía ahora (ver inactividad.cookie_flow) se vuelve a instalar.
+
+import re
+
+from inactividad import APP_ID_SHIFT, STATIC_FLOW_APP_ID
+
+LIST_PATH = "/wm/staticflowpusher/list/all/json"
+
+# Nombres de los flows que instala este programa: {handler}_{sentido}[_h{i}]
+# por conexión, o pol_{hash} para las reglas compiladas de un curso
+PATRON_PROPIO = re.compile(r"^([0-9a-f]{8}_(fw|bw|arp_fw|arp_bw)(_h\d+)?|pol_[0-9a-f]{10})$")
+
+# Campos del payload que no forman parte del match (la cookie se compara aparte)
+_NO_MATCH = {"switch", "name", "priority", "active", "actions", "cookie"}
+
+# Cookie que pone el Static Flow Pusher a un flow enviado sin "cookie"
+COOKIE_POR_DEFECTO = STATIC_FLOW_APP_ID << APP_ID_SHIFT
+
+
+def es_propio(nombre):
+    return PATRON_PROPIO.match(nombre) is not None
+
+
+def _norm(valor):
+    """
+    Normaliza un valor para comparar lo enviado con lo que devuelve el
+    controlador ("0x0800" == "0x800" == 2048, "true" == True, etc.).
+    """
+    texto = str(valor).strip().lower()
+    try:
+        return str(int(texto, 0))
+    except ValueError:
+        return texto
+
+
+def firma_deseada(flow):
+    """
+    Representación comparable de un flow tal como se envía al pusher.
+    """
+    match = tuple(sorted((k, _norm(v)) for k, v in flow.items() if k not in _NO_MATCH))
+    return (_norm(flow["switch"]), _norm(flow.get("priority", "32768")), match,
+            _norm(flow.get("actions", "")), _norm(flow.get("cookie", COOKIE_POR_DEFECTO)))
+
+
+def firma_instalada(dpid, entrada):
+    """
+    Representación comparable de un flow devuelto por list/all/json. Si
+    el controlador no informa la cookie, la firma la deja en None.
+    """
+    acciones = ""
+    instrucciones = entrada.get("instructions") or {}
+    for instruccion in instrucciones.values():
+        if isinstance(instruccion, dict) and "actions" in instruccion:
+            acciones = instruccion["actions"]
+    if not acciones and "actions" in entrada:
+        acciones = entrada["actions"]
+    match = tuple(sorted((k, _norm(v)) for k, v in (entrada.get("match") or {}).items()))
+    cookie = entrada.get("cookie")
+    return (_norm(dpid), _norm(entrada.get("priority", "32768")), match, _norm(acciones),
+            None if cookie is None else _norm(cookie))
+
+
+def coincide(instalada, deseada):
+    """
+    True si la firma instalada corresponde a la deseada; una cookie no
+    informada por el controlador no cuenta como diferencia.
+    """
+    if instalada[-1] is None:
+        return instalada[:-1] == deseada[:-1]
+    return instalada == deseada
+
+
+def listar_instalados(cliente):
+    """
+    Descarga en una sola petición todos los flows estáticos del controlador.
+    Devuelve {nombre: firma}.
+    """
+    datos = cliente.get_json(LIST_PATH)
+    instalados = {}
+    for dpid, flows in datos.items():
+        for item in flows:
+            for nombre, entrada in item.items():
+                instalados[nombre] = firma_instalada(dpid, entrada)
+    return instalados
+
+
+def planificar(deseados, instalados, conservar=()):
+    """
+    Calcula el delta entre `deseados` ({nombre: flow}) e `instalados`
+    ({nombre: firma}). Solo se proponen para borrar flows propios que no
+    estén en `deseados` ni en `conservar`.
+    """
+    faltantes, cambiados = [], []
+    for nombre, flow in deseados.items():
+        firma = instalados.get(nombre)
+        if firma is None:
+            faltantes.append(flow)
+        elif not coincide(firma, firma_deseada(flow)):
+            cambiados.append(flow)
+    conservar = set(conservar)
+    obsoletos = [n for n in instalados
+                 if n not in deseados and n not in conservar and es_propio(n)]
+    return {'faltantes': faltantes, 'cambiados': cambiados, 'obsoletos': obsoletos,
+            'correctos': len(deseados) - len(faltantes) - len(cambiados)}
+
+
+def aplicar(cliente, plan):
+    """
+    Aplica el plan en lote: instala faltantes y cambiados (el pusher
+    reemplaza un flow con el mismo nombre) y borra los obsoletos.
+    Devuelve la lista de resultados con error.
+    """
+    resultados = cliente.push_flows(plan['faltantes'] + plan['cambiados'])
+    resultados += cliente.delete_flows(plan['obsoletos'])
+    return [r for r in resultados if not r['ok']]
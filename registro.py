@@ -0,0 +1,213 @@
+# ===== Registro persistente de conexiones =====
+# SQLite (modo WAL) con índices por handler, alumno, servidor y servicio,
+# listado paginado por cursor (rowid), consultas filtradas y borrado masivo
+# por filtro.
+
+import json
+import sqlite3
+import threading
+import time
+
+COLUMNAS = ("handler", "alumno", "servidor", "servicio", "dpid", "puerto", "dpid_alumno", "puerto_alumno")
+FILTROS = ("handler", "alumno", "servidor", "servicio")
+_LOTE = 500  # handlers por sentencia (límite de parámetros de SQLite)
+MAX_PAGINA = 1000  # conexiones por página como máximo
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS conexiones (
+    handler       TEXT PRIMARY KEY,
+    alumno        TEXT NOT NULL,
+    servidor      TEXT NOT NULL,
+    servicio      TEXT NOT NULL,
+    dpid          TEXT,
+    puerto        TEXT,
+    dpid_alumno   TEXT,
+    puerto_alumno TEXT,
+    flows         TEXT,
+    creada        REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_conexiones_alumno ON conexiones (alumno, servidor, servicio);
+CREATE INDEX IF NOT EXISTS idx_conexiones_servidor ON conexiones (servidor, servicio);
+CREATE INDEX IF NOT EXISTS idx_conexiones_servicio ON conexiones (servicio);
+"""
+
+_UPSERT = (
+    f"INSERT INTO conexiones ({', '.join(COLUMNAS)}, flows, creada) "
+    f"VALUES ({', '.join('?' * (len(COLUMNAS) + 2))}) "
+    f"ON CONFLICT(handler) DO UPDATE SET "
+    + ", ".join(f"{k} = excluded.{k}" for k in COLUMNAS[1:] + ("flows",)))
+
+
+class RegistroConexiones:
+    """
+    Registro de conexiones activas respaldado por SQLite. Cada conexión es
+    un dict con handler, alumno, servidor, servicio, dpid, puerto,
+    dpid_alumno, puerto_alumno y la lista de flows instalados.
+    Con path=":memory:" funciona igual pero sin persistencia.
+    """
+
+    def __init__(self, path=":memory:"):
+        self.path = path
+        self._lock = threading.RLock()
+        self.db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self.db.row_factory = sqlite3.Row
+        if path != ":memory:":
+            self.db.execute("PRAGMA journal_mode=WAL")
+            self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(_ESQUEMA)
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    # ----- Altas -----
+    def agregar(self, conexion):
+        self.agregar_varias([conexion])
+
+    def agregar_varias(self, conexiones):
+        """
+        Inserta las conexiones; si el handler ya existe actualiza sus datos
+        y conserva su rowid (su lugar en el listado) y la fecha de creación.
+        """
+        filas = [tuple(_texto(c.get(k)) for k in COLUMNAS) + (json.dumps(c.get('flows') or []), time.time())
+                 for c in conexiones]
+        with self._lock:
+            with _transaccion(self.db):
+                self.db.executemany(_UPSERT, filas)
+
+    # ----- Consultas -----
+    def buscar(self, handler):
+        with self._lock:
+            fila = self.db.execute("SELECT * FROM conexiones WHERE handler = ?", (handler,)).fetchone()
+        return _conexion(fila) if fila else None
+
+    def existe(self, alumno, servidor, servicio):
+        with self._lock:
+            fila = self.db.execute(
+                "SELECT 1 FROM conexiones WHERE alumno = ? AND servidor = ? AND servicio = ? LIMIT 1",
+                (alumno, servidor, servicio)).fetchone()
+        return fila is not None
+
+    def contar(self, **filtros):
+        where, params = _where(filtros)
+        with self._lock:
+            return self.db.execute(f"SELECT COUNT(*) FROM conexiones{where}", params).fetchone()[0]
+
+    def contar_flows(self, por_defecto=4):
+        """
+        Total de flows instalados por las conexiones registradas; las que no
+        guardan la lista de flows cuentan `por_defecto` (ruta de un salto).
+        """
+        with self._lock:
+            total = self.db.execute(
+                "SELECT SUM(CASE WHEN flows IS NULL OR flows = '[]' THEN ? ELSE json_array_length(flows) END)"
+                " FROM conexiones", (por_defecto,)).fetchone()[0]
+        return total or 0
+
+    def por_switch(self):
+        """
+        {dpid del servidor: [handlers]} de las conexiones con ubicación conocida.
+        """
+        with self._lock:
+            filas = self.db.execute("SELECT dpid, handler FROM conexiones WHERE dpid IS NOT NULL").fetchall()
+        resultado = {}
+        for dpid, handler in filas:
+            resultado.setdefault(dpid, []).append(handler)
+        return resultado
+
+    def listar(self, despues=0, tam_pagina=50, **filtros):
+        """
+        Devuelve (conexiones, cursor): una página de conexiones (en orden de
+        creación) que cumplen los filtros (handler, alumno, servidor,
+        servicio), empezando después del cursor `despues`. El cursor
+        devuelto es el rowid de la última conexión de la página, o None si
+        no hay más. Cada página cuesta lo mismo sin importar su posición.
+        `tam_pagina` debe ser al menos 1 y se limita a MAX_PAGINA.
+        """
+        if tam_pagina < 1:
+            raise ValueError(f"Tamaño de página inválido: {tam_pagina}")
+        tam_pagina = min(tam_pagina, MAX_PAGINA)
+        where, params = _where(filtros, [("rowid > ?", despues or 0)])
+        with self._lock:
+            filas = self.db.execute(
+                f"SELECT rowid, * FROM conexiones{where} ORDER BY rowid LIMIT ?",
+                params + [tam_pagina + 1]).fetchall()
+        siguiente = filas[tam_pagina - 1]['rowid'] if len(filas) > tam_pagina else None
+        return [_conexion(f) for f in filas[:tam_pagina]], siguiente
+
+    def todas(self, **filtros):
+        where, params = _where(filtros)
+        with self._lock:
+            filas = self.db.execute(f"SELECT * FROM conexiones{where} ORDER BY rowid", params).fetchall()
+        return [_conexion(f) for f in filas]
+
+    # ----- Bajas -----
+    def eliminar(self, handler):
+        eliminadas = self.eliminar_por(handler=handler)
+        return eliminadas[0] if eliminadas else None
+
+    def eliminar_por(self, **filtros):
+        """
+        Borra todas las conexiones que cumplen los filtros en una transacción
+        y las devuelve (para poder retirar sus flows). Sin filtros no borra nada.
+        """
+        if not any(filtros.values()):
+            return []
+        where, params = _where(filtros)
+        with self._lock:
+            with _transaccion(self.db):
+                filas = self.db.execute(f"SELECT * FROM conexiones{where}", params).fetchall()
+                self.db.execute(f"DELETE FROM conexiones{where}", params)
+        return [_conexion(f) for f in filas]
+
+    def eliminar_handlers(self, handlers):
+        """
+        Borra las conexiones de `handlers` en una transacción y devuelve las
+        que existían.
+        """
+        handlers = list(handlers)
+        filas = []
+        with self._lock:
+            with _transaccion(self.db):
+                for i in range(0, len(handlers), _LOTE):
+                    lote = handlers[i:i + _LOTE]
+                    marcas = ", ".join("?" * len(lote))
+                    filas += self.db.execute(f"SELECT * FROM conexiones WHERE handler IN ({marcas})", lote).fetchall()
+                    self.db.execute(f"DELETE FROM conexiones WHERE handler IN ({marcas})", lote)
+        return [_conexion(f) for f in filas]
+
+    def limpiar(self):
+        with self._lock:
+            self.db.execute("DELETE FROM conexiones")
+
+
+class _transaccion:
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN")
+
+    def __exit__(self, tipo, *exc):
+        self.db.execute("COMMIT" if tipo is None else "ROLLBACK")
+
+
+def _texto(valor):
+    return None if valor is None else str(valor)
+
+
+def _where(filtros, extra=()):
+    usados = [(k, v) for k, v in filtros.items() if v]
+    for k, _ in usados:
+        if k not in FILTROS:
+            raise ValueError(f"Filtro no soportado: {k}")
+    condiciones = [(f"{k} = ?", v) for k, v in usados] + list(extra)
+    if not condiciones:
+        return "", []
+    return " WHERE " + " AND ".join(c for c, _ in condiciones), [v for _, v in condiciones]
+
+
+def _conexion(fila):
+    conexion = {k: fila[k] for k in COLUMNAS if fila[k] is not None}
+    conexion['flows'] = json.loads(fila['flows']) if fila['flows'] else []
+    return conexion
@@ -0,0 +1,107 @@
+# ===== Snapshot binario del estado =====
+# Formato compacto y versionado para arrancar sin volver a leer el YAML:
+# cabecera mágica + versión + JSON comprimido con zlib de listas simples.
+# Leerlo nunca ejecuta código (el archivo puede venir del menú, la CLI o la
+# API). La escritura es atómica (archivo temporal + fsync + os.replace).
+
+import json
+import os
+import tempfile
+import zlib
+
+MAGIA = b"NPMSNAP"
+VERSION = 3
+LEGIBLES = (2, VERSION)  # la 2 guardaba solo los códigos de los cursos compilados
+NIVEL_ZLIB = 1  # el snapshot se escribe en cada salida: prima la velocidad
+
+
+CLAVES = ('alumnos', 'cursos', 'servidores', 'conexiones', 'compilados')
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def guardar(path, almacen, compilados=None):
+    """
+    Escribe alumnos, cursos, servidores, conexiones (con los nombres de
+    los flows instalados) y los cursos con política compilada en `path`
+    de forma atómica. `compilados` es {curso: nombres de sus reglas
+    instaladas (o None)}: así se pueden retirar después de reiniciar.
+    """
+    datos = {
+        'alumnos': [(a.nombre, a.codigo, a.mac) for a in almacen.alumnos],
+        'cursos': [(c.codigo, c.estado, c.nombre, list(c.alumnos), c.servidores) for c in almacen.cursos],
+        'servidores': [(s.nombre, s.ip, s.servicios) for s in almacen.servidores],
+        'conexiones': almacen.conexiones,
+        'compilados': sorted([c, sorted(nombres or ())] for c, nombres in (compilados or {}).items()),
+    }
+    directorio = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".snap-", dir=directorio)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(MAGIA + bytes([VERSION]))
+            f.write(zlib.compress(json.dumps(datos, separators=(",", ":")).encode(), NIVEL_ZLIB))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.unlink(tmp)
+        raise
+
+
+def leer(path):
+    """
+    Lee un snapshot y devuelve el dict con las listas. En 'compilados'
+    cada curso es [código, nombres de reglas] (sin nombres en la versión 2).
+    """
+    with open(path, 'rb') as f:
+        cabecera = f.read(len(MAGIA) + 1)
+        if len(cabecera) <= len(MAGIA) or cabecera[:len(MAGIA)] != MAGIA:
+            raise SnapshotError(f"'{path}' no es un snapshot válido")
+        version = cabecera[len(MAGIA)]
+        if version not in LEGIBLES:
+            raise SnapshotError(f"Versión de snapshot no soportada: {version} "
+                                f"(vuelva a exportarlo desde el YAML)")
+        try:
+            datos = json.loads(zlib.decompress(f.read()))
+        except (zlib.error, ValueError) as e:
+            raise SnapshotError(f"'{path}' está dañado: {e}")
+    if not isinstance(datos, dict) or not all(isinstance(datos.get(k), list) for k in CLAVES):
+        raise SnapshotError(f"'{path}' no tiene el formato esperado")
+    if version == 2:
+        datos['compilados'] = [[c, []] for c in datos['compilados']]
+    if not all(isinstance(c, list) and len(c) == 2 and isinstance(c[1], list) for c in datos['compilados']):
+        raise SnapshotError(f"'{path}' tiene un curso compilado inválido")
+    return datos
+
+
+def cargar(path, almacen, alumno_cls, curso_cls, servidor_cls, conexiones=True):
+    """
+    Reemplaza alumnos, cursos y servidores del almacén con los del snapshot.
+    El registro de conexiones es persistente y manda: las conexiones del
+    snapshot solo se recuperan si el registro está vacío (p. ej. al migrar a
+    otra máquina); con conexiones=False nunca. Todo se construye antes de
+    tocar el almacén: si el snapshot tiene un registro inválido, el almacén
+    queda como estaba. Devuelve los datos leídos.
+    """
+    datos = leer(path)
+    nuevo = type(almacen)()
+    try:
+        try:
+            nuevo.cargar(
+                alumnos=[alumno_cls(*a) for a in datos['alumnos']],
+                cursos=[curso_cls(*c) for c in datos['cursos']],
+                servidores=[servidor_cls(*s) for s in datos['servidores']],
+            )
+        except (TypeError, ValueError, KeyError, AttributeError) as e:
+            raise SnapshotError(f"'{path}' tiene un registro inválido: {e}")
+        if conexiones and not all(isinstance(c, dict) and 'handler' in c for c in datos['conexiones']):
+            raise SnapshotError(f"'{path}' tiene una conexión inválida")
+        almacen.adoptar(nuevo)
+    finally:
+        nuevo.registro.close()
+    if conexiones and not almacen.hay_conexiones():
+        almacen.agregar_conexiones(datos['conexiones'])
+    return datos
@@ -0,0 +1,69 @@
+# ===== Pruebas del almacén y la matriz de acceso =====
+# Altas y bajas de alumnos: un código eliminado (o inscrito sin estar
+# registrado) no tiene acceso, y al registrarlo recupera sus cursos.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacen import Almacen  # noqa: E402
+from main import Alumno, Curso, Servidor  # noqa: E402
+
+SSH = {'nombre': "ssh", 'protocolo': "TCP", 'puerto': 22}
+
+
+def almacen(alumnos=("A1", "A2"), inscritos=("A1", "A2"), estado="DICTANDO"):
+    a = Almacen()
+    a.cargar(
+        [Alumno(f"Alumno {c}", c, f"00:00:00:00:00:{i:02x}") for i, c in enumerate(alumnos, 1)],
+        [Curso("C1", estado, "Curso C1", list(inscritos), [{'nombre': "S1", 'servicios_permitidos': ["ssh"]}])],
+        [Servidor("S1", "10.0.0.1", [dict(SSH)])])
+    return a
+
+
+class TestEliminarAlumno(unittest.TestCase):
+    def test_alumno_eliminado_pierde_el_acceso(self):
+        a = almacen()
+        self.assertTrue(a.puede_conectarse("A1", "S1", "ssh"))
+        a.eliminar_alumno("A1")
+        self.assertFalse(a.puede_conectarse("A1", "S1", "ssh"))
+        self.assertEqual(list(a.matriz.permisos_de("A1")), [])
+        self.assertTrue(a.puede_conectarse("A2", "S1", "ssh"))
+
+    def test_alumno_eliminado_no_figura_con_acceso(self):
+        a = almacen()
+        a.eliminar_alumno("A1")
+        self.assertEqual(sorted(a.matriz.alumnos_con_acceso("S1", "ssh")), ["A2"])
+
+    def test_alumno_registrado_de_nuevo_recupera_sus_cursos(self):
+        a = almacen()
+        a.eliminar_alumno("A1")
+        a.agregar_alumno(Alumno("Alumno A1", "A1", "00:00:00:00:00:01"))
+        self.assertTrue(a.puede_conectarse("A1", "S1", "ssh"))
+
+    def test_alumno_de_curso_inactivo_no_recupera_acceso(self):
+        a = almacen(estado="INACTIVO")
+        a.eliminar_alumno("A1")
+        a.agregar_alumno(Alumno("Alumno A1", "A1", "00:00:00:00:00:01"))
+        self.assertFalse(a.puede_conectarse("A1", "S1", "ssh"))
+
+
+class TestInscritoSinRegistrar(unittest.TestCase):
+    def test_codigo_sin_alumno_no_tiene_acceso(self):
+        a = almacen(alumnos=("A1",), inscritos=("A1", "X9"))
+        self.assertFalse(a.puede_conectarse("X9", "S1", "ssh"))
+
+    def test_inscripcion_de_codigo_sin_alumno(self):
+        a = almacen(alumnos=("A1",), inscritos=("A1",))
+        a.inscribir("C1", "X9")
+        self.assertFalse(a.puede_conectarse("X9", "S1", "ssh"))
+        a.agregar_alumno(Alumno("Alumno X9", "X9", "00:00:00:00:00:09"))
+        self.assertTrue(a.puede_conectarse("X9", "S1", "ssh"))
+
+
+if __name__ == "__main__":
+    unittest.main()
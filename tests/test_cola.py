@@ -0,0 +1,176 @@
+# ===== Pruebas de la cola de flows =====
+# Contra el Floodlight falso de bench/: combinación de operaciones sobre un
+# mismo flow, reintentos con backoff, contrapresión y aviso al terminar.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.floodlight_falso import FloodlightFalso  # noqa: E402
+from cola import ColaFlows  # noqa: E402
+from floodlight import FloodlightClient  # noqa: E402
+
+
+def flow(nombre, puerto=1):
+    return {"switch": "00:00:00:00:00:00:00:01", "name": nombre, "priority": "100",
+            "in_port": "1", "active": "true", "actions": f"output={puerto}"}
+
+
+class PruebaCola(unittest.TestCase):
+    latencia = 0.0
+    tasa_error = 0.0
+
+    def setUp(self):
+        self.falso = FloodlightFalso(latencia=self.latencia, tasa_error=self.tasa_error).iniciar()
+        self.cliente = FloodlightClient(self.falso.url, max_workers=4)
+        self.colas = []
+
+    def tearDown(self):
+        for cola in self.colas:
+            cola.detener(timeout=5)
+        self.cliente.close()
+        self.falso.detener()
+
+    def nueva_cola(self, **opciones):
+        cola = ColaFlows(self.cliente, **opciones)
+        self.colas.append(cola)
+        return cola
+
+
+class TestCombinacion(PruebaCola):
+    def test_push_repetido_se_envia_una_vez_con_el_ultimo_valor(self):
+        cola = self.nueva_cola(ventana=0.2)
+        ops = [cola.encolar_push([flow("f1", puerto)])[0] for puerto in (1, 2, 3)]
+        resultados = [op.esperar(5) for op in ops]
+        self.assertTrue(all(r['ok'] for r in resultados))
+        self.assertEqual(self.falso.peticiones, 1)
+        self.assertEqual(self.falso.flows["f1"]["actions"], "output=3")
+
+    def test_push_nuevo_y_delete_se_anulan(self):
+        cola = self.nueva_cola(ventana=0.2)
+        push, = cola.encolar_push([flow("f1")], nuevo=True)
+        delete, = cola.encolar_delete(["f1"])
+        self.assertTrue(push.esperar(5)['combinada'])
+        self.assertTrue(delete.esperar(5)['combinada'])
+        self.assertTrue(cola.esperar(5))
+        self.assertEqual(self.falso.peticiones, 0)
+
+    def test_delete_de_flow_existente_llega_al_controlador(self):
+        cola = self.nueva_cola(ventana=0.2)
+        cola.push_flows([flow("f1")])
+        push, = cola.encolar_push([flow("f1", 2)])
+        delete, = cola.encolar_delete(["f1"])
+        self.assertTrue(delete.esperar(5)['ok'])
+        self.assertEqual(push.esperar(5)['name'], "f1")
+        self.assertNotIn("f1", self.falso.flows)
+        self.assertEqual(self.falso.peticiones, 2)  # el push inicial y el delete
+
+
+class TestReintentos(PruebaCola):
+    tasa_error = 1.0
+
+    def test_falla_definitiva_tras_max_intentos(self):
+        cola = self.nueva_cola(ventana=0, max_intentos=3, espera_inicial=0.05)
+        inicio = time.monotonic()
+        resultado, = cola.push_flows([flow("f1")])
+        transcurrido = time.monotonic() - inicio
+        self.assertFalse(resultado['ok'])
+        self.assertEqual(resultado['status'], 500)
+        self.assertEqual(self.falso.peticiones, 3)
+        # Esperas de 0.05 y 0.1 s, con jitter de la mitad como mínimo
+        self.assertGreaterEqual(transcurrido, 0.5 * (0.05 + 0.1))
+        fallido, = cola.revisar_fallidos()
+        self.assertEqual((fallido['name'], fallido['intentos']), ("f1", 3))
+
+    def test_reintenta_hasta_que_el_controlador_responde(self):
+        cola = self.nueva_cola(ventana=0, max_intentos=5, espera_inicial=0.05)
+        responder = self.falso._responder
+
+        def dos_errores(metodo, path, cuerpo):
+            self.falso.tasa_error = 1.0 if self.falso.peticiones < 2 else 0.0
+            return responder(metodo, path, cuerpo)
+        self.falso._responder = dos_errores
+        op, = cola.encolar_push([flow("f1")])
+        resultado = op.esperar(5)
+        self.assertTrue(resultado['ok'])
+        self.assertEqual(op.intentos, 3)
+        self.assertIn("f1", self.falso.flows)
+        self.assertEqual(cola.revisar_fallidos(), [])
+
+    def test_error_4xx_no_se_reintenta(self):
+        cola = self.nueva_cola(ventana=0, max_intentos=5, espera_inicial=0.05)
+        self.falso.tasa_error = 0.0
+        self.falso._responder = lambda metodo, path, cuerpo: (400, {"status": "Bad request"})
+        resultado, = cola.push_flows([flow("f1")])
+        self.assertEqual(resultado['status'], 400)
+        self.assertEqual(cola.revisar_fallidos()[0]['intentos'], 1)
+
+
+class TestContrapresion(PruebaCola):
+    def test_encolar_se_bloquea_con_la_cola_llena(self):
+        cola = self.nueva_cola(ventana=0.5, max_pendientes=2)
+        cola.encolar_push([flow("f1"), flow("f2")])
+        inicio = time.monotonic()
+        self.assertIsNone(cola.encolar_push([flow("f3")], timeout=0.05))
+        self.assertGreaterEqual(time.monotonic() - inicio, 0.05)
+        self.assertNotIn("f3", cola._pendientes)
+
+    def test_flow_pendiente_no_ocupa_lugar(self):
+        cola = self.nueva_cola(ventana=0.5, max_pendientes=2)
+        cola.encolar_push([flow("f1"), flow("f2")])
+        self.assertIsNotNone(cola.encolar_push([flow("f1", 2)], timeout=0.05))
+
+    def test_se_libera_lugar_al_despachar(self):
+        cola = self.nueva_cola(ventana=0.05, max_pendientes=2)
+        cola.encolar_push([flow("f1"), flow("f2")])
+        ops = cola.encolar_push([flow("f3")], timeout=5)
+        self.assertIsNotNone(ops)
+        self.assertTrue(ops[0].esperar(5)['ok'])
+        self.assertTrue(cola.esperar(5))
+        self.assertEqual(sorted(self.falso.flows), ["f1", "f2", "f3"])
+
+
+class TestAviso(PruebaCola):
+    def test_al_terminar_recibe_todos_los_resultados(self):
+        cola = self.nueva_cola(ventana=0.01, max_intentos=1)
+        self.falso.tasa_error = 0.0
+        listo, recibidos = threading.Event(), []
+
+        def al_terminar(resultados):
+            recibidos.extend(resultados)
+            listo.set()
+        cola.encolar_push([flow("f1"), flow("f2")], al_terminar=al_terminar)
+        self.assertTrue(listo.wait(5))
+        self.assertEqual(sorted(r['name'] for r in recibidos), ["f1", "f2"])
+        self.assertTrue(all(r['ok'] for r in recibidos))
+
+    def test_al_terminar_informa_errores_y_puede_volver_a_encolar(self):
+        cola = self.nueva_cola(ventana=0.01, max_intentos=1)
+        self.falso.tasa_error = 1.0
+        listo, borrados = threading.Event(), []
+
+        def al_terminar(resultados):
+            # Corre fuera del lock de la cola: puede encolar de nuevo
+            self.falso.tasa_error = 0.0
+            borrados.extend(cola.delete_flows([r['name'] for r in resultados if not r['ok']]))
+            listo.set()
+        cola.encolar_push([flow("f1")], nuevo=True, al_terminar=al_terminar)
+        self.assertTrue(listo.wait(5))
+        self.assertEqual([r['name'] for r in borrados], ["f1"])
+
+    def test_al_terminar_con_operaciones_combinadas(self):
+        cola = self.nueva_cola(ventana=0.2)
+        listo = threading.Event()
+        cola.encolar_push([flow("f1")], nuevo=True, al_terminar=lambda resultados: listo.set())
+        cola.encolar_delete(["f1"])
+        self.assertTrue(listo.wait(5))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+# ===== Pruebas del mapa de controladores =====
+# Elección del controlador de cada switch (lista de switches, rangos de
+# DPID y controlador por defecto), dueño de cada flow para los deletes y
+# reparto de lotes contra dos Floodlight falsos.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.floodlight_falso import FloodlightFalso  # noqa: E402
+from controladores import Controladores, dpid_a_entero  # noqa: E402
+
+URL = "http://127.0.0.1:9"  # nunca se consulta en las pruebas de enrutamiento
+
+
+def dpid(n):
+    return ":".join(f"{b:02x}" for b in n.to_bytes(8, "big"))
+
+
+class TestEleccion(unittest.TestCase):
+    def setUp(self):
+        self.mapa = Controladores(URL)
+        self.norte = self.mapa.agregar("norte", URL, rangos=[(dpid(0x01), dpid(0xff))])
+        self.sur = self.mapa.agregar("sur", URL, rangos=[(dpid(0x100), dpid(0x1ff))], switches=[dpid(0x10)])
+        self.resto = self.mapa.agregar("resto", URL, por_defecto=True)
+
+    def tearDown(self):
+        self.mapa.close()
+
+    def test_dpid_a_entero(self):
+        self.assertEqual([dpid_a_entero(d) for d in (dpid(0x1ff), "0x1ff", 0x1ff, "00-00-01-ff")], [0x1ff] * 4)
+        self.assertIsNone(dpid_a_entero("no-es-un-dpid"))
+
+    def test_rangos_inclusive(self):
+        self.assertIs(self.mapa.controlador_de(dpid(0x01)), self.norte)
+        self.assertIs(self.mapa.controlador_de(dpid(0xff)), self.norte)
+        self.assertIs(self.mapa.controlador_de(dpid(0x100)), self.sur)
+        self.assertIs(self.mapa.controlador_de(dpid(0x1ff)), self.sur)
+
+    def test_switch_explicito_gana_al_rango(self):
+        self.assertIs(self.mapa.controlador_de(dpid(0x10)), self.sur)
+        self.assertIs(self.mapa.controlador_de("0x10"), self.sur)
+
+    def test_fuera_de_rango_va_al_por_defecto(self):
+        self.assertIs(self.mapa.controlador_de(dpid(0x200)), self.resto)
+        self.assertIs(self.mapa.controlador_de("no-es-un-dpid"), self.resto)
+
+    def test_sin_por_defecto_no_hay_destino(self):
+        mapa = Controladores(URL)
+        mapa.agregar("norte", URL, rangos=[(dpid(0x01), dpid(0xff))])
+        mapa.agregar("sur", URL, rangos=[(dpid(0x100), dpid(0x1ff))])
+        self.assertIsNone(mapa.controlador_de(dpid(0x200)))
+        resultado = mapa.push_flow({"switch": dpid(0x200), "name": "f1"})
+        self.assertEqual((resultado['ok'], resultado['status']), (False, 400))
+        mapa.close()
+
+    def test_el_delete_va_al_controlador_que_instalo_el_flow(self):
+        self.assertIs(self.mapa.ruta(dpid(0x150), "f1"), self.sur)
+        self.assertIs(self.mapa.ruta(None, "f1"), self.sur)
+        self.assertIs(self.mapa.ruta(None, "f1"), self.mapa)  # ya olvidado: a todos
+
+    def test_configuracion_invalida(self):
+        with self.assertRaises(ValueError):
+            self.mapa.agregar("otro", URL, rangos=[(dpid(0x80), dpid(0x120))])  # superpuesto
+        with self.assertRaises(ValueError):
+            self.mapa.agregar("invertido", URL, rangos=[(dpid(0x300), dpid(0x2ff))])
+        with self.assertRaises(ValueError):
+            self.mapa.agregar("norte", URL)
+        with self.assertRaises(ValueError):
+            self.mapa.agregar("otro_defecto", URL, por_defecto=True)
+
+    def test_archivo_de_configuracion(self):
+        with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+            f.write(f'controladores:\n'
+                    f'  - {{nombre: norte, url: "{URL}", rangos: [{{desde: "{dpid(1)}", hasta: "{dpid(0xff)}"}}]}}\n'
+                    f'  - {{nombre: sur, url: "{URL}", switches: ["{dpid(0x100)}"], por_defecto: true}}\n')
+        try:
+            mapa = Controladores(URL, config=f.name)
+            self.assertEqual([c.nombre for c in mapa.controladores], ["norte", "sur"])
+            self.assertEqual(mapa.controlador_de(dpid(0x05)).nombre, "norte")
+            self.assertEqual(mapa.controlador_de(dpid(0x999)).nombre, "sur")
+            mapa.close()
+        finally:
+            os.unlink(f.name)
+
+
+class TestReparto(unittest.TestCase):
+    def setUp(self):
+        self.falsos = [FloodlightFalso().iniciar() for _ in range(2)]
+        self.mapa = Controladores(self.falsos[0].url)
+        self.mapa.agregar("a", self.falsos[0].url, rangos=[(dpid(0x01), dpid(0xff))], por_defecto=True)
+        self.mapa.agregar("b", self.falsos[1].url, rangos=[(dpid(0x100), dpid(0x1ff))])
+
+    def tearDown(self):
+        self.mapa.close()
+        for falso in self.falsos:
+            falso.detener()
+
+    def test_lote_repartido_por_switch(self):
+        flows = [{"switch": dpid(s), "name": f"f{s:x}", "priority": "100", "actions": "output=1"}
+                 for s in (0x01, 0x150, 0x02, 0x1ff)]
+        resultados = self.mapa.push_flows(flows)
+        self.assertEqual([r['name'] for r in resultados], [f['name'] for f in flows])  # mismo orden
+        self.assertTrue(all(r['ok'] for r in resultados))
+        self.assertEqual(sorted(self.falsos[0].flows), ["f1", "f2"])
+        self.assertEqual(sorted(self.falsos[1].flows), ["f150", "f1ff"])
+        self.mapa.delete_flows(["f150", "f1"])
+        self.assertEqual(sorted(self.falsos[0].flows), ["f2"])
+        self.assertEqual(sorted(self.falsos[1].flows), ["f1ff"])
+
+    def test_lecturas_combinadas(self):
+        self.mapa.push_flows([{"switch": dpid(s), "name": f"f{s:x}", "priority": "100", "actions": "output=1"}
+                              for s in (0x01, 0x150)])
+        listado = self.mapa.get_json("/wm/staticflowpusher/list/all/json")
+        self.assertEqual(sorted(listado), [dpid(0x01), dpid(0x150)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+# ===== Pruebas de la lectura de YAML en streaming =====
+# iterar_registros debe entregar lo mismo que yaml.safe_load para anclas,
+# alias y claves de fusión, y rechazar documentos que no puede leer por
+# registros (no mapeos y claves de nivel superior repetidas).
+#
+#   python -m pytest tests
+
+import io
+import os
+import sys
+import threading
+import unittest
+
+import yaml
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from importacion import iterar_registros  # noqa: E402
+
+
+def registros(texto):
+    resultado = {}
+    for bloque, registro in iterar_registros(io.StringIO(texto)):
+        resultado.setdefault(bloque, []).append(registro)
+    return resultado
+
+
+def esperado(texto):
+    return {k: v for k, v in (yaml.safe_load(texto) or {}).items() if isinstance(v, list) and v}
+
+
+class TestEquivalencia(unittest.TestCase):
+    def comparar(self, texto):
+        self.assertEqual(registros(texto), esperado(texto))
+
+    def test_escalares(self):
+        self.comparar("alumnos:\n- {codigo: 0012, activo: yes, nota: 1.5, mac: ~, fecha: 2024-03-01}\n"
+                      "- {codigo: '0012', activo: 'yes', nota: '1.5'}\n")
+
+    def test_anclas_y_alias(self):
+        self.comparar("base: &srv {nombre: S1, ip: 10.0.0.1}\n"
+                      "servicios: &ssh [{nombre: ssh, puerto: 22}]\n"
+                      "servidores:\n- *srv\n- {nombre: S2, servicios: *ssh}\n")
+
+    def test_claves_de_fusion(self):
+        self.comparar("comun: &comun {estado: DICTANDO, servidores: []}\n"
+                      "otro: &otro {estado: INACTIVO, nombre: Otro}\n"
+                      "cursos:\n"
+                      "- {<<: *comun, codigo: C1, nombre: Uno}\n"
+                      "- {<<: [*otro, *comun], codigo: C2}\n"
+                      "- {<<: *comun, estado: INACTIVO, codigo: C3}\n")
+
+    def test_lista_de_nivel_superior_con_ancla(self):
+        self.comparar("alumnos: &todos [{codigo: A1}, {codigo: A2}]\ncopia: *todos\n")
+
+    def test_documento_vacio(self):
+        for texto in ("", "---\n", "~\n"):
+            self.assertEqual(registros(texto), {})
+
+
+class TestRechazos(unittest.TestCase):
+    def test_documento_que_no_es_mapeo(self):
+        for texto in ("- {codigo: A1}\n", "alumnos\n", "[alumnos: [{codigo: A1}]]\n"):
+            with self.assertRaises(yaml.YAMLError):
+                registros(texto)
+
+    def test_clave_de_nivel_superior_repetida(self):
+        with self.assertRaises(yaml.YAMLError):
+            registros("alumnos: [{codigo: A1}]\nalumnos: [{codigo: A2}]\n")
+
+    def test_alias_sin_ancla(self):
+        with self.assertRaises(yaml.YAMLError):
+            registros("alumnos: [*nada]\n")
+
+
+class TestConcurrencia(unittest.TestCase):
+    def test_lecturas_en_paralelo(self):
+        texto = "alumnos:\n" + "".join(f"- {{codigo: {i}, activo: yes}}\n" for i in range(2000))
+        resultados, errores = [], []
+
+        def leer():
+            try:
+                resultados.append(registros(texto))
+            except Exception as e:
+                errores.append(e)
+        hilos = [threading.Thread(target=leer) for _ in range(4)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+        self.assertEqual(errores, [])
+        self.assertTrue(all(r == esperado(texto) for r in resultados))
+
+
+if __name__ == "__main__":
+    unittest.main()
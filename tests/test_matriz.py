@@ -0,0 +1,139 @@
+# ===== Pruebas de la matriz de acceso =====
+# Bits que se encienden y apagan con cada cambio incremental del almacén
+# (altas y bajas de cursos, estados, inscripciones), comparados con la
+# matriz armada desde cero con los mismos datos.
+#
+#   python -m pytest tests
+
+import os
+import random
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from almacen import Almacen  # noqa: E402
+from main import Alumno, Curso, Servidor  # noqa: E402
+
+SERVICIOS = [{'nombre': "ssh", 'protocolo': "TCP", 'puerto': 22},
+             {'nombre': "web", 'protocolo': "TCP", 'puerto': 80}]
+
+
+def alumnos(n):
+    return [Alumno(f"Alumno M{i}", f"M{i}", f"00:00:00:00:{i >> 8:02x}:{i & 255:02x}") for i in range(n)]
+
+
+def curso(codigo, inscritos, permisos, estado="DICTANDO"):
+    return Curso(codigo, estado, f"Curso {codigo}", list(inscritos),
+                 [{'nombre': s, 'servicios_permitidos': list(v)} for s, v in permisos.items()])
+
+
+def almacen(cursos, n=6):
+    a = Almacen()
+    a.cargar(alumnos(n), cursos, [Servidor(s, f"10.0.0.{i}", [dict(x) for x in SERVICIOS])
+                                  for i, s in enumerate(("S1", "S2"), 1)])
+    return a
+
+
+def recompuesta(a):
+    """
+    Matriz de un almacén nuevo con los mismos datos: lo que el almacén
+    incremental debería tener.
+    """
+    otro = Almacen()
+    otro.cargar(a.alumnos, [curso(c.codigo, c.alumnos, {s['nombre']: s['servicios_permitidos'] for s in c.servidores},
+                                  c.estado) for c in a.cursos], a.servidores)
+    return otro.matriz
+
+
+class TestBits(unittest.TestCase):
+    def assertAcceso(self, a, servidor, servicio, esperado):
+        self.assertEqual(sorted(a.matriz.alumnos_con_acceso(servidor, servicio)), sorted(esperado))
+        self.assertEqual(a.matriz.contar(servidor, servicio), len(esperado))
+
+    def test_curso_dictando_otorga_e_inactivo_no(self):
+        a = almacen([curso("C1", ["M0", "M1"], {"S1": ["ssh"]}),
+                     curso("C2", ["M2"], {"S1": ["ssh"]}, estado="INACTIVO")])
+        self.assertAcceso(a, "S1", "ssh", ["M0", "M1"])
+        self.assertAcceso(a, "S1", "web", [])
+        self.assertEqual(a.matriz.permisos_de("M0"), [("S1", "ssh")])
+
+    def test_cambio_de_estado(self):
+        a = almacen([curso("C1", ["M0", "M1"], {"S1": ["ssh", "web"]})])
+        a.cambiar_estado("C1", "INACTIVO")
+        self.assertAcceso(a, "S1", "ssh", [])
+        a.cambiar_estado("C1", "DICTANDO")
+        self.assertAcceso(a, "S1", "web", ["M0", "M1"])
+
+    def test_permiso_por_dos_cursos(self):
+        a = almacen([curso("C1", ["M0", "M1"], {"S1": ["ssh"]}), curso("C2", ["M1"], {"S1": ["ssh"]})])
+        a.desinscribir("C1", "M1")
+        self.assertAcceso(a, "S1", "ssh", ["M0", "M1"])  # M1 lo conserva por C2
+        a.cambiar_estado("C2", "INACTIVO")
+        self.assertAcceso(a, "S1", "ssh", ["M0"])
+        a.eliminar_curso("C1")
+        self.assertAcceso(a, "S1", "ssh", [])
+
+    def test_inscribir_y_desinscribir(self):
+        a = almacen([curso("C1", [], {"S1": ["ssh"], "S2": ["web"]})])
+        a.inscribir("C1", "M3")
+        self.assertEqual(sorted(a.matriz.permisos_de("M3")), [("S1", "ssh"), ("S2", "web")])
+        a.desinscribir("C1", "M3")
+        self.assertEqual(a.matriz.permisos_de("M3"), [])
+
+    def test_union_e_interseccion(self):
+        a = almacen([curso("C1", ["M0", "M1"], {"S1": ["ssh"]}), curso("C2", ["M1", "M2"], {"S2": ["web"]})])
+        m = a.matriz
+        self.assertEqual(sorted(m.codigos(m.union(("S1", "ssh"), ("S2", "web")))), ["M0", "M1", "M2"])
+        self.assertEqual(m.codigos(m.interseccion(("S1", "ssh"), ("S2", "web"))), ["M1"])
+
+    def test_simular_estado_no_modifica(self):
+        a = almacen([curso("C1", ["M0", "M1"], {"S1": ["ssh"]}), curso("C2", ["M1"], {"S1": ["ssh"]})])
+        m = a.matriz
+        cambios = m.simular_estado("C1", "INACTIVO")
+        self.assertEqual({k: m.codigos(v) for k, v in cambios['pierden'].items()}, {("S1", "ssh"): ["M0"]})
+        self.assertEqual(cambios['ganan'], {})
+        self.assertAcceso(a, "S1", "ssh", ["M0", "M1"])
+
+    def test_curso_grande(self):
+        # Más de 32 alumnos y varios permisos: se enciende con un solo OR por clave
+        a = almacen([curso("C1", [f"M{i}" for i in range(40)], {"S1": ["ssh", "web"], "S2": ["ssh"]})], n=40)
+        for clave in (("S1", "ssh"), ("S1", "web"), ("S2", "ssh")):
+            self.assertEqual(a.matriz.contar(*clave), 40)
+        a.cambiar_estado("C1", "INACTIVO")
+        self.assertEqual(a.matriz.contar("S1", "web"), 0)
+
+
+class TestConsistencia(unittest.TestCase):
+    def test_cambios_al_azar_igual_que_desde_cero(self):
+        azar = random.Random(7)
+        codigos = [f"M{i}" for i in range(12)]
+        permisos = [{"S1": ["ssh"]}, {"S1": ["ssh", "web"]}, {"S2": ["web"]}, {"S1": ["web"], "S2": ["ssh"]}]
+        a = almacen([curso(f"C{i}", azar.sample(codigos, 4), p) for i, p in enumerate(permisos)], n=12)
+        for _ in range(200):
+            c = azar.choice([c.codigo for c in a.cursos] or ["C0"])
+            operacion = azar.randrange(6)
+            if operacion == 0 and c in a.curso_por_codigo:
+                a.inscribir(c, azar.choice(codigos))
+            elif operacion == 1 and c in a.curso_por_codigo:
+                a.desinscribir(c, azar.choice(codigos))
+            elif operacion == 2 and c in a.curso_por_codigo:
+                a.cambiar_estado(c, azar.choice(("DICTANDO", "INACTIVO")))
+            elif operacion == 3:
+                a.agregar_curso(curso(c, azar.sample(codigos, 3), azar.choice(permisos)))
+            elif operacion == 4:
+                a.eliminar_curso(c)
+            else:
+                cod = azar.choice(codigos)
+                if a.buscar_alumno(cod):
+                    a.eliminar_alumno(cod)
+                else:
+                    i = int(cod[1:])
+                    a.agregar_alumno(Alumno(f"Alumno {cod}", cod, f"00:00:00:00:00:{i:02x}"))
+            esperada = recompuesta(a)
+            for clave in [(s, v['nombre']) for s in ("S1", "S2") for v in SERVICIOS]:
+                self.assertEqual(a.matriz.bits_de(*clave), esperada.bits_de(*clave), clave)
+
+
+if __name__ == "__main__":
+    unittest.main()
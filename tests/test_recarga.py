@@ -0,0 +1,184 @@
+# ===== Pruebas de la recarga en caliente =====
+# recarga.diferencias y recarga.aplicar sobre almacenes armados en memoria:
+# altas, bajas y cambios de cursos, servidores y servicios, y reconstrucción
+# en el lugar cuando un servidor cambia de IP.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import recarga  # noqa: E402
+from almacen import Almacen  # noqa: E402
+from main import Alumno, Curso, Servidor  # noqa: E402
+
+SSH = {'nombre': "ssh", 'protocolo': "TCP", 'puerto': 22}
+WEB = {'nombre': "web", 'protocolo': "TCP", 'puerto': 80}
+
+
+def politica(alumnos=("A1", "A2"), cursos=None, servidores=None):
+    """
+    Almacén con los alumnos indicados (MAC derivada del código), `cursos`
+    como {código: (estado, alumnos, {servidor: [servicios]})} y
+    `servidores` como {nombre: (ip, [servicios])}.
+    """
+    if cursos is None:
+        cursos = {"C1": ("DICTANDO", ["A1"], {"S1": ["ssh"]})}
+    if servidores is None:
+        servidores = {"S1": ("10.0.0.1", [SSH, WEB])}
+    almacen = Almacen()
+    almacen.cargar(
+        [Alumno(f"Alumno {c}", c, f"00:00:00:00:00:{i:02x}") for i, c in enumerate(alumnos, 1)],
+        [Curso(codigo, estado, f"Curso {codigo}", list(inscritos),
+               [{'nombre': s, 'servicios_permitidos': list(v)} for s, v in permisos.items()])
+         for codigo, (estado, inscritos, permisos) in cursos.items()],
+        [Servidor(nombre, ip, [dict(s) for s in servicios]) for nombre, (ip, servicios) in servidores.items()])
+    return almacen
+
+
+def conectar(almacen, handler, alumno, servidor, servicio):
+    conexion = {'handler': handler, 'alumno': alumno, 'servidor': servidor, 'servicio': servicio,
+                'dpid': "00:01", 'puerto': "2", 'flows': [f"{handler}_fw", f"{handler}_bw"]}
+    almacen.agregar_conexion(conexion)
+    return conexion
+
+
+class TestDiferencias(unittest.TestCase):
+    def test_sin_cambios(self):
+        self.assertTrue(recarga.vacia(recarga.diferencias(politica(), politica())))
+
+    def test_cursos(self):
+        actual = politica(cursos={"C1": ("DICTANDO", ["A1"], {"S1": ["ssh"]}),
+                                  "C2": ("DICTANDO", ["A1"], {"S1": ["ssh"]}),
+                                  "C3": ("DICTANDO", ["A1"], {"S1": ["ssh"]})})
+        nuevo = politica(cursos={"C1": ("INACTIVO", ["A2"], {"S1": ["ssh"]}),
+                                 "C2": ("DICTANDO", ["A1"], {"S1": ["ssh", "web"]}),
+                                 "C4": ("DICTANDO", [], {})})
+        d = recarga.diferencias(actual, nuevo)
+        self.assertEqual([c.codigo for c in d['cursos_agregados']], ["C4"])
+        self.assertEqual([c.codigo for c in d['cursos_reemplazados']], ["C2"])
+        self.assertEqual(d['cursos_eliminados'], ["C3"])
+        self.assertEqual(d['estados'], [("C1", "INACTIVO")])
+        self.assertEqual(len(d['inscripciones']), 1)
+        self.assertEqual(len(d['retiros']), 1)
+
+    def test_servidores_y_servicios(self):
+        actual = politica(servidores={"S1": ("10.0.0.1", [SSH]), "S2": ("10.0.0.2", [SSH]),
+                                      "S3": ("10.0.0.3", [SSH])})
+        nuevo = politica(servidores={"S1": ("10.0.0.9", [SSH]), "S2": ("10.0.0.2", [SSH, WEB]),
+                                     "S4": ("10.0.0.4", [SSH])})
+        d = recarga.diferencias(actual, nuevo)
+        self.assertEqual([s.nombre for s in d['servidores_agregados']], ["S4"])
+        self.assertEqual(sorted(s.nombre for s in d['servidores_modificados']), ["S1", "S2"])
+        self.assertEqual(d['servidores_eliminados'], ["S3"])
+
+    def test_alumnos(self):
+        actual = politica(alumnos=("A1", "A2", "A3"))
+        nuevo = politica(alumnos=("A1", "A3", "A4"))
+        nuevo.buscar_alumno("A1").nombre = "Otro nombre"
+        d = recarga.diferencias(actual, nuevo)
+        self.assertEqual([a.codigo for a in d['alumnos_agregados']], ["A4"])
+        self.assertEqual([a.codigo for a in d['alumnos_modificados']], ["A1"])
+        self.assertEqual([a.codigo for a in d['alumnos_reubicados']], ["A3"])  # otra MAC por la posición
+        self.assertEqual(d['alumnos_eliminados'], ["A2"])
+
+
+class TestAplicar(unittest.TestCase):
+    def aplicar(self, actual, nuevo):
+        return recarga.aplicar(actual, recarga.diferencias(actual, nuevo))
+
+    def test_curso_agregado_otorga(self):
+        actual = politica(cursos={})
+        revocar, otorgar, cursos, rehacer = self.aplicar(actual, politica())
+        self.assertEqual((revocar, otorgar, rehacer), ([], [("A1", "S1", "ssh")], []))
+        self.assertEqual(cursos, [("C1", None)])
+        self.assertTrue(actual.puede_conectarse("A1", "S1", "ssh"))
+
+    def test_curso_eliminado_revoca(self):
+        actual = politica()
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        revocar, otorgar, _, _ = self.aplicar(actual, politica(cursos={}))
+        self.assertEqual((revocar, otorgar), ([("A1", "S1", "ssh")], []))
+        self.assertFalse(actual.puede_conectarse("A1", "S1", "ssh"))
+
+    def test_curso_inactivo_revoca(self):
+        actual = politica()
+        revocar, _, cursos, _ = self.aplicar(actual, politica(cursos={"C1": ("INACTIVO", ["A1"], {"S1": ["ssh"]})}))
+        self.assertEqual(revocar, [("A1", "S1", "ssh")])
+        self.assertEqual(cursos, [("C1", None)])
+
+    def test_inscripcion_recompila_solo_al_alumno(self):
+        actual = politica()
+        revocar, otorgar, cursos, _ = self.aplicar(
+            actual, politica(cursos={"C1": ("DICTANDO", ["A1", "A2"], {"S1": ["ssh"]})}))
+        self.assertEqual((revocar, otorgar), ([], [("A2", "S1", "ssh")]))
+        self.assertEqual(cursos, [("C1", ["A2"])])
+
+    def test_servicio_agregado_al_curso(self):
+        actual = politica()
+        _, otorgar, _, _ = self.aplicar(actual, politica(cursos={"C1": ("DICTANDO", ["A1"], {"S1": ["ssh", "web"]})}))
+        self.assertEqual(otorgar, [("A1", "S1", "web")])
+
+    def test_servidor_agregado_no_crea_conexiones(self):
+        cursos = {"C1": ("DICTANDO", ["A1"], {"S1": ["ssh"], "S2": ["ssh"]})}
+        actual = politica(cursos=cursos)
+        nuevo = politica(cursos=cursos, servidores={"S1": ("10.0.0.1", [SSH]), "S2": ("10.0.0.2", [SSH])})
+        revocar, otorgar, _, rehacer = self.aplicar(actual, nuevo)
+        self.assertEqual((revocar, otorgar, rehacer), ([], [], []))
+        self.assertIsNotNone(actual.buscar_servidor("S2"))
+
+    def test_servicio_nuevo_no_crea_conexiones(self):
+        cursos = {"C1": ("DICTANDO", ["A1"], {"S1": ["ssh", "web"]})}
+        actual = politica(cursos=cursos, servidores={"S1": ("10.0.0.1", [SSH])})
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        revocar, otorgar, _, rehacer = self.aplicar(actual, politica(cursos=cursos))
+        self.assertEqual((revocar, otorgar, rehacer), ([], [], []))
+
+    def test_servicio_quitado_revoca_sus_conexiones(self):
+        cursos = {"C1": ("DICTANDO", ["A1"], {"S1": ["ssh", "web"]})}
+        actual = politica(cursos=cursos)
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        conectar(actual, "h2", "A1", "S1", "web")
+        revocar, otorgar, _, rehacer = self.aplicar(actual, politica(cursos=cursos, servidores={"S1": ("10.0.0.1", [SSH])}))
+        self.assertEqual((revocar, otorgar, rehacer), ([("A1", "S1", "web")], [], []))
+
+    def test_cambio_de_ip_reconstruye_en_el_lugar(self):
+        actual = politica()
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        revocar, otorgar, cursos, rehacer = self.aplicar(
+            actual, politica(servidores={"S1": ("10.0.0.9", [SSH, WEB])}))
+        self.assertEqual((revocar, otorgar), ([], []))
+        self.assertEqual([c['handler'] for c in rehacer], ["h1"])
+        self.assertEqual(actual.buscar_servidor("S1").ip, "10.0.0.9")
+        self.assertEqual(cursos, [("C1", None)])
+
+    def test_cambio_de_ip_y_servicio_quitado(self):
+        cursos = {"C1": ("DICTANDO", ["A1"], {"S1": ["ssh", "web"]})}
+        actual = politica(cursos=cursos)
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        conectar(actual, "h2", "A1", "S1", "web")
+        revocar, _, _, rehacer = self.aplicar(actual, politica(cursos=cursos, servidores={"S1": ("10.0.0.9", [SSH])}))
+        self.assertEqual(revocar, [("A1", "S1", "web")])
+        self.assertEqual([c['handler'] for c in rehacer], ["h1"])
+
+    def test_servidor_eliminado_revoca(self):
+        actual = politica()
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        revocar, _, _, rehacer = self.aplicar(actual, politica(servidores={}))
+        self.assertEqual((revocar, rehacer), ([("A1", "S1", "ssh")], []))
+
+    def test_alumno_reubicado_se_reinstala(self):
+        actual = politica()
+        conectar(actual, "h1", "A1", "S1", "ssh")
+        nuevo = politica()
+        nuevo.agregar_alumno(Alumno("Alumno A1", "A1", "00:00:00:00:00:99"))
+        revocar, otorgar, cursos, _ = self.aplicar(actual, nuevo)
+        self.assertEqual((revocar, otorgar), ([("A1", "S1", "ssh")], [("A1", "S1", "ssh")]))
+        self.assertEqual(cursos, [("C1", ["A1"])])
+
+
+if __name__ == "__main__":
+    unittest.main()
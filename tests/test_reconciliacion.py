@@ -0,0 +1,68 @@
+# ===== Pruebas de la reconciliación =====
+# Firmas de los flows deseados contra las de list/all/json, incluida la
+# cookie: un flow instalado sin su cookie propia se vuelve a enviar.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import reconciliacion  # noqa: E402
+from inactividad import cookie_flow  # noqa: E402
+
+DPID = "00:00:00:00:00:00:00:01"
+
+
+def deseado(nombre, cookie=True):
+    flow = {"switch": DPID, "name": nombre, "priority": "100", "in_port": "1",
+            "eth_type": "0x0800", "active": "true", "actions": "output=2"}
+    if cookie:
+        flow["cookie"] = str(cookie_flow(nombre))
+    return flow
+
+
+def instalado(nombre, cookie=None):
+    # Como lo devuelve Floodlight: eth_type en decimal y acciones en instrucciones
+    entrada = {"priority": "100", "match": {"in_port": "1", "eth_type": "2048"},
+               "instructions": {"instruction_apply_actions": {"actions": "output=2"}}}
+    if cookie is not None:
+        entrada["cookie"] = str(cookie)
+    return reconciliacion.firma_instalada(DPID, entrada)
+
+
+class TestPlanificar(unittest.TestCase):
+    def planificar(self, flow, firma):
+        return reconciliacion.planificar({flow["name"]: flow}, {flow["name"]: firma})
+
+    def test_flow_con_su_cookie_es_correcto(self):
+        plan = self.planificar(deseado("abcd0123_fw"), instalado("abcd0123_fw", cookie_flow("abcd0123_fw")))
+        self.assertEqual((plan['correctos'], plan['cambiados']), (1, []))
+
+    def test_flow_sin_cookie_propia_se_reescribe(self):
+        flow = deseado("abcd0123_fw")
+        plan = self.planificar(flow, instalado("abcd0123_fw", reconciliacion.COOKIE_POR_DEFECTO))
+        self.assertEqual(plan['cambiados'], [flow])
+
+    def test_cookie_en_hexadecimal(self):
+        plan = self.planificar(deseado("abcd0123_fw"), instalado("abcd0123_fw", hex(cookie_flow("abcd0123_fw"))))
+        self.assertEqual(plan['correctos'], 1)
+
+    def test_regla_sin_cookie(self):
+        plan = self.planificar(deseado("pol_0123456789", cookie=False),
+                               instalado("pol_0123456789", reconciliacion.COOKIE_POR_DEFECTO))
+        self.assertEqual(plan['correctos'], 1)
+
+    def test_controlador_que_no_informa_la_cookie(self):
+        plan = self.planificar(deseado("abcd0123_fw"), instalado("abcd0123_fw"))
+        self.assertEqual(plan['correctos'], 1)
+
+    def test_obsoletos_solo_propios(self):
+        plan = reconciliacion.planificar({}, {"abcd0123_bw": instalado("x"), "ajeno": instalado("y")})
+        self.assertEqual(plan['obsoletos'], ["abcd0123_bw"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# ===== Pruebas del registro de conexiones =====
+# SQLite en memoria: altas que actualizan una conexión existente sin moverla
+# de lugar y paginado por cursor con tamaño de página acotado.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from registro import MAX_PAGINA, RegistroConexiones  # noqa: E402
+
+
+def conexion(handler, alumno="A1", servicio="ssh", flows=None):
+    return {'handler': handler, 'alumno': alumno, 'servidor': "S1", 'servicio': servicio,
+            'dpid': "00:01", 'puerto': "2", 'flows': flows or [f"{handler}_fw"]}
+
+
+class TestAgregar(unittest.TestCase):
+    def setUp(self):
+        self.registro = RegistroConexiones()
+
+    def tearDown(self):
+        self.registro.close()
+
+    def fila(self, handler):
+        return self.registro.db.execute(
+            "SELECT rowid, creada FROM conexiones WHERE handler = ?", (handler,)).fetchone()
+
+    def test_actualizar_conserva_rowid_y_creacion(self):
+        self.registro.agregar_varias([conexion("h1"), conexion("h2")])
+        antes = tuple(self.fila("h1"))
+        self.registro.agregar(conexion("h1", servicio="web", flows=["h1_a", "h1_b"]))
+        self.assertEqual(tuple(self.fila("h1")), antes)
+        actualizada = self.registro.buscar("h1")
+        self.assertEqual((actualizada['servicio'], actualizada['flows']), ("web", ["h1_a", "h1_b"]))
+        pagina, _ = self.registro.listar(tam_pagina=10)
+        self.assertEqual([c['handler'] for c in pagina], ["h1", "h2"])
+
+    def test_actualizar_borra_columnas_ausentes(self):
+        self.registro.agregar(dict(conexion("h1"), dpid_alumno="00:02"))
+        self.registro.agregar(conexion("h1"))
+        self.assertNotIn('dpid_alumno', self.registro.buscar("h1"))
+
+
+class TestListar(unittest.TestCase):
+    def setUp(self):
+        self.registro = RegistroConexiones()
+        self.registro.agregar_varias([conexion(f"h{i}", alumno=f"A{i % 2}") for i in range(5)])
+
+    def tearDown(self):
+        self.registro.close()
+
+    def test_paginas_por_cursor(self):
+        vistos, cursor = [], 0
+        while True:
+            pagina, cursor = self.registro.listar(cursor, 2)
+            vistos += [c['handler'] for c in pagina]
+            if cursor is None:
+                break
+        self.assertEqual(vistos, [f"h{i}" for i in range(5)])
+
+    def test_filtros(self):
+        pagina, siguiente = self.registro.listar(tam_pagina=10, alumno="A1")
+        self.assertEqual(([c['handler'] for c in pagina], siguiente), (["h1", "h3"], None))
+
+    def test_tam_pagina_invalido(self):
+        for tam in (0, -1):
+            with self.assertRaises(ValueError):
+                self.registro.listar(tam_pagina=tam)
+
+    def test_tam_pagina_se_limita(self):
+        self.registro.agregar_varias([conexion(f"x{i}") for i in range(MAX_PAGINA + 5)])
+        pagina, siguiente = self.registro.listar(tam_pagina=MAX_PAGINA * 10)
+        self.assertEqual(len(pagina), MAX_PAGINA)
+        self.assertIsNotNone(siguiente)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# ===== Pruebas del snapshot y de las reglas compiladas heredadas =====
+# Ida y vuelta del formato binario (con las reglas de cada curso compilado),
+# lectura de la versión anterior y retiro, tras reiniciar, de las reglas de
+# un curso compilado que ya no las genera.
+#
+#   python -m pytest tests
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+import zlib
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import snapshot  # noqa: E402
+from almacen import Almacen  # noqa: E402
+from compilador import PoliticaCompilada  # noqa: E402
+from main import Alumno, Curso, Servidor  # noqa: E402
+
+
+def permiso(alumno, mac, dpid="00:01"):
+    return {'alumno': alumno, 'mac': mac, 'servidor': "S1", 'ip': "10.0.0.1", 'servicio': "ssh",
+            'tcp_port': 22, 'saltos': [{'dpid': dpid, 'in_port': 1, 'port': 9}]}
+
+
+A1 = permiso("A1", "00:00:00:00:00:01")
+A2 = permiso("A2", "00:00:00:00:00:02")
+
+
+def compilada(cursos):
+    politica = PoliticaCompilada()
+    for curso, permisos in cursos.items():
+        politica.cargar_curso(curso, permisos)
+    politica.cambios()
+    return politica
+
+
+class TestReglasHeredadas(unittest.TestCase):
+    def reiniciar(self, antes):
+        despues = PoliticaCompilada()
+        for curso in antes.cursos:
+            despues.heredar(curso, antes.reglas_de(curso))
+        return despues
+
+    def test_reglas_de_cubre_todo_lo_instalado(self):
+        antes = compilada({"C1": [A1], "C2": [A2]})
+        self.assertEqual(antes.reglas_de("C1") | antes.reglas_de("C2"), set(antes.reglas))
+        self.assertTrue(antes.reglas_de("C1") & antes.reglas_de("C2"))  # tránsito y ARP compartidos
+
+    def test_curso_quitado_sin_cargar_retira_sus_reglas(self):
+        antes = compilada({"C1": [A1], "C2": [A2]})
+        despues = self.reiniciar(antes)
+        despues.quitar("C1")
+        _, retirar = despues.cambios()
+        # Solo las propias de C1: las compartidas las sigue reclamando C2
+        self.assertEqual(set(retirar), antes.reglas_de("C1") - antes.reglas_de("C2"))
+
+    def test_al_cargar_se_retira_lo_que_ya_no_se_genera(self):
+        antes = compilada({"C1": [A1, A2]})
+        despues = self.reiniciar(antes)
+        despues.cargar_curso("C1", [A1])
+        instalar, retirar = despues.cambios()
+        esperado = compilada({"C1": [A1]})
+        self.assertEqual(set(despues.reglas), set(esperado.reglas))
+        self.assertEqual(set(retirar), set(antes.reglas) - set(esperado.reglas))
+        self.assertEqual(despues.reglas_de("C1"), set(esperado.reglas))
+
+    def test_reglas_heredadas_se_revisan_una_vez(self):
+        despues = self.reiniciar(compilada({"C1": [A1]}))
+        despues.quitar("C1")
+        self.assertTrue(despues.cambios()[1])
+        self.assertEqual(despues.cambios(), ([], []))
+
+
+class TestFormato(unittest.TestCase):
+    def setUp(self):
+        self.almacen = Almacen()
+        self.almacen.cargar([Alumno("Alumno A1", "A1", "00:00:00:00:00:01")],
+                            [Curso("C1", "DICTANDO", "Curso C1", ["A1"], [])],
+                            [Servidor("S1", "10.0.0.1", [])])
+        fd, self.path = tempfile.mkstemp(suffix=".snap")
+        os.close(fd)
+
+    def tearDown(self):
+        self.almacen.registro.close()
+        os.unlink(self.path)
+
+    def test_ida_y_vuelta_con_reglas(self):
+        snapshot.guardar(self.path, self.almacen, {"C1": {"pol_b", "pol_a"}, "C2": None})
+        datos = snapshot.leer(self.path)
+        self.assertEqual(datos['compilados'], [["C1", ["pol_a", "pol_b"]], ["C2", []]])
+        self.assertEqual(datos['alumnos'], [["Alumno A1", "A1", "00:00:00:00:00:01"]])
+
+    def escribir(self, version, datos):
+        with open(self.path, 'wb') as f:
+            f.write(snapshot.MAGIA + bytes([version]) + zlib.compress(json.dumps(datos).encode()))
+
+    def test_lee_la_version_anterior(self):
+        self.escribir(2, dict({k: [] for k in snapshot.CLAVES}, compilados=["C1"]))
+        self.assertEqual(snapshot.leer(self.path)['compilados'], [["C1", []]])
+
+    def test_rechaza_versiones_desconocidas_y_compilados_invalidos(self):
+        self.escribir(1, {})
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.leer(self.path)
+        self.escribir(snapshot.VERSION, dict({k: [] for k in snapshot.CLAVES}, compilados=["C1"]))
+        with self.assertRaises(snapshot.SnapshotError):
+            snapshot.leer(self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
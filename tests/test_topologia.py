@@ -0,0 +1,149 @@
+# ===== Pruebas de la topología y su caché de rutas =====
+# Rutas más cortas memorizadas e invalidación selectiva cuando cambian los
+# enlaces, en memoria y con `actualizar` contra el Floodlight falso.
+#
+#   python -m pytest tests
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.floodlight_falso import FloodlightFalso  # noqa: E402
+from floodlight import FloodlightClient  # noqa: E402
+from topologia import Topologia  # noqa: E402
+
+
+def enlace(a, pa, b, pb):
+    return {"src-switch": a, "src-port": pa, "dst-switch": b, "dst-port": pb}
+
+
+# Anillo s1-s2-s3-s4-s1 (dos caminos de 2 saltos entre s1 y s3) y s5 colgado de s4
+SWITCHES = ["s1", "s2", "s3", "s4", "s5"]
+ENLACES = [enlace("s1", 1, "s2", 1), enlace("s2", 2, "s3", 1), enlace("s3", 2, "s4", 1),
+           enlace("s4", 2, "s1", 2), enlace("s4", 3, "s5", 1)]
+
+
+def topologia():
+    t = Topologia()
+    for s in SWITCHES:
+        t.adyacencia[s] = {}
+    for e in ENLACES:
+        t._conectar(e["src-switch"], e["src-port"], e["dst-switch"], e["dst-port"])
+    t.cargada = True
+    return t
+
+
+class TestCache(unittest.TestCase):
+    def test_ruta_mas_corta_en_cache(self):
+        t = topologia()
+        self.assertEqual(t.ruta("s1", "s5"), ("s1", "s4", "s5"))
+        self.assertIn(("s1", "s5"), t.rutas)
+        self.assertEqual(t.rutas_por_enlace[frozenset(("s4", "s5"))], {("s1", "s5")})
+        self.assertEqual(t.ruta("s1", "s1"), ("s1",))
+        self.assertIsNone(t.ruta("s1", "x9"))
+
+    def test_saltos_con_puertos(self):
+        t = topologia()
+        self.assertEqual(t.saltos("s1", 7, "s5", 9), [{'dpid': "s1", 'in_port': 7, 'port': 2},
+                                                      {'dpid': "s4", 'in_port': 2, 'port': 3},
+                                                      {'dpid': "s5", 'in_port': 1, 'port': 9}])
+
+    def test_eliminar_enlace_invalida_solo_las_rutas_que_lo_usan(self):
+        t = topologia()
+        t.ruta("s1", "s5")
+        t.ruta("s2", "s3")
+        t.eliminar_enlace("s4", "s1")
+        self.assertNotIn(("s1", "s5"), t.rutas)
+        self.assertIn(("s2", "s3"), t.rutas)
+        self.assertEqual(t.ruta("s1", "s5"), ("s1", "s2", "s3", "s4", "s5"))
+        self.assertNotIn(frozenset(("s4", "s1")), t.rutas_por_enlace)
+
+    def test_enlace_nuevo_invalida_las_rutas_que_acorta(self):
+        t = topologia()
+        t.eliminar_enlace("s4", "s1")
+        t.ruta("s1", "s5")
+        t.ruta("s2", "s3")
+        t.agregar_enlace("s1", 3, "s5", 2)
+        self.assertNotIn(("s1", "s5"), t.rutas)
+        self.assertIn(("s2", "s3"), t.rutas)  # no puede acortarse
+        self.assertEqual(t.ruta("s1", "s5"), ("s1", "s5"))
+
+    def test_ruta_inexistente_se_invalida_al_conectar(self):
+        t = topologia()
+        t.eliminar_enlace("s4", "s5")
+        self.assertIsNone(t.ruta("s1", "s5"))
+        t.agregar_enlace("s5", 1, "s4", 3)
+        self.assertEqual(t.ruta("s1", "s5"), ("s1", "s4", "s5"))
+
+    def test_eliminar_switch(self):
+        t = topologia()
+        t.ruta("s1", "s5")
+        t.ruta("s4", "s5")
+        t.ruta("s1", "s2")
+        t.eliminar_switch("s5")
+        self.assertEqual(set(t.rutas), {("s1", "s2")})
+        self.assertIsNone(t.ruta("s1", "s5"))
+
+
+class TestActualizar(unittest.TestCase):
+    def setUp(self):
+        self.falso = FloodlightFalso(switches=[{"switchDPID": s} for s in SWITCHES],
+                                     enlaces=list(ENLACES)).iniciar()
+        self.cliente = FloodlightClient(self.falso.url)
+        self.topologia = Topologia(self.cliente)
+
+    def tearDown(self):
+        self.cliente.close()
+        self.falso.detener()
+
+    def test_primera_actualizacion_carga(self):
+        resumen = self.topologia.actualizar()
+        self.assertEqual(resumen['switches'], 5)
+        self.assertEqual(self.topologia.estado()['enlaces'], 5)
+
+    def test_sin_cambios_conserva_las_rutas(self):
+        self.topologia.actualizar()
+        self.topologia.ruta("s1", "s5")
+        resumen = self.topologia.actualizar()
+        self.assertEqual((resumen['enlaces_agregados'], resumen['enlaces_eliminados'],
+                          resumen['rutas_invalidadas']), (0, 0, 0))
+        self.assertIn(("s1", "s5"), self.topologia.rutas)
+
+    def test_enlace_caido(self):
+        self.topologia.actualizar()
+        self.topologia.ruta("s1", "s5")
+        self.topologia.ruta("s2", "s3")
+        self.falso.enlaces = [e for e in ENLACES if {e["src-switch"], e["dst-switch"]} != {"s1", "s4"}]
+        resumen = self.topologia.actualizar()
+        self.assertEqual((resumen['enlaces_eliminados'], resumen['rutas_invalidadas']), (1, 1))
+        self.assertEqual(self.topologia.ruta("s1", "s5"), ("s1", "s2", "s3", "s4", "s5"))
+
+    def test_enlace_informado_en_ambos_sentidos(self):
+        self.falso.enlaces = ENLACES + [enlace(e["dst-switch"], e["dst-port"], e["src-switch"], e["src-port"])
+                                        for e in ENLACES]
+        self.topologia.actualizar()
+        self.topologia.ruta("s1", "s5")
+        resumen = self.topologia.actualizar()
+        self.assertEqual((resumen['enlaces_agregados'], resumen['enlaces_eliminados']), (0, 0))
+
+    def test_puerto_cambiado(self):
+        self.topologia.actualizar()
+        self.topologia.ruta("s1", "s5")
+        self.falso.enlaces = [e for e in ENLACES if e["dst-switch"] != "s5"] + [enlace("s4", 8, "s5", 1)]
+        resumen = self.topologia.actualizar()
+        self.assertEqual((resumen['enlaces_agregados'], resumen['enlaces_eliminados']), (1, 1))
+        self.assertEqual(self.topologia.saltos("s1", 7, "s5", 9)[1]['port'], 8)
+
+    def test_switch_retirado(self):
+        self.topologia.actualizar()
+        self.topologia.ruta("s1", "s5")
+        self.falso.switches = [{"switchDPID": s} for s in SWITCHES if s != "s5"]
+        resumen = self.topologia.actualizar()
+        self.assertEqual(resumen['switches_eliminados'], 1)
+        self.assertNotIn(("s1", "s5"), self.topologia.rutas)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,255 @@
+# ===== Topología y tabla de rutas =====
+# Grafo en memoria de switches/enlaces obtenido de Floodlight una sola vez,
+# con rutas más cortas memorizadas por (dpid origen, dpid destino). Un hilo
+# (o el menú/API) vuelve a consultar los enlaces y aplica solo la diferencia,
+# invalidando únicamente las rutas que pasan por lo que cambió.
+
+import threading
+from collections import deque
+
+SWITCHES_PATH = "/wm/core/controller/switches/json"
+LINKS_PATH = "/wm/topology/links/json"
+
+
+def _dpid_switch(sw):
+    return sw.get("switchDPID", sw.get("dpid"))
+
+
+def _normalizar(enlace):
+    """
+    (a, puerto_a, b, puerto_b) con a < b: Floodlight informa cada enlace
+    en uno o en ambos sentidos.
+    """
+    a, pa, b, pb = enlace
+    return enlace if a < b else (b, pb, a, pa)
+
+
+class Topologia:
+    """
+    Grafo de la red SDN. `adyacencia[a][b]` es el puerto de `a` que lleva a `b`.
+    Las rutas calculadas se guardan en `rutas` y un índice inverso por enlace
+    permite invalidar solo las entradas afectadas cuando cambia un enlace.
+    """
+
+    def __init__(self, cliente=None):
+        self.cliente = cliente
+        self.adyacencia = {}
+        self.rutas = {}              # (src, dst) -> tupla de dpids o None si no hay camino
+        self.rutas_por_enlace = {}   # frozenset({a, b}) -> set((src, dst))
+        self.cargada = False
+        self.ultima = None           # resumen de la última actualización
+        self._lock = threading.RLock()  # el grafo lo leen los hilos de la API y lo cambia el refresco
+        self._hilo = None
+        self._detener = threading.Event()
+
+    # ----- Carga desde el controlador -----
+    def cargar(self):
+        """
+        Descarga switches y enlaces del controlador y reconstruye el grafo.
+        """
+        switches = self.cliente.get_json(SWITCHES_PATH)
+        enlaces = self.cliente.get_json(LINKS_PATH)
+        with self._lock:
+            self.adyacencia = {_dpid_switch(sw): {} for sw in switches}
+            self.rutas.clear()
+            self.rutas_por_enlace.clear()
+            for e in enlaces:
+                self._conectar(e["src-switch"], e["src-port"], e["dst-switch"], e["dst-port"])
+            self.cargada = True
+
+    def actualizar(self):
+        """
+        Vuelve a consultar switches y enlaces y aplica solo las diferencias,
+        invalidando únicamente las rutas afectadas. Sin topología cargada
+        hace la carga completa. Devuelve un resumen de los cambios.
+        """
+        if not self.cargada:
+            self.cargar()
+            self.ultima = {'switches': len(self.adyacencia), 'enlaces_agregados': 0, 'enlaces_eliminados': 0,
+                           'switches_agregados': 0, 'switches_eliminados': 0, 'rutas_invalidadas': 0}
+            return self.ultima
+        switches = {_dpid_switch(sw) for sw in self.cliente.get_json(SWITCHES_PATH)}
+        enlaces = self.cliente.get_json(LINKS_PATH)
+        nuevos = {_normalizar((e["src-switch"], e["src-port"], e["dst-switch"], e["dst-port"])) for e in enlaces
+                  if e["src-switch"] in switches and e["dst-switch"] in switches}
+        with self._lock:
+            rutas_antes = len(self.rutas)
+            actuales = {(a, pa, b, self.adyacencia[b][a])
+                        for a in self.adyacencia for b, pa in self.adyacencia[a].items() if a < b}
+            retirados = [d for d in self.adyacencia if d not in switches]
+            for dpid in retirados:
+                self.eliminar_switch(dpid)
+            agregados = [d for d in switches if d not in self.adyacencia]
+            for dpid in agregados:
+                self.adyacencia[dpid] = {}
+            # Un enlace cuyo puerto cambió se retira y se vuelve a agregar
+            actuales = {e for e in actuales if e[0] in self.adyacencia and e[2] in self.adyacencia}
+            eliminados, nuevos_enlaces = actuales - nuevos, nuevos - actuales
+            for a, _, b, _ in eliminados:
+                self.eliminar_enlace(a, b)
+            for a, pa, b, pb in nuevos_enlaces:
+                self.agregar_enlace(a, pa, b, pb)
+            self.ultima = {
+                'switches': len(self.adyacencia),
+                'switches_agregados': len(agregados),
+                'switches_eliminados': len(retirados),
+                'enlaces_agregados': len(nuevos_enlaces),
+                'enlaces_eliminados': len(eliminados),
+                'rutas_invalidadas': rutas_antes - len(self.rutas),
+            }
+            return self.ultima
+
+    def asegurar_cargada(self):
+        if not self.cargada:
+            self.cargar()
+
+    def estado(self):
+        with self._lock:
+            return {
+                'cargada': self.cargada,
+                'switches': len(self.adyacencia),
+                'enlaces': sum(len(v) for v in self.adyacencia.values()) // 2,
+                'rutas_en_cache': len(self.rutas),
+                'refresco': self._hilo is not None,
+                'ultima': self.ultima,
+            }
+
+    # ----- Cambios de enlaces -----
+    def agregar_enlace(self, a, puerto_a, b, puerto_b):
+        with self._lock:
+            self._conectar(a, puerto_a, b, puerto_b)
+            # Un enlace nuevo solo afecta las rutas que ahora pueden acortarse
+            dist_a = self._distancias(a)
+            dist_b = self._distancias(b)
+            infinito = float("inf")
+            for clave, ruta in list(self.rutas.items()):
+                src, dst = clave
+                actual = len(ruta) - 1 if ruta is not None else infinito
+                candidato = min(dist_a.get(src, infinito) + 1 + dist_b.get(dst, infinito),
+                                dist_b.get(src, infinito) + 1 + dist_a.get(dst, infinito))
+                if candidato < actual:
+                    self._invalidar(clave)
+
+    def eliminar_enlace(self, a, b):
+        with self._lock:
+            self.adyacencia.get(a, {}).pop(b, None)
+            self.adyacencia.get(b, {}).pop(a, None)
+            for clave in list(self.rutas_por_enlace.pop(frozenset((a, b)), ())):
+                self._invalidar(clave)
+
+    def eliminar_switch(self, dpid):
+        with self._lock:
+            for vecino in list(self.adyacencia.get(dpid, {})):
+                self.eliminar_enlace(dpid, vecino)
+            self.adyacencia.pop(dpid, None)
+            for clave in [k for k in self.rutas if dpid in k]:
+                self._invalidar(clave)
+
+    # ----- Refresco en segundo plano -----
+    def iniciar_refresco(self, intervalo=60):
+        """
+        Lanza un hilo que llama a `actualizar` cada `intervalo` segundos
+        (solo una vez cargada la topología: antes no hay rutas que invalidar).
+        """
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(intervalo,), name="topologia", daemon=True)
+        self._hilo.start()
+
+    def detener_refresco(self):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def _bucle(self, intervalo):
+        while not self._detener.wait(intervalo):
+            if not self.cargada:
+                continue
+            try:
+                self.actualizar()
+            except Exception:
+                pass  # se reintenta en la siguiente vuelta
+
+    # ----- Rutas -----
+    def ruta(self, src, dst):
+        """
+        Camino más corto (en saltos) como tupla de dpids, o None si no existe.
+        Se calcula una sola vez por par y queda en caché.
+        """
+        clave = (src, dst)
+        with self._lock:
+            if clave in self.rutas:
+                return self.rutas[clave]
+            camino = self._bfs(src, dst)
+            self.rutas[clave] = camino
+            if camino is not None:
+                for a, b in zip(camino, camino[1:]):
+                    self.rutas_por_enlace.setdefault(frozenset((a, b)), set()).add(clave)
+            return camino
+
+    def saltos(self, src_dpid, src_port, dst_dpid, dst_port):
+        """
+        Lista de saltos {'dpid', 'in_port', 'port'} desde el puerto del origen
+        hasta el puerto del destino, o None si no hay camino.
+        """
+        with self._lock:
+            camino = self.ruta(src_dpid, dst_dpid)
+            if camino is None:
+                return None
+            hops = []
+            entrada = src_port
+            for i, dpid in enumerate(camino):
+                if i + 1 < len(camino):
+                    siguiente = camino[i + 1]
+                    salida = self.adyacencia[dpid][siguiente]
+                    hops.append({'dpid': dpid, 'in_port': entrada, 'port': salida})
+                    entrada = self.adyacencia[siguiente][dpid]
+                else:
+                    hops.append({'dpid': dpid, 'in_port': entrada, 'port': dst_port})
+            return hops
+
+    # ----- Internos -----
+    def _conectar(self, a, puerto_a, b, puerto_b):
+        self.adyacencia.setdefault(a, {})[b] = puerto_a
+        self.adyacencia.setdefault(b, {})[a] = puerto_b
+
+    def _invalidar(self, clave):
+        ruta = self.rutas.pop(clave, None)
+        if ruta is not None:
+            for a, b in zip(ruta, ruta[1:]):
+                claves = self.rutas_por_enlace.get(frozenset((a, b)))
+                if claves is not None:
+                    claves.discard(clave)
+
+    def _distancias(self, origen):
+        dist = {origen: 0}
+        cola = deque([origen])
+        while cola:
+            actual = cola.popleft()
+            for vecino in self.adyacencia.get(actual, ()):
+                if vecino not in dist:
+                    dist[vecino] = dist[actual] + 1
+                    cola.append(vecino)
+        return dist
+
+    def _bfs(self, src, dst):
+        if src not in self.adyacencia or dst not in self.adyacencia:
+            return (src,) if src == dst else None
+        previo = {src: None}
+        cola = deque([src])
+        while cola:
+            actual = cola.popleft()
+            if actual == dst:
+                camino = []
+                while actual is not None:
+                    camino.append(actual)
+                    actual = previo[actual]
+                return tuple(reversed(camino))
+            for vecino in self.adyacencia[actual]:
+                if vecino not in previo:
+                    previo[vecino] = actual
+                    cola.append(vecino)
+        return None
@@ -0,0 +1,148 @@
+# ===== Caché de ubicaciones (attachment points) =====
+# Resuelve MAC de alumnos e IP de servidores a (dpid, puerto) usando el
+# device tracker de Floodlight, con TTL, desalojo LRU y refresco en lote.
+
+import threading
+import time
+from collections import OrderedDict
+
+DEVICE_PATH = "/wm/device/"
+
+
+class CacheUbicaciones:
+    """
+    Caché LRU de puntos de conexión. Las claves son ('mac', mac) o ('ip', ip)
+    y los valores (dpid, puerto, instante de carga); dpid None marca un
+    dispositivo que el controlador no conoce (caché negativa). Un fallo o una entrada
+    vencida se resuelven con UNA consulta a /wm/device/ que actualiza todos
+    los dispositivos a la vez.
+    """
+
+    def __init__(self, cliente, ttl=300, capacidad=50000, espera_error=30, ventana_recarga=10):
+        self.cliente = cliente
+        self.ttl = ttl
+        self.capacidad = capacidad
+        self.espera_error = espera_error
+        self.ventana_recarga = ventana_recarga
+        self._reintentar_en = 0.0
+        self._ultima_carga = float("-inf")
+        self.entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self._vencidas = threading.Event()
+        self._hilo = None
+        self._detener = threading.Event()
+
+    # ----- Consultas -----
+    def buscar_mac(self, mac):
+        return self._buscar(('mac', str(mac).lower()))
+
+    def buscar_ip(self, ip):
+        return self._buscar(('ip', str(ip)))
+
+    def _buscar(self, clave):
+        """
+        Devuelve (dpid, puerto) o None. Una entrada vencida se sigue usando
+        y se marca para el próximo refresco en segundo plano; un fallo sí
+        consulta al controlador (una vez, para todos los dispositivos).
+        """
+        with self._lock:
+            entrada = self.entradas.get(clave)
+            if entrada is not None:
+                self.entradas.move_to_end(clave)
+                if time.monotonic() - entrada[2] > self.ttl:
+                    if self._hilo is None:
+                        entrada = None  # sin refresco en segundo plano: recargar ahora
+                    else:
+                        self._vencidas.set()
+        if entrada is None:
+            ahora = time.monotonic()
+            if ahora < self._reintentar_en:
+                return None  # el controlador falló hace poco: no insistir en cada búsqueda
+            if ahora - self._ultima_carga > self.ventana_recarga:
+                # Si la carga completa es muy reciente, el dispositivo simplemente no existe
+                try:
+                    self.refrescar()
+                except Exception:
+                    self._reintentar_en = time.monotonic() + self.espera_error
+                    raise
+            with self._lock:
+                entrada = self.entradas.get(clave)
+                if entrada is None:
+                    # Caché negativa: no volver a consultar hasta que venza el TTL
+                    entrada = (None, None, time.monotonic())
+                    self.entradas[clave] = entrada
+        return (entrada[0], entrada[1]) if entrada[0] is not None else None
+
+    # ----- Carga en lote -----
+    def refrescar(self):
+        """
+        Descarga todos los dispositivos del controlador en una sola petición
+        y actualiza las entradas. Devuelve cuántos puntos de conexión se cargaron.
+        """
+        datos = self.cliente.get_json(DEVICE_PATH)
+        dispositivos = datos.get("devices", []) if isinstance(datos, dict) else datos
+        ahora = self._ultima_carga = time.monotonic()
+        nuevas = []
+        for d in dispositivos:
+            puntos = d.get("attachmentPoint") or []
+            if not puntos:
+                continue
+            ap = puntos[0]
+            valor = (ap.get("switch", ap.get("switchDPID")), str(ap.get("port")), ahora)
+            nuevas += [(('mac', str(m).lower()), valor) for m in d.get("mac", [])]
+            nuevas += [(('ip', str(ip)), valor) for ip in d.get("ipv4", [])]
+        with self._lock:
+            # Las entradas negativas vencidas se descartan para reintentarlas
+            for clave in [k for k, v in self.entradas.items() if v[0] is None and ahora - v[2] > self.ttl]:
+                del self.entradas[clave]
+            for clave, valor in nuevas:
+                self.entradas[clave] = valor
+                self.entradas.move_to_end(clave)
+            while len(self.entradas) > self.capacidad:
+                self.entradas.popitem(last=False)
+        return len(nuevas)
+
+    def invalidar(self, clave=None):
+        with self._lock:
+            if clave is None:
+                self.entradas.clear()
+            else:
+                self.entradas.pop(clave, None)
+
+    # ----- Refresco en segundo plano -----
+    def iniciar_refresco(self, intervalo=30):
+        """
+        Lanza un hilo que, cada `intervalo` segundos o cuando se lee una
+        entrada vencida, refresca en lote si hay entradas vencidas.
+        """
+        if self._hilo is not None:
+            return
+        self._detener.clear()
+        self._hilo = threading.Thread(target=self._bucle, args=(intervalo,),
+                                      name="ubicaciones", daemon=True)
+        self._hilo.start()
+
+    def detener_refresco(self):
+        if self._hilo is None:
+            return
+        self._detener.set()
+        self._vencidas.set()
+        self._hilo.join()
+        self._hilo = None
+
+    def _bucle(self, intervalo):
+        while not self._detener.is_set():
+            self._vencidas.wait(intervalo)
+            self._vencidas.clear()
+            if self._detener.is_set():
+                break
+            if self._hay_vencidas():
+                try:
+                    self.refrescar()
+                except Exception:
+                    pass  # se reintenta en la siguiente vuelta
+
+    def _hay_vencidas(self):
+        limite = time.monotonic() - self.ttl
+        with self._lock:
+            return any(v[2] < limite for v in self.entradas.values())